@@ -1,16 +1,37 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
-import joblib
-import plotly.graph_objects as go
+import os
+import tempfile
 import time
 
+from cardiorisk import lotes, presentacion
+from cardiorisk.cache import cache_predicciones
+from cardiorisk.deriva import monitor_para
+from cardiorisk.entrada import CAMPOS_USUARIO
+from cardiorisk.estilos import css_tema
+from cardiorisk.arranque import iniciar_calentamiento
+from cardiorisk.auditoria import bitacora
+from cardiorisk.explicacion import ETIQUETAS, explicador_para, importancias_para
+from cardiorisk.historial import CAPACIDAD, CAPACIDAD_MAXIMA, HistorialSesion
+from cardiorisk.incertidumbre import ruido_medicion
+from cardiorisk.informes import MAX_FILAS_CONTRIBUCIONES, formatos_disponibles, generador_informes
+from cardiorisk.inferencia import lotificador_compartido, predecir_paciente
+from cardiorisk.metricas import metricas
+from cardiorisk.registro import registro
+from cardiorisk.sensibilidad import barrido, barrido_doble
+from cardiorisk.variantes import motor_para, variante_activa
+
+# Inicio del rerun (se registra al final del script)
+inicio_rerun = time.perf_counter()
+
 # --------------------------------------------------
 # CARGA DEL MODELO Y SCALER
 # --------------------------------------------------
-modelo = joblib.load("modelo_cardio.joblib")      # Modelo RandomForest optimizado
-scaler = joblib.load("scaler.joblib")             # Escalador usado en el entrenamiento
-feature_names = joblib.load("feature_names.joblib")  # Lista de columnas originales
+# El registro carga los artefactos una vez por proceso y los recarga en caliente
+# si se reemplazan los archivos .joblib en disco.
+with metricas.medir("artefactos"):
+    artefactos = registro.obtener()
+plantilla = artefactos.plantilla            # Vector de ceros sobre feature_names (columnas originales)
 
 # --------------------------------------------------
 # CONFIGURACIÓN DE LA APP
@@ -23,272 +44,8 @@ st.set_page_config(page_title="CardioRisk AI", page_icon="🫀", layout="wide")
 # Selector de Modo Oscuro en la barra lateral (al principio)
 modo_oscuro = st.sidebar.toggle("🌑 Modo Oscuro", value=False)
 
-# Definición de colores según el modo seleccionado
-if modo_oscuro:
-    theme = {
-        "bg_gradient": "linear-gradient(135deg, #0F2027 0%, #203A43 50%, #2C5364 100%)",
-        "text_color": "#F8FAFC",
-        "card_bg": "rgba(30, 41, 59, 0.7)",
-        "card_border": "rgba(255, 255, 255, 0.1)",
-        "header_bg": "rgba(15, 23, 42, 0.8)",
-        "input_bg": "rgba(51, 65, 85, 0.6)",
-        "input_text": "#F8FAFC",
-        "sidebar_bg": "linear-gradient(180deg, #1e293b 0%, #0f172a 100%)",
-        "section_line": "linear-gradient(90deg, #38BDF8 0%, transparent 100%)",
-        "shadow_color": "rgba(0,0,0,0.5)"
-    }
-else:
-    theme = {
-        "bg_gradient": "linear-gradient(135deg, #E0F7FA 0%, #E3F2FD 50%, #F3E5F5 100%)",
-        "text_color": "#1E293B",
-        "card_bg": "rgba(255, 255, 255, 0.9)",
-        "card_border": "rgba(255, 255, 255, 0.8)",
-        "header_bg": "rgba(255, 255, 255, 0.85)",
-        "input_bg": "rgba(241, 245, 249, 0.8)",
-        "input_text": "#334155",
-        "sidebar_bg": "linear-gradient(180deg, #F8FAFC 0%, #EFF6FF 100%)",
-        "section_line": "linear-gradient(90deg, #3498DB 0%, transparent 100%)",
-        "shadow_color": "rgba(31, 38, 135, 0.1)"
-    }
-
-# CSS Dinámico Inyectado
-st.markdown(f"""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&display=swap');
-
-    /* Reset y fuentes globales */
-    html, body, [class*="css"]  {{
-        font-family: 'Inter', sans-serif;
-        color: {theme['text_color']};
-    }}
-    
-    /* Fondo de la aplicación */
-    .stApp {{
-        background: {theme['bg_gradient']};
-        background-attachment: fixed;
-    }}
-
-    /* Encabezado Principal - GLASSMORPHISM */
-    .main-header {{
-        background: {theme['header_bg']};
-        backdrop-filter: blur(10px);
-        padding: 3rem 2rem;
-        border-radius: 24px;
-        text-align: center;
-        margin-bottom: 3rem;
-        box-shadow: 0 20px 40px {theme['shadow_color']};
-        border: 1px solid {theme['card_border']};
-        position: relative;
-        overflow: hidden;
-    }}
-    
-    .main-header::before {{
-        content: "";
-        position: absolute;
-        top: -50%; left: -50%;
-        width: 200%; height: 200%;
-        background: radial-gradient(circle, rgba(52, 152, 219, 0.1) 0%, transparent 70%);
-        animation: pulse-bg 15s infinite;
-    }}
-
-    @keyframes pulse-bg {{
-        0% {{ transform: scale(1); }}
-        50% {{ transform: scale(1.2); }}
-        100% {{ transform: scale(1); }}
-    }}
-
-    .main-header h1 {{
-        font-family: 'Inter', sans-serif;
-        font-size: 4rem;
-        font-weight: 800;
-        letter-spacing: -2px;
-        margin: 0;
-        background: linear-gradient(90deg, #0F2027 0%, #203A43 50%, #2C5364 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        filter: drop-shadow(0 2px 4px rgba(0,0,0,0.1));
-    }}
-    
-    /* En modo oscuro, el título necesita ser blanco/brillante */
-    {".main-header h1 { background: linear-gradient(90deg, #E0F7FA 0%, #38BDF8 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent; }" if modo_oscuro else ""}
-
-    .main-header p {{
-        font-size: 1.4rem;
-        color: {theme['text_color']};
-        margin-top: 15px;
-        font-weight: 500;
-        opacity: 0.8;
-    }}
-
-    /* Tarjetas de Contenido FLOTANTES */
-    .content-card {{
-        background: {theme['card_bg']};
-        backdrop-filter: blur(8px);
-        padding: 2.5rem;
-        border-radius: 20px;
-        box-shadow: 0 15px 35px {theme['shadow_color']};
-        border: 1px solid {theme['card_border']};
-        border-top: 6px solid #3498DB;
-        margin-bottom: 2rem;
-        transition: all 0.3s cubic-bezier(0.25, 0.8, 0.25, 1);
-    }}
-
-    .content-card:hover {{
-        transform: translateY(-5px);
-        box-shadow: 0 25px 50px rgba(52, 152, 219, 0.15);
-        border-top: 6px solid #2980B9;
-    }}
-
-    .section-title {{
-        font-size: 1.5rem;
-        font-weight: 700;
-        color: {theme['text_color']};
-        margin-bottom: 2rem;
-        display: flex;
-        align-items: center;
-        gap: 10px;
-    }}
-    
-    .section-title::after {{
-        content: "";
-        flex-grow: 1;
-        height: 2px;
-        background: {theme['section_line']};
-        margin-left: 15px;
-    }}
-
-    /* Botones VIBRANTES */
-    .stButton>button {{
-        background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-        color: white;
-        font-size: 1.2rem;
-        font-weight: 700;
-        padding: 1rem 2rem;
-        border-radius: 50px;
-        border: none;
-        box-shadow: 0 10px 20px rgba(79, 172, 254, 0.4);
-        transition: all 0.4s ease;
-        width: 100%;
-        text-transform: uppercase;
-        letter-spacing: 1.5px;
-    }}
-
-    .stButton>button:hover {{
-        transform: translateY(-3px) scale(1.02);
-        box-shadow: 0 15px 30px rgba(79, 172, 254, 0.6);
-        background: linear-gradient(135deg, #00f2fe 0%, #4facfe 100%);
-    }}
-
-    /* Inputs con estilo moderno */
-    .stNumberInput > div > div > input, .stSelectbox > div > div > div {{
-        background-color: {theme['input_bg']} !important;
-        border: 2px solid transparent !important;
-        border-radius: 12px !important;
-        color: {theme['input_text']} !important;
-        transition: all 0.3s ease;
-    }}
-    
-    .stNumberInput > div > div > input:focus, .stSelectbox > div > div > div:focus-within {{
-        background-color: {theme['card_bg']} !important;
-        border: 2px solid #3498DB !important;
-        box-shadow: 0 0 0 4px rgba(52, 152, 219, 0.1) !important;
-    }}
-    
-    /* Color del texto de la etiqueta del input */
-    .stNumberInput label, .stSelectbox label {{
-        color: {theme['text_color']} !important;
-    }}
-    
-    /* Ajuste para los iconos de ayuda */
-    .stTooltipIcon {{
-        color: {theme['text_color']} !important;
-    }}
-
-    /* Sidebar estilizado */
-    [data-testid="stSidebar"] {{
-        background: {theme['sidebar_bg']};
-        border-right: 1px solid {theme['card_border']};
-    }}
-    
-    /* Ajuste texto sidebar */
-    [data-testid="stSidebar"] p, [data-testid="stSidebar"] span, [data-testid="stSidebar"] h1, [data-testid="stSidebar"] h2, [data-testid="stSidebar"] h3 {{
-         color: {theme['text_color']} !important;
-    }}
-    
-    .sidebar-header {{
-        background: linear-gradient(135deg, #2C3E50 0%, #3498DB 100%);
-        color: white !important;
-        padding: 1.5rem;
-        border-radius: 16px;
-        text-align: center;
-        margin-bottom: 2rem;
-        box-shadow: 0 10px 20px rgba(44, 62, 80, 0.2);
-    }}
-    
-    .sidebar-header h2 {{
-        color: white !important;
-    }}
-
-    /* Cajas de Resultado IMPACTANTES */
-    .result-box {{
-        padding: 3rem;
-        border-radius: 24px;
-        text-align: center;
-        color: white;
-        position: relative;
-        overflow: hidden;
-        box-shadow: 0 20px 50px rgba(0,0,0,0.2);
-        backdrop-filter: blur(5px);
-    }}
-
-    .result-safe {{
-        background: linear-gradient(135deg, #00b09b 0%, #96c93d 100%);
-    }}
-
-    .result-danger {{
-        background: linear-gradient(135deg, #cb2d3e 0%, #ef473a 100%);
-    }}
-
-    .result-icon {{
-        font-size: 6rem;
-        margin-bottom: 1rem;
-        filter: drop-shadow(0 5px 15px rgba(0,0,0,0.2));
-        animation: float 3s ease-in-out infinite;
-    }}
-    
-    @keyframes float {{
-        0% {{ transform: translateY(0px); }}
-        50% {{ transform: translateY(-10px); }}
-        100% {{ transform: translateY(0px); }}
-    }}
-    
-    .result-title {{
-        font-size: 2.5rem;
-        font-weight: 800;
-        margin-bottom: 0.5rem;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        text-shadow: 0 2px 4px rgba(0,0,0,0.2);
-    }}
-    
-    .result-subtitle {{
-        font-size: 1.3rem;
-        opacity: 0.95;
-        font-weight: 500;
-    }}
-
-    /* Animaciones */
-    @keyframes fadeInUp {{
-        from {{ opacity: 0; transform: translateY(30px); }}
-        to {{ opacity: 1; transform: translateY(0); }}
-    }}
-    
-    .animate-fade-in {{
-        animation: fadeInUp 0.8s cubic-bezier(0.2, 0.8, 0.2, 1) forwards;
-    }}
-
-</style>
-""", unsafe_allow_html=True)
+# Paleta y hoja de estilos del tema elegido (se generan una vez por tema)
+st.markdown(css_tema(modo_oscuro), unsafe_allow_html=True)
 
 st.markdown("""
 <div class="main-header">
@@ -311,307 +68,621 @@ st.sidebar.markdown("""
 st.sidebar.markdown("### 🧠 Factores de Mayor Influencia")
 st.sidebar.caption("Variables que el modelo prioriza para su diagnóstico:")
 
-# Gráfico de Importancia de Factores (Simplificado para médicos)
-# Valores simulados representativos para este tipo de modelo
-factores = ['Respuesta al Esfuerzo', 'Frecuencia Cardíaca', 'Edad', 'Colesterol', 'IMC']
-importancia = [35, 25, 20, 15, 5] # Porcentajes aproximados para fines ilustrativos
-
-fig_importance = go.Figure(go.Bar(
-    x=importancia,
-    y=factores,
-    orientation='h',
-    marker=dict(
-        color=['#2C3E50', '#3498DB', '#1ABC9C', '#95A5A6', '#BDC3C7'],
-        line=dict(color='rgba(255, 255, 255, 0.5)', width=1)
-    ),
-    text=[f'{x}%' for x in importancia],
-    textposition='auto',
-    hovertemplate='%{y}: %{x}% de influencia<extra></extra>'
-))
-
-fig_importance.update_layout(
-    title='',
-    xaxis=dict(
-        showgrid=False, 
-        showticklabels=False, 
-        zeroline=False, 
-        range=[0, 45]
-    ),
-    yaxis=dict(
-        showgrid=False,
-        categoryorder='total ascending',
-        tickfont=dict(family='Inter', size=13, color='#2C3E50')
-    ),
-    plot_bgcolor='rgba(0,0,0,0)',
-    paper_bgcolor='rgba(0,0,0,0)',
-    height=250,
-    margin=dict(l=0, r=0, t=10, b=0),
-    showlegend=False
-)
-
+# La figura no depende de las entradas: se construye una vez por versión del modelo
+@st.cache_resource
+def figura_importancia(version):
+    import plotly.graph_objects as go
+
+    # Gráfico de Importancia de Factores (Simplificado para médicos)
+    # Importancia global real del modelo (disminución media de impureza, top 5)
+    importancias = importancias_para(artefactos)
+    orden = np.argsort(importancias)[::-1][:5]
+    factores = [ETIQUETAS.get(plantilla.feature_names[j], plantilla.feature_names[j]) for j in orden]
+    importancia = [round(float(importancias[j]) * 100, 1) for j in orden]
+
+    fig_importance = go.Figure(go.Bar(
+        x=importancia,
+        y=factores,
+        orientation='h',
+        marker=dict(
+            color=['#2C3E50', '#3498DB', '#1ABC9C', '#95A5A6', '#BDC3C7'],
+            line=dict(color='rgba(255, 255, 255, 0.5)', width=1)
+        ),
+        text=[f'{x}%' for x in importancia],
+        textposition='auto',
+        hovertemplate='%{y}: %{x}% de influencia<extra></extra>'
+    ))
+
+    fig_importance.update_layout(
+        title='',
+        xaxis=dict(
+            showgrid=False, 
+            showticklabels=False, 
+            zeroline=False, 
+            range=[0, max(importancia) * 1.25]
+        ),
+        yaxis=dict(
+            showgrid=False,
+            categoryorder='total ascending',
+            tickfont=dict(family='Inter', size=13, color='#2C3E50')
+        ),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=250,
+        margin=dict(l=0, r=0, t=10, b=0),
+        showlegend=False
+    )
+
+    return fig_importance, factores[0]
+
+
+fig_importance, factor_principal = figura_importancia(artefactos.version)
 st.sidebar.plotly_chart(fig_importance, use_container_width=True)
 
-st.sidebar.markdown("""
+st.sidebar.markdown(f"""
 <div style='background-color: #E8F6F3; padding: 1rem; border-radius: 8px; border: 1px solid #D1F2EB; margin-top: 1rem;'>
     <small style='color: #16A085;'>
-    <b>Nota Clínica:</b> El modelo da un peso significativo a la <i>"Respuesta al Esfuerzo"</i> (Oldpeak), lo que coincide con la literatura cardiológica sobre isquemia inducida.
+    <b>Nota Clínica:</b> El factor con mayor peso global en el modelo es <i>"{factor_principal}"</i>. Las contribuciones de cada paciente se muestran junto a su resultado.
     </small>
 </div>
 """, unsafe_allow_html=True)
 
+st.sidebar.caption(
+    f"Modelo v{artefactos.version} · cargado en {artefactos.tiempo_carga:.2f} s · "
+    f"{artefactos.tamano_bytes / 1e6:.1f} MB en memoria"
+)
+
+# Panel de administración: latencias reales por etapa (ventana móvil)
+if st.sidebar.toggle("🛠️ Panel de Administración", value=False):
+    st.sidebar.markdown("### ⏱️ Latencia por Etapa")
+    st.sidebar.dataframe(metricas.resumen(), hide_index=True, use_container_width=True)
+    estadisticas_lotes = lotificador_compartido().estadisticas()
+    st.sidebar.caption(
+        f"Lotificador: {estadisticas_lotes['solicitudes']:,} solicitudes en {estadisticas_lotes['lotes']:,} lotes · "
+        f"cola actual {estadisticas_lotes['profundidad_cola']}"
+    )
+    estadisticas_cache = cache_predicciones.estadisticas()
+    st.sidebar.caption(
+        f"Caché: {estadisticas_cache['aciertos']:,} aciertos / {estadisticas_cache['fallos']:,} fallos "
+        f"({estadisticas_cache['tasa_aciertos']:.0%}) · {estadisticas_cache['entradas']:,} entradas"
+    )
+    motor_para("interactivo", artefactos)   # Refresca la selección de variantes si cambió
+    st.sidebar.caption(
+        f"Variante del bosque: interactivo «{variante_activa('interactivo')}» · lotes «{variante_activa('lote')}»"
+    )
+    estadisticas_auditoria = bitacora.estadisticas()
+    if estadisticas_auditoria["activa"]:
+        st.sidebar.caption(
+            f"Auditoría: {estadisticas_auditoria['escritos']:,} registros escritos en {estadisticas_auditoria['lotes']:,} lotes · "
+            f"{estadisticas_auditoria['pendientes']:,} pendientes · {estadisticas_auditoria['descartados']:,} descartados"
+        )
+    else:
+        st.sidebar.caption("Auditoría desactivada (CARDIORISK_AUDITORIA=0)")
+    estadisticas_informes = generador_informes.estadisticas()
+    st.sidebar.caption(
+        f"Informes: {estadisticas_informes['pendiente'] + estadisticas_informes['en curso']} en preparación · "
+        f"{estadisticas_informes['listo']} listos · {estadisticas_informes['error']} con error"
+    )
+    estadisticas_envio = presentacion.estadisticas()
+    if estadisticas_envio["resultados"]:
+        st.sidebar.caption(
+            f"Resultado: {estadisticas_envio['bytes_promedio'] / 1e3:.1f} KB enviados en promedio · "
+            f"{estadisticas_envio['resultados']:,} resultados"
+        )
+    st.sidebar.download_button(
+        "⬇️ Exportar Métricas (Prometheus)",
+        data=metricas.exportar_prometheus(),
+        file_name="cardiorisk_metricas.prom",
+        mime="text/plain",
+        use_container_width=True,
+    )
+
+    # Deriva de las entradas frente a la media/escala de entrenamiento del escalador
+    st.sidebar.markdown("### 📈 Deriva de Entradas")
+    informe_deriva = monitor_para(artefactos).informe()
+    if informe_deriva:
+        st.sidebar.dataframe(
+            [
+                {
+                    "Variable": ETIQUETAS.get(fila["variable"], fila["variable"]),
+                    "Obs.": fila["observaciones"],
+                    "Media": round(fila["media"], 2),
+                    "Entrenamiento": round(fila["media_entrenamiento"], 2),
+                    "Desvío (σ)": round(fila["desplazamiento"], 2),
+                    "PSI": None if fila["psi"] is None else round(fila["psi"], 3),
+                }
+                for fila in informe_deriva
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        for fila in informe_deriva:
+            if fila["alerta"]:
+                st.sidebar.warning(f"Deriva en {ETIQUETAS.get(fila['variable'], fila['variable'])}: {fila['motivo']}")
+    else:
+        st.sidebar.caption("Sin predicciones observadas todavía.")
+
+# Historial de auditoría: se lee con una conexión de solo lectura (WAL), sin
+# esperar al hilo que escribe los registros nuevos.
+TAM_PAGINA_HISTORIAL = 20
+if st.sidebar.toggle("📜 Historial de Predicciones", value=False):
+    pagina = st.sidebar.number_input("Página", min_value=1, value=1, step=1)
+    registros_auditoria, total_auditoria = bitacora.historial(pagina - 1, TAM_PAGINA_HISTORIAL)
+    if registros_auditoria:
+        st.sidebar.dataframe(
+            [
+                {
+                    "Fecha": r["fecha"],
+                    "Origen": r["origen"],
+                    "Riesgo": f"{r['prob_riesgo']:.1%}",
+                    "Alto": "Sí" if r["riesgo_alto"] else "No",
+                    **{ETIQUETAS[campo]: r["entradas"].get(campo) for campo in CAMPOS_USUARIO},
+                    "Versión": r["version"],
+                }
+                for r in registros_auditoria
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+    st.sidebar.caption(
+        f"{total_auditoria:,} predicciones registradas · página {pagina} de "
+        f"{max(1, -(-total_auditoria // TAM_PAGINA_HISTORIAL))}"
+    )
+
 # --------------------------------------------------
 # INGRESO DE DATOS DEL USUARIO
 # --------------------------------------------------
 
 st.markdown("<div class='section-title'>📋 Expediente Clínico Digital</div>", unsafe_allow_html=True)
 
-col1, col2, col3 = st.columns(3, gap="large")
+tab_paciente, tab_lote = st.tabs(["👤 Paciente Individual", "📂 Evaluación por Lotes"])
 
-with col1:
-    st.markdown("#### 👤 Datos Demográficos")
-    age = st.number_input("Edad del Paciente", min_value=18, max_value=100, value=45, help="Edad en años cumplidos")
-    BMI = st.number_input("Índice de Masa Corporal (BMI)", min_value=10.0, max_value=60.0, value=24.5, help="Peso(kg) / Altura(m)²")
-
-with col2:
-    st.markdown("#### 🩸 Signos Vitales & Labs")
-    chol = st.number_input("Colesterol Total (mg/dL)", min_value=100.0, max_value=600.0, value=190.0, step=1.0)
-    thalch = st.number_input("Frecuencia Cardíaca Máx.", min_value=60, max_value=220, value=150, help="Ritmo cardíaco máximo alcanzado durante ejercicio")
-
-with col3:
-    st.markdown("#### 🩺 Antecedentes")
-    oldpeak = st.number_input("Depresión ST (Oldpeak)", min_value=0.0, max_value=6.0, value=0.0, step=0.1, help="Hallazgo en electrocardiograma")
-    diabetes = st.selectbox("Diagnóstico de Diabetes", [0, 1], format_func=lambda x: "Negativo" if x == 0 else "Positivo")
-    prevalentHyp = st.selectbox("Hipertensión Arterial", [0, 1], format_func=lambda x: "No diagnosticado" if x == 0 else "Diagnosticado")
-
-
-# Crear vector del usuario con los valores faltantes = 0
-input_dict = {col: 0 for col in feature_names}
+# --------------------------------------------------
+# INFORMES IMPRIMIBLES
+# --------------------------------------------------
+# Se generan en un pool de hilos del proceso; la sesión solo guarda el id del
+# trabajo y sondea su avance con un fragmento que se ejecuta a intervalos.
+INTERVALO_PROGRESO_S = 0.5
+
+
+def formato_informe(clave):
+    formatos = formatos_disponibles()
+    if len(formatos) == 1:
+        return formatos[0]
+    return st.radio("Formato del informe", formatos, horizontal=True, format_func=str.upper, key=clave)
+
+
+@st.fragment(run_every=INTERVALO_PROGRESO_S)
+def progreso_informe(id_trabajo, accion="Generando informe"):
+    trabajo = generador_informes.trabajo(id_trabajo)
+    if trabajo is None or trabajo.terminado:
+        st.rerun()      # La descarga (o el error) se muestra fuera del sondeo
+    texto = f"{accion}... {trabajo.hechos:,}"
+    if trabajo.total:
+        texto += f" de {trabajo.total:,}"
+    st.progress(trabajo.avance, text=texto)
+
+
+def seguimiento_informe(clave, accion="Generando informe"):
+    """Avance del informe guardado en ``st.session_state[clave]`` y, al terminar, su descarga."""
+    trabajo = generador_informes.trabajo(st.session_state.get(clave))
+    if trabajo is None:
+        return
+    if not trabajo.terminado:
+        progreso_informe(trabajo.id, accion)
+    elif trabajo.estado == "error":
+        st.error(f"No se pudo generar el informe: {trabajo.error}")
+    else:
+        with open(trabajo.ruta, "rb") as f:
+            st.download_button(
+                f"⬇️ Descargar {trabajo.nombre}",
+                data=f,
+                file_name=trabajo.nombre,
+                mime=trabajo.mime,
+                use_container_width=True,
+                key=f"descarga_{clave}",
+            )
 
-# Actualizar las variables que el usuario ingresa
-input_dict["age"] = age
-input_dict["BMI"] = BMI
-input_dict["chol"] = chol
-input_dict["thalch"] = thalch
-input_dict["oldpeak"] = oldpeak
-input_dict["diabetes"] = diabetes
-input_dict["prevalentHyp"] = prevalentHyp
 
-# Convertir en DataFrame
-df_user = pd.DataFrame([input_dict], columns=feature_names)
+# El expediente es un fragmento con un formulario: editar un campo no ejecuta
+# nada en el servidor, y "Calcular" solo vuelve a ejecutar este fragmento (no
+# el tema, el encabezado ni la barra lateral).
+@st.fragment
+def expediente_clinico():
+    inicio_fragmento = time.perf_counter()
+    # Bosque compilado (escalador plegado en los umbrales) de la variante interactiva: el
+    # mismo que da la probabilidad del gauge, también para la banda y el "¿qué pasaría si?"
+    motor = motor_para("interactivo", artefactos)
+
+    with st.form("expediente_clinico", border=False):
+        col1, col2, col3 = st.columns(3, gap="large")
+
+        with col1:
+            st.markdown("#### 👤 Datos Demográficos")
+            age = st.number_input("Edad del Paciente", min_value=18, max_value=100, value=45, help="Edad en años cumplidos")
+            BMI = st.number_input("Índice de Masa Corporal (BMI)", min_value=10.0, max_value=60.0, value=24.5, help="Peso(kg) / Altura(m)²")
+
+        with col2:
+            st.markdown("#### 🩸 Signos Vitales & Labs")
+            chol = st.number_input("Colesterol Total (mg/dL)", min_value=100.0, max_value=600.0, value=190.0, step=1.0)
+            thalch = st.number_input("Frecuencia Cardíaca Máx.", min_value=60, max_value=220, value=150, help="Ritmo cardíaco máximo alcanzado durante ejercicio")
+
+        with col3:
+            st.markdown("#### 🩺 Antecedentes")
+            oldpeak = st.number_input("Depresión ST (Oldpeak)", min_value=0.0, max_value=6.0, value=0.0, step=0.1, help="Hallazgo en electrocardiograma")
+            diabetes = st.selectbox("Diagnóstico de Diabetes", [0, 1], format_func=lambda x: "Negativo" if x == 0 else "Positivo")
+            prevalentHyp = st.selectbox("Hipertensión Arterial", [0, 1], format_func=lambda x: "No diagnosticado" if x == 0 else "Diagnosticado")
+            incluir_ruido = st.checkbox(
+                "Considerar error de medición",
+                help="Evalúa el paciente con pequeñas variaciones de IMC, colesterol, frecuencia y ST (Monte Carlo) para estimar el rango de riesgo.",
+            )
 
-# Estandarizar
-df_user_scaled = scaler.transform(df_user)
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
+        with col_btn2:
+            calcular_button = st.form_submit_button("🔍 Calcular Riesgo Cardiovascular", use_container_width=True)
+
+    # --------------------------------------------------
+    # RESULTADOS
+    # --------------------------------------------------
+    if calcular_button:
+        # Primero se consulta la caché compartida (entradas cuantizadas al paso de
+        # cada widget + versión del modelo). Si no está, el paciente se envía al
+        # lotificador del proceso: si otras sesiones piden una predicción al mismo
+        # tiempo, se evalúan juntas en una sola pasada del bosque.
+        paciente = {
+            "age": age,
+            "BMI": BMI,
+            "chol": chol,
+            "thalch": thalch,
+            "oldpeak": oldpeak,
+            "diabetes": diabetes,
+            "prevalentHyp": prevalentHyp,
+        }
+        with st.spinner('Procesando datos clínicos...'), metricas.medir("prediccion"):
+            resultado = predecir_paciente(paciente)
+        with metricas.medir("explicacion"):
+            contribuciones = explicador_para(artefactos).explicar(plantilla.vector(paciente))[0]
+        # Todas las muestras con ruido de medición se evalúan en un solo lote
+        ruido = None
+        if incluir_ruido:
+            with metricas.medir("monte_carlo"):
+                ruido = ruido_medicion(motor, plantilla, paciente)
+
+        # Se conserva la última evaluación: los controles del análisis "¿qué
+        # pasaría si?" vuelven a ejecutar el fragmento sin perder el resultado.
+        st.session_state["evaluacion"] = {
+            "paciente": paciente, "resultado": resultado, "contribuciones": contribuciones, "ruido": ruido,
+        }
+        # Historial acotado de la sesión: cada evaluación es una fila de tamaño fijo
+        st.session_state.setdefault("historial_sesion", HistorialSesion()).agregar(paciente, resultado)
+
+    evaluacion = st.session_state.get("evaluacion")
+    if evaluacion is not None:
+        paciente = evaluacion["paciente"]
+        resultado = evaluacion["resultado"]
+        contribuciones = evaluacion["contribuciones"]
+        ruido = evaluacion["ruido"]
+        pred = resultado["riesgo_alto"]
+        prob = resultado["prob_riesgo"]  # Probabilidad de alto riesgo
+
+        # Banda de confianza del gauge: rango con error de medición si se pidió;
+        # si no, IC del 95 % del promedio de los árboles del bosque.
+        if ruido is not None:
+            banda = ruido["intervalo"]
+            texto_banda = (
+                f"Con error de medición ({ruido['muestras']} simulaciones): {banda[0]:.1%} – {banda[1]:.1%} · "
+                f"{ruido['fraccion_alto']:.0%} de las simulaciones superan el umbral"
+            )
+        else:
+            banda = (resultado["ic_inferior"], resultado["ic_superior"])
+            texto_banda = f"IC 95 % del conjunto: {banda[0]:.1%} – {banda[1]:.1%}"
+        texto_banda += f" · {resultado['votos_alto']:.0%} de los árboles votan alto riesgo"
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # Piezas pre-armadas por rama y tema: solo se parchean el valor y la banda
+        with metricas.medir("render_resultado"):
+            animacion = None
+            if pred and calcular_button:
+                # La animación solo se reproduce al calcular; cada clic usa otra variante
+                animacion = st.session_state["variante_lluvia"] = st.session_state.get("variante_lluvia", -1) + 1
+            piezas = presentacion.armar_resultado(prob, banda, pred, modo_oscuro, animacion)
+
+            if piezas["animacion"] is not None:
+                st.markdown(piezas["animacion"], unsafe_allow_html=True)
+            st.markdown(piezas["banner"], unsafe_allow_html=True)
+            if not pred and calcular_button:
+                st.balloons()
+
+            col_res1, col_res2 = st.columns([1, 1.2], gap="large")
+
+            with col_res1:
+                st.markdown("#### 📊 Análisis Probabilístico")
+                st.plotly_chart(piezas["gauge"], use_container_width=True)
+                st.caption(texto_banda)
+
+            with col_res2:
+                st.markdown("#### 📝 Informe Médico Preliminar")
+                (st.error if pred else st.info)(piezas["interpretacion"])
+                st.markdown(piezas["recomendaciones"], unsafe_allow_html=True)
+        presentacion.registrar_envio(piezas["bytes"])
 
-# --------------------------------------------------
-# RESULTADOS
-# --------------------------------------------------
-st.markdown("<br>", unsafe_allow_html=True)
-
-col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
-with col_btn2:
-    calcular_button = st.button("🔍 Calcular Riesgo Cardiovascular", use_container_width=True)
-
-if calcular_button:
-    with st.spinner('Procesando datos clínicos...'):
-        time.sleep(1.5)
-
-    pred = modelo.predict(df_user_scaled)[0]
-    prob = modelo.predict_proba(df_user_scaled)[0][1]  # Probabilidad de alto riesgo
-
-    st.markdown("<br>", unsafe_allow_html=True)
-
-    if pred == 0:
-        # CASO BAJO RIESGO
-        st.markdown("""
-        <div class='result-box result-safe'>
-            <div class='result-icon'>🛡️</div>
-            <div class='result-title'>BAJO RIESGO CARDIOVASCULAR</div>
-            <div class='result-subtitle'>Análisis completado con éxito</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.balloons()
-
-        col_res1, col_res2 = st.columns([1, 1.2], gap="large")
-
-        with col_res1:
-            st.markdown("#### 📊 Análisis Probabilístico")
-            # Gauge Chart mejorado
-            fig_gauge = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=prob*100,
-                title={'text': "Probabilidad de Riesgo", 'font': {'size': 18, 'color': '#2C3E50'}},
-                number={'suffix': "%", 'font': {'size': 40, 'color': '#27AE60'}},
-                gauge={
-                    'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "#2C3E50"},
-                    'bar': {'color': "#27AE60"},
-                    'bgcolor': "white",
-                    'borderwidth': 1,
-                    'bordercolor': "#E9ECEF",
-                    'steps': [
-                        {'range': [0, 40], 'color': '#E8F8F5'},
-                        {'range': [40, 70], 'color': '#FEF9E7'},
-                        {'range': [70, 100], 'color': '#FADBD8'}
-                    ],
-                    'threshold': {
-                        'line': {'color': "#E74C3C", 'width': 4},
-                        'thickness': 0.75,
-                        'value': 50
-                    }
-                }
+        with col_res2:
+            formato = formato_informe("formato_informe_paciente")
+            if st.button("📄 Generar Informe Imprimible", use_container_width=True):
+                try:
+                    trabajo = generador_informes.informe_paciente(paciente, resultado, formato)
+                    st.session_state["informe_paciente"] = trabajo.id
+                except RuntimeError as e:
+                    st.warning(str(e))
+            seguimiento_informe("informe_paciente")
+
+        # --------------------------------------------------
+        # CONTRIBUCIONES DEL PACIENTE (TreeSHAP)
+        # --------------------------------------------------
+        # plotly recién al mostrar un resultado: pintar el formulario no lo necesita
+        import plotly.graph_objects as go
+
+        st.markdown("#### 🔬 ¿Qué impulsó este resultado?")
+        with metricas.medir("figura"):
+            orden = np.argsort(np.abs(contribuciones))[::-1][:8][::-1]
+            fig_contrib = go.Figure(go.Bar(
+                x=contribuciones[orden] * 100,
+                y=[ETIQUETAS.get(plantilla.feature_names[j], plantilla.feature_names[j]) for j in orden],
+                orientation='h',
+                marker=dict(color=['#E74C3C' if contribuciones[j] > 0 else '#27AE60' for j in orden]),
+                hovertemplate='%{y}: %{x:+.1f} puntos<extra></extra>'
             ))
-
-            fig_gauge.update_layout(
+            fig_contrib.update_layout(
                 height=300,
-                margin=dict(l=20, r=20, t=50, b=20),
+                margin=dict(l=0, r=0, t=10, b=0),
+                xaxis=dict(title='Puntos porcentuales sobre el riesgo base', zeroline=True),
+                plot_bgcolor='rgba(0,0,0,0)',
                 paper_bgcolor='rgba(0,0,0,0)',
                 font={'family': "Inter"}
             )
+        st.plotly_chart(fig_contrib, use_container_width=True)
+        st.caption(
+            f"Riesgo base del modelo: {explicador_para(artefactos).valor_base:.1%}. En rojo, factores que elevan el riesgo de este "
+            "paciente; en verde, los que lo reducen. Las variables que no están en el formulario se evalúan en 0."
+        )
+
+        # --------------------------------------------------
+        # ANÁLISIS "¿QUÉ PASARÍA SI?"
+        # --------------------------------------------------
+        # Cada curva o mapa de calor es una sola matriz evaluada de una vez
+        with st.expander("🔀 ¿Qué pasaría si...? (Análisis de Sensibilidad)"):
+            st.caption("Varía una o dos variables del paciente evaluado en todo su rango; el resto de los datos queda fijo.")
+            variables_barrido = st.radio("Variables a modificar", ["Una", "Dos"], horizontal=True)
+
+            if variables_barrido == "Una":
+                variable = st.selectbox("Variable", CAMPOS_USUARIO, format_func=ETIQUETAS.get)
+                with metricas.medir("sensibilidad"):
+                    valores, probs = barrido(motor, plantilla, paciente, variable, puntos=200)
+                    fig_barrido = go.Figure(go.Scatter(
+                        x=valores, y=probs * 100, mode='lines', line=dict(color='#3498DB', width=3, shape='hv'),
+                        hovertemplate=f'{ETIQUETAS[variable]}: %{{x}}<br>Riesgo: %{{y:.1f}}%<extra></extra>'
+                    ))
+                    fig_barrido.add_trace(go.Scatter(
+                        x=[paciente[variable]], y=[prob * 100], mode='markers',
+                        marker=dict(size=12, color='#E74C3C' if pred else '#27AE60', line=dict(color='white', width=2)),
+                        hovertemplate='Paciente actual: %{y:.1f}%<extra></extra>'
+                    ))
+                    fig_barrido.add_hline(y=50, line_dash='dash', line_color='#95A5A6')
+                    fig_barrido.update_layout(
+                        height=350,
+                        margin=dict(l=0, r=0, t=10, b=0),
+                        xaxis=dict(title=ETIQUETAS[variable]),
+                        yaxis=dict(title='Probabilidad de Riesgo (%)', range=[0, 100]),
+                        showlegend=False,
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font={'family': "Inter"}
+                    )
+            else:
+                col_x, col_y = st.columns(2)
+                variable_x = col_x.selectbox("Eje horizontal", CAMPOS_USUARIO, index=1, format_func=ETIQUETAS.get)
+                variable_y = col_y.selectbox(
+                    "Eje vertical", [c for c in CAMPOS_USUARIO if c != variable_x], format_func=ETIQUETAS.get
+                )
+                resolucion = st.slider("Puntos por eje", min_value=10, max_value=100, value=100, step=10)
+                with metricas.medir("sensibilidad"):
+                    valores_x, valores_y, probs = barrido_doble(
+                        motor, plantilla, paciente, variable_x, variable_y, puntos=resolucion
+                    )
+                    fig_barrido = go.Figure(go.Heatmap(
+                        x=valores_x, y=valores_y, z=probs * 100, zmin=0, zmax=100,
+                        colorscale=[[0, '#27AE60'], [0.5, '#F9E79F'], [1, '#E74C3C']],
+                        colorbar=dict(title='Riesgo %'),
+                        hovertemplate=f'{ETIQUETAS[variable_x]}: %{{x}}<br>{ETIQUETAS[variable_y]}: %{{y}}<br>Riesgo: %{{z:.1f}}%<extra></extra>'
+                    ))
+                    fig_barrido.add_trace(go.Scatter(
+                        x=[paciente[variable_x]], y=[paciente[variable_y]], mode='markers',
+                        marker=dict(size=12, color='white', line=dict(color='#2C3E50', width=2)),
+                        hovertemplate='Paciente actual<extra></extra>'
+                    ))
+                    fig_barrido.update_layout(
+                        height=400,
+                        margin=dict(l=0, r=0, t=10, b=0),
+                        xaxis=dict(title=ETIQUETAS[variable_x]),
+                        yaxis=dict(title=ETIQUETAS[variable_y]),
+                        showlegend=False,
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        font={'family': "Inter"}
+                    )
+            st.plotly_chart(fig_barrido, use_container_width=True)
+
+        # --------------------------------------------------
+        # COMPARACIÓN CON EVALUACIONES ANTERIORES
+        # --------------------------------------------------
+        # La tendencia toma las columnas del búfer circular sobre un esqueleto de
+        # figura ya armado: no se crean DataFrames ni se rehace la figura.
+        historial = st.session_state.setdefault("historial_sesion", HistorialSesion())
+        with st.expander(f"🕘 Comparar con Evaluaciones Anteriores ({len(historial)})"):
+            capacidad = st.number_input(
+                "Evaluaciones a conservar en esta sesión", min_value=5, max_value=CAPACIDAD_MAXIMA,
+                value=historial.capacidad, step=5, key="capacidad_historial",
+                help=f"Al superar el límite se descartan las más antiguas (por defecto {CAPACIDAD}).",
+            )
+            historial.redimensionar(capacidad)
+
+            previa = historial.anterior()
+            if previa is None:
+                st.info("Calcule otra evaluación para compararla con esta.")
+            else:
+                col_h1, col_h2 = st.columns(2)
+                col_h1.metric(
+                    "Riesgo actual", f"{prob:.1%}",
+                    delta=f"{(prob - float(previa['prob_riesgo'])) * 100:+.1f} puntos",
+                    delta_color="inverse",
+                )
+                cambios = [
+                    f"{ETIQUETAS[campo]}: {previa[campo].item():g} → {paciente[campo]:g}"
+                    for campo in CAMPOS_USUARIO if float(previa[campo]) != float(np.float32(paciente[campo]))
+                ]
+                col_h2.markdown(
+                    f"**Cambios frente a la evaluación #{int(previa['numero'])}**\n\n"
+                    + ("\n".join(f"- {cambio}" for cambio in cambios) if cambios else "Sin cambios en los datos.")
+                )
+
+            with metricas.medir("figura_historial"):
+                fig_historial = presentacion.figura_tendencia(historial.registros(), modo_oscuro)
+            st.plotly_chart(fig_historial, use_container_width=True)
+            st.caption(
+                f"Se muestran las últimas {len(historial)} de {historial.total} evaluaciones de esta sesión "
+                f"(límite {historial.capacidad})."
+            )
+            st.button("🗑️ Borrar historial", key="borrar_historial", on_click=historial.limpiar)
 
-            st.plotly_chart(fig_gauge, use_container_width=True)
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.warning("⚠️ **Aviso Legal:** Esta herramienta NO sustituye el diagnóstico de un profesional de la salud.")
 
-        with col_res2:
-            st.markdown("#### 📝 Informe Médico Preliminar")
-            st.info("""
-            **Interpretación:**
-            Los parámetros clínicos ingresados sugieren una baja probabilidad de desarrollar complicaciones cardiovasculares en el corto plazo.
-            """)
-            
-            st.markdown("""
-            <div style='background-color: #F8F9FA; padding: 1.5rem; border-radius: 10px; border-left: 4px solid #27AE60;'>
-                <h5 style='color: #27AE60; margin:0;'>✅ Recomendaciones Preventivas</h5>
-                <ul style='margin-top: 0.5rem; padding-left: 1.2rem; color: #555;'>
-                    <li>Mantener actividad física moderada (30 min/día).</li>
-                    <li>Dieta balanceada baja en sodio y grasas saturadas.</li>
-                    <li>Control anual de perfil lipídico.</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
+    metricas.observar("rerun_expediente", time.perf_counter() - inicio_fragmento)
 
-    else:
-        # CASO ALTO RIESGO
-        
-        # Efecto Lluvia de Calaveras (Solo CSS para evitar errores de traducción)
-        import random
-        
-        # Generamos el CSS dinámicamente para que sea aleatorio pero seguro
-        css_animation = """
-        <style>
-            @keyframes fall {
-                0% { top: -10vh; opacity: 1; transform: rotate(0deg); }
-                100% { top: 105vh; opacity: 0; transform: rotate(360deg); }
-            }
-            .skull-drop {
-                position: fixed;
-                z-index: 9999;
-                user-select: none;
-                pointer-events: none;
-                font-size: 2.5rem;
-                animation-name: fall;
-                animation-timing-function: linear;
-                animation-fill-mode: forwards;
-            }
-        """
-        
-        # Creamos 30 clases de animación aleatorias
-        skull_html = '<div class="notranslate">'
-        for i in range(30):
-            left = random.randint(0, 100)
-            duration = random.uniform(2, 5)
-            delay = random.uniform(0, 3)
-            
-            # Definimos la clase CSS específica para esta calavera
-            css_animation += f"""
-            .skull-{i} {{
-                left: {left}vw;
-                animation-duration: {duration}s;
-                animation-delay: {delay}s;
-            }}
-            """
-            # Agregamos el div usando esa clase
-            skull_html += f'<div class="skull-drop skull-{i}">💀</div>'
-            
-        css_animation += "</style>"
-        skull_html += "</div>"
-        
-        # Renderizamos todo junto
-        st.markdown(css_animation + skull_html, unsafe_allow_html=True)
- 
-        
-        st.markdown("""
-        <style>
-            @keyframes pulse-red {
-                0% { box-shadow: 0 0 0 0 rgba(231, 76, 60, 0.7); }
-                70% { box-shadow: 0 0 0 20px rgba(231, 76, 60, 0); }
-                100% { box-shadow: 0 0 0 0 rgba(231, 76, 60, 0); }
-            }
-            .result-danger {
-                animation: pulse-red 2s infinite;
-            }
-        </style>
-        <div class='result-box result-danger'>
-            <div class='result-icon'>⚠️</div>
-            <div class='result-title' style='font-family: "Arial Black", sans-serif; letter-spacing: 2px;'>ALTO RIESGO DETECTADO</div>
-            <div class='result-subtitle'>Se sugiere atención médica prioritaria</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        col_res1, col_res2 = st.columns([1, 1.2], gap="large")
-
-        with col_res1:
-            st.markdown("#### 📊 Análisis Probabilístico")
-            # Gauge Chart Alerta
-            fig_gauge = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=prob*100,
-                title={'text': "Probabilidad de Riesgo", 'font': {'size': 18, 'color': '#2C3E50'}},
-                number={'suffix': "%", 'font': {'size': 40, 'color': '#C0392B'}},
-                gauge={
-                    'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "#2C3E50"},
-                    'bar': {'color': "#E74C3C"},
-                    'bgcolor': "white",
-                    'borderwidth': 1,
-                    'bordercolor': "#E9ECEF",
-                    'steps': [
-                        {'range': [0, 40], 'color': '#E8F8F5'},
-                        {'range': [40, 70], 'color': '#FEF9E7'},
-                        {'range': [70, 100], 'color': '#FADBD8'}
-                    ],
-                    'threshold': {
-                        'line': {'color': "red", 'width': 4},
-                        'thickness': 0.75,
-                        'value': 50
-                    }
-                }
-            ))
 
-            fig_gauge.update_layout(
-                height=300,
-                margin=dict(l=20, r=20, t=50, b=20),
-                paper_bgcolor='rgba(0,0,0,0)',
-                font={'family': "Inter"}
+with tab_paciente:
+    expediente_clinico()
+
+# --------------------------------------------------
+# EVALUACIÓN POR LOTES (CSV / PARQUET)
+# --------------------------------------------------
+# Confianza de la evaluación anticipada en el tamizaje rápido
+CONFIANZA_TAMIZAJE = 0.99
+
+# Los widgets del lote solo vuelven a ejecutar su propio fragmento
+@st.fragment
+def evaluacion_por_lotes():
+    st.markdown("#### 📂 Tamizaje de Listados de Pacientes")
+    st.caption(
+        "Suba un archivo CSV o Parquet con una fila por paciente. Las columnas se emparejan con las "
+        "variables del modelo; las que falten se completan con 0, igual que en el formulario."
+    )
+
+    archivo_lote = st.file_uploader("Archivo de pacientes", type=["csv", "parquet"])
+    tam_bloque = st.number_input("Filas por bloque", min_value=1_000, max_value=200_000, value=lotes.TAM_BLOQUE, step=1_000)
+    tamizaje_rapido = st.checkbox(
+        "Tamizaje rápido (solo etiqueta)",
+        help="Detiene la evaluación de cada paciente en cuanto el resultado ya no puede cambiar (confianza 99 %). "
+             "No entrega la probabilidad, solo la clasificación y los árboles evaluados.",
+    )
+
+    if archivo_lote is not None and st.button("📊 Procesar Lote", use_container_width=True):
+        barra = st.progress(0.0, text="Procesando lote...")
+
+        def al_avanzar(avance, filas, filas_por_segundo):
+            barra.progress(avance, text=f"{filas:,} filas evaluadas · {filas_por_segundo:,.0f} filas/s")
+
+        # Los resultados se escriben al disco bloque a bloque; solo se conserva la ruta
+        anterior = st.session_state.pop("resultado_lote", None)
+        st.session_state.pop("informe_lote", None)
+        st.session_state.pop("contribuciones_lote", None)
+        if anterior is not None and os.path.exists(anterior["ruta"]):
+            os.remove(anterior["ruta"])
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as destino:
+            ruta_resultados = destino.name
+
+        try:
+            resumen = lotes.puntuar_archivo(
+                archivo_lote, archivo_lote.name, ruta_resultados, motor_para("lote", artefactos), plantilla,
+                tam_bloque=int(tam_bloque), al_avanzar=al_avanzar,
+                confianza=CONFIANZA_TAMIZAJE if tamizaje_rapido else None,
+                monitor=monitor_para(artefactos),
             )
+        except lotes.errores_de_lectura() as error:
+            # Archivo vacío, CSV mal formado o Parquet dañado: se descarta lo escrito hasta el error
+            os.remove(ruta_resultados)
+            barra.empty()
+            st.error(f"No se pudo leer «{archivo_lote.name}»: {error}")
+        else:
+            barra.progress(1.0, text="Lote completado")
+            st.session_state["resultado_lote"] = {
+                "ruta": ruta_resultados, "nombre": archivo_lote.name, "version": artefactos.version,
+                "solo_etiqueta": tamizaje_rapido, **resumen,
+            }
 
-            st.plotly_chart(fig_gauge, use_container_width=True)
+    resultado_lote = st.session_state.get("resultado_lote")
+    if resultado_lote is not None and os.path.exists(resultado_lote["ruta"]):
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Pacientes evaluados", f"{resultado_lote['filas']:,}")
+        m2.metric("Alto riesgo", f"{resultado_lote['alto_riesgo']:,}")
+        m3.metric("Rendimiento", f"{resultado_lote['filas_por_segundo']:,.0f} filas/s")
+        m4.metric("Árboles por paciente", f"{resultado_lote['arboles_promedio']:.1f} / {motor_para('lote', artefactos).n_arboles}")
+        if resultado_lote.get("filas_invalidas"):
+            st.warning(
+                f"{resultado_lote['filas_invalidas']:,} filas tienen valores no numéricos y no se evaluaron; "
+                f"el motivo está en la columna «{lotes.COLUMNA_ERROR}» de los resultados."
+            )
 
-        with col_res2:
-            st.markdown("#### 📝 Informe Médico Preliminar")
-            st.error("""
-            **Interpretación:**
-            El modelo ha detectado patrones consistentes con un riesgo elevado de enfermedad cardiovascular.
-            """)
-
-            st.markdown("""
-            <div style='background-color: #FFF5F5; padding: 1.5rem; border-radius: 10px; border-left: 4px solid #E74C3C;'>
-                <h5 style='color: #E74C3C; margin:0;'>🚨 Plan de Acción Sugerido</h5>
-                <ul style='margin-top: 0.5rem; padding-left: 1.2rem; color: #555;'>
-                    <li>Agendar consulta cardiológica a la brevedad.</li>
-                    <li>Monitoreo frecuente de presión arterial.</li>
-                    <li>Revisión estricta de dieta y medicación.</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
-
-    st.markdown("<br>", unsafe_allow_html=True)
-    st.warning("⚠️ **Aviso Legal:** Esta herramienta NO sustituye el diagnóstico de un profesional de la salud.")
+        with open(resultado_lote["ruta"], "rb") as f:
+            st.download_button(
+                "⬇️ Descargar Resultados (CSV)",
+                data=f,
+                file_name=f"riesgo_{resultado_lote['nombre'].rsplit('.', 1)[0]}.csv",
+                mime="text/csv",
+                use_container_width=True,
+            )
 
+        # Un informe por paciente en un ZIP, generado en segundo plano (necesita la probabilidad)
+        if not resultado_lote.get("solo_etiqueta"):
+            formato = formato_informe("formato_informe_lote")
+            if st.button("📄 Generar Informes por Paciente (ZIP)", use_container_width=True):
+                try:
+                    trabajo = generador_informes.informe_lote(
+                        resultado_lote["ruta"], resultado_lote["nombre"], resultado_lote.get("version"),
+                        total=resultado_lote["filas"], formato=formato,
+                    )
+                    st.session_state["informe_lote"] = trabajo.id
+                except RuntimeError as e:
+                    st.warning(str(e))
+            seguimiento_informe("informe_lote")
+
+        # TreeSHAP exacto va a unas decenas de filas/s: solo las primeras filas y en segundo plano
+        filas_explicadas = min(resultado_lote["filas"], MAX_FILAS_CONTRIBUCIONES)
+        if st.button(
+            f"🧮 Contribuciones por Variable (TreeSHAP, primeras {filas_explicadas:,} filas)",
+            use_container_width=True,
+            help="Un CSV con una columna contrib_<variable> por cada variable del modelo, "
+                 f"para las primeras {MAX_FILAS_CONTRIBUCIONES:,} filas del lote.",
+        ):
+            try:
+                trabajo = generador_informes.contribuciones_lote(
+                    resultado_lote["ruta"], resultado_lote["nombre"], explicador_para(artefactos), plantilla,
+                    total=resultado_lote["filas"],
+                )
+                st.session_state["contribuciones_lote"] = trabajo.id
+            except RuntimeError as e:
+                st.warning(str(e))
+        seguimiento_informe("contribuciones_lote", "Calculando contribuciones")
+
+
+with tab_lote:
+    evaluacion_por_lotes()
+
+metricas.observar("rerun", time.perf_counter() - inicio_rerun)
+
+# Con la página ya enviada, se calienta en segundo plano lo que no hace falta para
+# pintar el formulario (explicador TreeSHAP, predicción de prueba, micro-lotes,
+# figuras de plotly). Solo corre una vez por proceso.
+iniciar_calentamiento()
@@ -0,0 +1 @@
+"""Núcleo de inferencia de CardioRisk AI (carga de artefactos y predicción)."""
@@ -0,0 +1,3 @@
+from cardiorisk.cli import main
+
+main()
@@ -0,0 +1,240 @@
+"""Arranque en frío: calentamiento en segundo plano e informe de tiempos.
+
+El primer rerun de ``app.py`` solo necesita los artefactos (bosque compacto
+mapeado con ``mmap``, unos ms) y la importancia global para pintar la barra
+lateral y el formulario. Lo que se usa recién al pulsar *Calcular* o al abrir
+la pestaña de lotes se prepara en un hilo de fondo, una vez por proceso,
+después de enviar la primera página:
+
+* el explicador TreeSHAP (precálculo de caminos, unos cientos de ms),
+* una predicción de prueba (primer paso por el bosque y por ``resumen_votos``),
+* el hilo del ``MicroLotificador`` compartido,
+* la serialización de figuras de plotly (validadores de las trazas usadas).
+
+``pandas`` no se importa aquí a propósito: plotly consulta ``sys.modules`` para
+decidir si convertir Series, y un import a medias en otro hilo hace fallar las
+figuras de la sesión. La pestaña de lotes lo importa cuando lo necesita.
+
+Cada paso se registra en ``cardiorisk.metricas`` como ``calentamiento_<paso>``.
+Si una sesión pide algo antes de que el hilo termine, simplemente lo construye
+ella (las cachés por versión tienen su propio lock y no se duplica trabajo).
+
+Informe de arranque en frío (cada medición en un proceso nuevo)::
+
+    python -m cardiorisk.arranque [--json informe.json]
+"""
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import threading
+
+from cardiorisk.metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+# Paciente de prueba: los valores por defecto del formulario
+PACIENTE_PRUEBA = {"age": 45, "BMI": 24.5, "chol": 190.0, "thalch": 150, "oldpeak": 0.0, "diabetes": 0, "prevalentHyp": 0}
+
+# Módulos cuyo tiempo de importación se informa (cada uno en un proceso nuevo)
+MODULOS_INFORME = (
+    "numpy",
+    "streamlit",
+    "plotly.graph_objects",
+    "pandas",
+    "pyarrow",
+    "joblib",
+    "sklearn.ensemble",
+    "cardiorisk.registro",
+    "cardiorisk.inferencia",
+    "cardiorisk.explicacion",
+)
+
+_hilo = None
+_listo = threading.Event()
+_lock = threading.Lock()
+
+
+def _explicador():
+    from cardiorisk.explicacion import explicador_para
+    from cardiorisk.registro import registro
+
+    explicador_para(registro.obtener())
+
+
+def _prediccion():
+    from cardiorisk.inferencia import predecir_pacientes
+
+    # Directo al bosque: no deja una entrada falsa en la caché de predicciones
+    predecir_pacientes([PACIENTE_PRUEBA])
+
+
+def _lotificador():
+    from cardiorisk.inferencia import lotificador_compartido
+
+    lotificador_compartido()
+
+
+def _figuras():
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Indicator(mode="gauge+number", value=50, gauge={"axis": {"range": [0, 100]}}))
+    fig.add_trace(go.Bar(x=[1.0], y=["a"], orientation="h"))
+    fig.add_trace(go.Scatter(x=[0, 1], y=[0, 1]))
+    fig.add_trace(go.Heatmap(z=[[0, 1], [1, 0]]))
+    fig.to_json()
+
+
+PASOS = (
+    ("explicador", _explicador),
+    ("prediccion", _prediccion),
+    ("lotificador", _lotificador),
+    ("figuras", _figuras),
+)
+
+
+def _calentar():
+    try:
+        for nombre, paso in PASOS:
+            try:
+                with metricas.medir(f"calentamiento_{nombre}"):
+                    paso()
+            except Exception:
+                # Un paso fallido no impide los demás; la sesión lo hará al usarlo
+                logger.exception("Falló el calentamiento de %s", nombre)
+    finally:
+        _listo.set()
+
+
+def iniciar_calentamiento():
+    """Lanza el hilo de calentamiento la primera vez que se llama en el proceso."""
+    global _hilo
+    if _hilo is None:
+        with _lock:
+            if _hilo is None:
+                _hilo = threading.Thread(target=_calentar, name="calentamiento", daemon=True)
+                _hilo.start()
+    return _hilo
+
+
+def esperar_calentamiento(timeout=None):
+    """Bloquea hasta que termine el calentamiento; ``False`` si vence ``timeout``."""
+    return _listo.wait(timeout)
+
+
+# --------------------------------------------------
+# INFORME DE ARRANQUE EN FRÍO
+# --------------------------------------------------
+def medir_en_proceso_nuevo(codigo):
+    """Ejecuta ``codigo`` en un intérprete nuevo; debe imprimir un JSON en la última línea."""
+    from cardiorisk.registro import DIRECTORIO_BASE
+
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], capture_output=True, text=True, check=True, cwd=DIRECTORIO_BASE,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+_CODIGO_IMPORTACION = """
+import json, time
+t0 = time.perf_counter()
+import {modulo}
+print(json.dumps(time.perf_counter() - t0))
+"""
+
+_CODIGO_ARTEFACTOS = """
+import json, time, warnings
+warnings.filterwarnings("ignore")
+from cardiorisk.registro import RegistroModelos
+from cardiorisk.explicacion import ExplicadorTreeSHAP, importancias_globales
+resultado = {{}}
+t0 = time.perf_counter()
+artefactos = RegistroModelos(ruta_compacto={ruta_compacto}).obtener()
+resultado["carga_s"] = time.perf_counter() - t0
+t0 = time.perf_counter()
+importancias_globales(artefactos.motor_crudo)
+resultado["importancias_s"] = time.perf_counter() - t0
+t0 = time.perf_counter()
+ExplicadorTreeSHAP(artefactos.motor_crudo)
+resultado["explicador_s"] = time.perf_counter() - t0
+print(json.dumps(resultado))
+"""
+
+_CODIGO_APP = """
+import json, sys, time, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+from cardiorisk.arranque import esperar_calentamiento
+from cardiorisk.auditoria import redirigir_a_temporal
+from cardiorisk.registro import DIRECTORIO_BASE
+redirigir_a_temporal()
+resultado = {}
+at = AppTest.from_file(str(DIRECTORIO_BASE / "app.py"), default_timeout=120)
+t0 = time.perf_counter()
+at.run()
+resultado["primer_rerun_s"] = time.perf_counter() - t0
+resultado["modulos_pesados_al_pintar"] = [
+    m for m in ("pandas", "sklearn", "joblib", "scipy", "plotly") if m in sys.modules
+]
+t0 = time.perf_counter()
+esperar_calentamiento(120)
+resultado["calentamiento_restante_s"] = time.perf_counter() - t0
+t0 = time.perf_counter()
+at.run()
+resultado["segundo_rerun_s"] = time.perf_counter() - t0
+calcular = next(b for b in at.button if "Calcular" in b.label)
+t0 = time.perf_counter()
+calcular.click().run()
+resultado["calcular_s"] = time.perf_counter() - t0
+print(json.dumps(resultado))
+"""
+
+
+def informe_arranque():
+    """Tiempos de importación, carga de artefactos y primer rerun, en procesos nuevos."""
+    from cardiorisk.registro import RUTA_COMPACTO
+
+    informe = {"importacion_s": {}}
+    for modulo in MODULOS_INFORME:
+        try:
+            informe["importacion_s"][modulo] = medir_en_proceso_nuevo(_CODIGO_IMPORTACION.format(modulo=modulo))
+        except subprocess.CalledProcessError:
+            informe["importacion_s"][modulo] = None      # Dependencia opcional no instalada
+    informe["compacto"] = medir_en_proceso_nuevo(_CODIGO_ARTEFACTOS.format(ruta_compacto=repr(str(RUTA_COMPACTO))))
+    informe["joblib"] = medir_en_proceso_nuevo(_CODIGO_ARTEFACTOS.format(ruta_compacto=None))
+    informe["app"] = medir_en_proceso_nuevo(_CODIGO_APP)
+    return informe
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cardiorisk.arranque", description=__doc__.splitlines()[0])
+    parser.add_argument("--json", help="Además, guarda el informe en este archivo")
+    args = parser.parse_args(argv)
+
+    informe = informe_arranque()
+    print("Importación (proceso nuevo):")
+    for modulo, segundos in informe["importacion_s"].items():
+        print(f"  {modulo:<24} {'no instalado' if segundos is None else f'{segundos * 1e3:8.1f} ms'}")
+    for origen in ("compacto", "joblib"):
+        datos = informe[origen]
+        print(
+            f"Artefactos ({origen}): carga {datos['carga_s'] * 1e3:.1f} ms · importancias "
+            f"{datos['importancias_s'] * 1e3:.1f} ms · explicador {datos['explicador_s'] * 1e3:.1f} ms"
+        )
+    app = informe["app"]
+    print(
+        f"App: primer rerun {app['primer_rerun_s'] * 1e3:.0f} ms · segundo {app['segundo_rerun_s'] * 1e3:.0f} ms · "
+        f"calcular {app['calcular_s'] * 1e3:.0f} ms · calentamiento pendiente tras pintar "
+        f"{app['calentamiento_restante_s'] * 1e3:.0f} ms"
+    )
+    print(f"Módulos pesados cargados al pintar: {', '.join(app['modulos_pesados_al_pintar']) or 'ninguno'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
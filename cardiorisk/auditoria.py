@@ -0,0 +1,288 @@
+"""Bitácora de auditoría de predicciones, asíncrona y de solo agregado.
+
+Cada predicción individual (formulario de la app y servicio HTTP) se registra
+con sus entradas, probabilidad, etiqueta, versión del modelo y fecha. El
+camino de la predicción solo encola el registro; un hilo escritor lo agrupa
+con los demás pendientes y los inserta por lotes en SQLite en modo WAL, en
+una sola transacción por lote.
+
+* **Memoria acotada**: la cola tiene ``capacidad`` registros como máximo.
+* **Contrapresión**: si la cola está llena (disco lento o bloqueado), quien
+  registra espera hasta ``espera_maxima`` segundos; solo si aun así no hay
+  lugar, el registro se descarta, se cuenta y se avisa en el log.
+* **Solo agregado**: triggers de SQLite rechazan ``UPDATE`` y ``DELETE``.
+* **Lecturas sin bloqueo**: el historial abre una conexión de solo lectura;
+  con WAL los lectores no esperan al escritor ni lo detienen.
+
+Si un lote no se puede escribir, se reintenta sin perderlo mientras la cola
+sigue acumulando (y aplicando contrapresión) detrás.
+
+Configuración por entorno:
+
+* ``CARDIORISK_AUDITORIA_RUTA``: archivo SQLite de la bitácora (por defecto
+  ``auditoria.sqlite3`` junto a los artefactos).
+* ``CARDIORISK_AUDITORIA=0``: desactiva la bitácora; no se registra nada.
+
+Los arneses de medición y de carga (``cardiorisk.rendimiento``,
+``cardiorisk.prueba_carga``, ``cardiorisk.arranque``) llaman a
+``redirigir_a_temporal`` para que sus clics sintéticos no lleguen a la
+bitácora clínica.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from cardiorisk.registro import DIRECTORIO_BASE
+
+logger = logging.getLogger(__name__)
+
+RUTA_AUDITORIA = os.environ.get("CARDIORISK_AUDITORIA_RUTA") or DIRECTORIO_BASE / "auditoria.sqlite3"
+ACTIVA = os.environ.get("CARDIORISK_AUDITORIA", "1").strip().lower() not in ("0", "no", "false", "off")
+
+CAPACIDAD = 10_000          # Registros pendientes como máximo en memoria
+MAX_LOTE = 500              # Registros por transacción
+INTERVALO_S = 0.5           # Espera máxima para juntar un lote
+ESPERA_MAXIMA_S = 0.5       # Contrapresión: espera de quien registra con la cola llena
+REINTENTO_S = 1.0           # Pausa antes de reintentar un lote fallido
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS predicciones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha REAL NOT NULL,
+    origen TEXT NOT NULL,
+    version TEXT,
+    prob_riesgo REAL,
+    riesgo_alto INTEGER,
+    votos_alto REAL,
+    entradas TEXT NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS predicciones_sin_update BEFORE UPDATE ON predicciones
+BEGIN SELECT RAISE(ABORT, 'la bitácora de auditoría es de solo agregado'); END;
+CREATE TRIGGER IF NOT EXISTS predicciones_sin_delete BEFORE DELETE ON predicciones
+BEGIN SELECT RAISE(ABORT, 'la bitácora de auditoría es de solo agregado'); END;
+"""
+
+_INSERTAR = (
+    "INSERT INTO predicciones (fecha, origen, version, prob_riesgo, riesgo_alto, votos_alto, entradas) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class BitacoraAuditoria:
+    """Cola acotada de registros con un hilo que los escribe por lotes en SQLite.
+
+    El hilo escritor arranca con el primer registro, así que importar el
+    módulo no crea archivos ni hilos. Con ``activa=False`` no se registra nada.
+    """
+
+    def __init__(self, ruta=RUTA_AUDITORIA, capacidad=CAPACIDAD, max_lote=MAX_LOTE, intervalo_s=INTERVALO_S,
+                 espera_maxima_s=ESPERA_MAXIMA_S, activa=ACTIVA):
+        self.ruta = str(ruta)
+        self.activa = activa
+        self.max_lote = max_lote
+        self.intervalo_s = intervalo_s
+        self.espera_maxima_s = espera_maxima_s
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._encolados = 0
+        self._escritos = 0
+        self._descartados = 0
+        self._lotes = 0
+        self._fallos = 0
+        self._ultimo_lote_ms = None
+
+    # --------------------------------------------------
+    # ESCRITURA
+    # --------------------------------------------------
+    def registrar(self, paciente, resultado, origen):
+        """Encola una predicción; devuelve ``False`` si se descartó por cola llena o la bitácora está desactivada."""
+        if not self.activa:
+            return False
+        self._iniciar()
+        registro = (
+            time.time(),
+            origen,
+            resultado.get("version"),
+            resultado.get("prob_riesgo"),
+            resultado.get("riesgo_alto"),
+            resultado.get("votos_alto"),
+            json.dumps(paciente, ensure_ascii=False, default=float),
+        )
+        try:
+            self._cola.put(registro, timeout=self.espera_maxima_s)
+        except queue.Full:
+            with self._lock:
+                self._descartados += 1
+            logger.error("Cola de auditoría llena (%d); se descartó un registro", self._cola.maxsize)
+            return False
+        with self._lock:
+            self._encolados += 1
+        return True
+
+    def vaciar(self, timeout=None):
+        """Espera a que se escriban todos los registros encolados hasta ahora."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if self._escritos >= self._encolados:
+                    return True
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(0.01)
+
+    def redirigir(self, ruta):
+        """Cambia el archivo de la bitácora; solo antes del primer registro."""
+        with self._lock:
+            if self._hilo is not None:
+                raise RuntimeError("la bitácora ya empezó a escribir; no se puede redirigir")
+            self.ruta = str(ruta)
+
+    def cerrar(self, timeout=5.0):
+        """Escribe lo pendiente y detiene el hilo escritor."""
+        if self._hilo is not None and self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join(timeout)
+
+    def _iniciar(self):
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._bucle, name="auditoria", daemon=True)
+                    self._hilo.start()
+                    atexit.register(self.cerrar)     # El hilo es daemon: sin esto se perdería lo pendiente
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=5.0)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")       # Seguro con WAL; no sincroniza cada commit
+        conexion.executescript(_ESQUEMA)
+        return conexion
+
+    def _bucle(self):
+        conexion = None
+        lote, terminar = [], False
+        while not (terminar and not lote):
+            if not lote:
+                primero = self._cola.get()
+                if primero is None:
+                    break
+                lote = [primero]
+                limite = time.monotonic() + self.intervalo_s
+                while len(lote) < self.max_lote:
+                    restante = limite - time.monotonic()
+                    try:
+                        elemento = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if elemento is None:
+                        terminar = True     # Se escribe el lote actual y luego se sale
+                        break
+                    lote.append(elemento)
+
+            t0 = time.perf_counter()
+            try:
+                if conexion is None:
+                    conexion = self._conectar()
+                with conexion:
+                    conexion.executemany(_INSERTAR, lote)
+            except sqlite3.Error:
+                # Se conserva el lote y se reintenta; mientras tanto la cola aplica contrapresión
+                logger.exception("No se pudo escribir la bitácora de auditoría; se reintentará")
+                with self._lock:
+                    self._fallos += 1
+                if conexion is not None:
+                    conexion.close()
+                    conexion = None
+                time.sleep(REINTENTO_S)
+                continue
+
+            with self._lock:
+                self._escritos += len(lote)
+                self._lotes += 1
+                self._ultimo_lote_ms = (time.perf_counter() - t0) * 1e3
+            lote = []
+
+        if conexion is not None:
+            conexion.close()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "activa": self.activa,
+                "encolados": self._encolados,
+                "escritos": self._escritos,
+                "pendientes": self._cola.qsize(),
+                "descartados": self._descartados,
+                "lotes": self._lotes,
+                "fallos_escritura": self._fallos,
+                "ultimo_lote_ms": self._ultimo_lote_ms,
+            }
+
+    # --------------------------------------------------
+    # LECTURA
+    # --------------------------------------------------
+    def historial(self, pagina=0, tam_pagina=20):
+        """Página ``pagina`` (0 = más reciente) del historial y el total de registros.
+
+        Cada registro trae las columnas auditadas y, en ``entradas``, el dict
+        del paciente tal como se recibió.
+
+        Los ``id`` son consecutivos (no hay borrados), así que cada página es un
+        rango de ``id`` y se lee por el índice de la clave primaria, sin
+        ``OFFSET``, por grande que sea la bitácora.
+        """
+        try:
+            conexion = sqlite3.connect(f"file:{self.ruta}?mode=ro", uri=True, timeout=0.5)
+        except sqlite3.OperationalError:
+            return [], 0        # Todavía no se registró ninguna predicción
+        try:
+            conexion.row_factory = sqlite3.Row
+            ultimo, = conexion.execute("SELECT COALESCE(MAX(id), 0) FROM predicciones").fetchone()
+            hasta = ultimo - pagina * tam_pagina
+            filas = conexion.execute(
+                "SELECT * FROM predicciones WHERE id <= ? ORDER BY id DESC LIMIT ?", (hasta, tam_pagina),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return [], 0        # Tabla aún no creada
+        finally:
+            conexion.close()
+        return [
+            {
+                "id": fila["id"],
+                "fecha": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(fila["fecha"])),
+                "origen": fila["origen"],
+                "version": fila["version"],
+                "prob_riesgo": fila["prob_riesgo"],
+                "riesgo_alto": fila["riesgo_alto"],
+                "votos_alto": fila["votos_alto"],
+                # Anidadas: las claves del cuerpo recibido no pueden pisar las columnas auditadas
+                "entradas": json.loads(fila["entradas"]),
+            }
+            for fila in filas
+        ], ultimo
+
+
+# Instancia única por proceso, compartida por todas las sesiones
+bitacora = BitacoraAuditoria()
+
+
+def redirigir_a_temporal():
+    """Apunta la bitácora del proceso a un archivo temporal que se borra al salir.
+
+    Para los arneses de medición y de carga: sus predicciones sintéticas no
+    son pacientes. Debe llamarse antes del primer registro.
+    """
+    directorio = tempfile.mkdtemp(prefix="cardiorisk-auditoria-")
+    # Se registra antes que ``cerrar`` (al primer registro), así que corre después de él al salir
+    atexit.register(shutil.rmtree, directorio, ignore_errors=True)
+    bitacora.redirigir(os.path.join(directorio, "auditoria.sqlite3"))
+    return bitacora.ruta
@@ -0,0 +1,90 @@
+"""Caché LRU/TTL de predicciones compartida por todas las sesiones.
+
+La clave son los 7 campos del formulario expresados en múltiplos del paso de
+su widget (``oldpeak`` 0.1, ``chol`` 1.0, ...) más la versión del modelo. Así,
+volver a pulsar "Calcular" con los mismos datos no recorre el bosque otra vez.
+Solo se cachean entradas que ya están sobre esa rejilla (las del formulario
+siempre lo están): un valor intermedio, como ``oldpeak=0.049`` por HTTP, se
+evalúa con el bosque y no comparte resultado con ``0.0``. Cuando cambia la
+versión del modelo, la caché se vacía sola.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from cardiorisk.entrada import CAMPOS_USUARIO, PASOS
+
+CAPACIDAD = 4_096
+TTL_SEGUNDOS = 3_600
+
+
+# Tolerancia (en pasos) para considerar un valor sobre la rejilla: absorbe el error de coma flotante de 24.3 / 0.01
+TOLERANCIA_REJILLA = 1e-6
+
+
+def clave_cuantizada(paciente, version):
+    """Tupla hashable con cada campo en múltiplos de su paso, o ``None`` si alguno no cae sobre la rejilla."""
+    clave = [version]
+    for campo in CAMPOS_USUARIO:
+        pasos = float(paciente.get(campo) or 0) / PASOS[campo]
+        if not math.isfinite(pasos) or abs(pasos - round(pasos)) > TOLERANCIA_REJILLA:
+            return None
+        clave.append(round(pasos))
+    return tuple(clave)
+
+
+class CachePredicciones:
+    """LRU acotada por ``capacidad`` con expiración por ``ttl`` segundos."""
+
+    def __init__(self, capacidad=CAPACIDAD, ttl=TTL_SEGUNDOS):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave):
+        """Resultado guardado para ``clave`` o ``None`` si no está o expiró."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._invalidar_si_cambio(clave[0])
+            entrada = self._datos.get(clave)
+            if entrada is None or ahora - entrada[0] > self.ttl:
+                if entrada is not None:
+                    del self._datos[clave]
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, resultado):
+        with self._lock:
+            self._invalidar_si_cambio(clave[0])
+            self._datos[clave] = (time.monotonic(), resultado)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def _invalidar_si_cambio(self, version):
+        if version != self._version:
+            self._datos.clear()
+            self._version = version
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            }
+
+
+# Instancia única por proceso, compartida por todas las sesiones
+cache_predicciones = CachePredicciones()
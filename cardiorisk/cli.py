@@ -0,0 +1,222 @@
+"""Evaluación por línea de comandos de archivos JSONL, sin Streamlit.
+
+Lee registros de pacientes (un objeto JSON por línea) como flujo, reparte
+bloques de líneas entre un pool de procesos y escribe las predicciones como
+JSONL en el mismo orden de entrada. Cada proceso carga el modelo una sola vez
+al iniciar. El vector de entrada se construye con la misma ``PlantillaEntrada``
+que usa ``app.py``: columnas ausentes valen 0.
+
+Cada bloque devuelve también un resumen de deriva de sus entradas; el proceso
+principal los suma y, al terminar, avisa por ``stderr`` de las variables con
+deriva frente a las estadísticas de entrenamiento (ver ``cardiorisk.deriva``).
+
+Ejemplo::
+
+    python -m cardiorisk pacientes.jsonl -o riesgo.jsonl --procesos 8 --tam-bloque 20000
+    cat pacientes.jsonl | python -m cardiorisk - > riesgo.jsonl
+    python -m cardiorisk pacientes.jsonl -o tamizaje.jsonl --solo-etiqueta 0.99
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from cardiorisk.deriva import monitor_para
+from cardiorisk.lotes import COLUMNA_ARBOLES, COLUMNA_ETIQUETA, COLUMNA_PROBABILIDAD
+from cardiorisk.registro import RUTA_FEATURES, RUTA_MODELO, RUTA_SCALER, RegistroModelos
+from cardiorisk.variantes import motor_para
+
+TAM_BLOQUE = 5_000
+
+# Artefactos del proceso trabajador (se asignan en ``_iniciar_trabajador``)
+_artefactos = None
+
+
+def _iniciar_trabajador(rutas):
+    global _artefactos
+    _artefactos = RegistroModelos(*rutas).obtener()
+
+
+def puntuar_lineas(lineas, artefactos=None, confianza=None):
+    """Evalúa un bloque de líneas JSONL.
+
+    Devuelve ``(lineas_salida, arboles, invalidas, deriva)``: las líneas de
+    salida (sin ``\\n``), el total de árboles evaluados, cuántas líneas se
+    rechazaron y el resumen de deriva del bloque. Las líneas inválidas no
+    detienen el bloque: se devuelven con un campo ``error`` y no se evalúan.
+    Con ``confianza`` se usa la evaluación anticipada del bosque y solo se
+    escribe la etiqueta.
+    """
+    artefactos = artefactos or _artefactos
+    registros, errores_json = [], []
+    for linea in lineas:
+        try:
+            registro = json.loads(linea)
+            if not isinstance(registro, dict):
+                raise ValueError("se esperaba un objeto JSON")
+            error = None
+        except ValueError as e:
+            registro, error = {}, f"JSON inválido: {e}"
+        registros.append(registro)
+        errores_json.append(error)
+
+    X, errores = artefactos.plantilla.matriz_desde_registros(registros)
+    errores = [e_json or e for e_json, e in zip(errores_json, errores)]
+    # Solo se evalúan (y cuentan para la deriva) los registros sin error
+    validos = [i for i, error in enumerate(errores) if error is None]
+    X = X[validos]
+    presentes = artefactos.plantilla.presentes_desde_registros([registros[i] for i in validos])
+    deriva = monitor_para(artefactos).resumir(X, presentes)
+    motor = motor_para("lote", artefactos)
+    if not validos:
+        arboles = np.zeros(0, dtype=np.int64)
+    elif confianza is None:
+        etiquetas, probabilidades = motor.predecir(X)
+        arboles = np.full(len(X), motor.n_arboles)
+    else:
+        etiquetas, arboles = motor.predecir_anticipado(X, confianza=confianza)
+
+    salida = []
+    fila = 0                    # Posición del registro entre los evaluados
+    for registro, error in zip(registros, errores):
+        if error is not None:
+            registro = {**registro, "error": error}
+        elif confianza is None:
+            registro = {
+                **registro,
+                COLUMNA_PROBABILIDAD: round(float(probabilidades[fila, 1]), 6),
+                COLUMNA_ETIQUETA: int(etiquetas[fila]),
+            }
+            fila += 1
+        else:
+            registro = {**registro, COLUMNA_ETIQUETA: int(etiquetas[fila]), COLUMNA_ARBOLES: int(arboles[fila])}
+            fila += 1
+        salida.append(json.dumps(registro, ensure_ascii=False))
+    return salida, int(arboles.sum()), len(registros) - len(validos), deriva
+
+
+def _bloques(lineas, tam_bloque):
+    """Agrupa líneas no vacías en listas de hasta ``tam_bloque`` elementos."""
+    no_vacias = (linea for linea in lineas if linea.strip())
+    while True:
+        bloque = list(islice(no_vacias, tam_bloque))
+        if not bloque:
+            return
+        yield bloque
+
+
+class _Progreso:
+    """Reporta filas/s por ``stderr`` como mucho una vez por intervalo."""
+
+    def __init__(self, intervalo=2.0, flujo=sys.stderr):
+        self.intervalo = intervalo
+        self.flujo = flujo
+        self.filas = 0
+        self.invalidas = 0          # Filas rechazadas (no cuentan para los árboles por fila)
+        self.arboles = 0
+        self.monitor = None         # ``MonitorDeriva`` que suma los resúmenes de cada bloque
+        self.inicio = time.perf_counter()
+        self._ultimo = self.inicio
+
+    def sumar(self, filas, arboles=0, invalidas=0):
+        self.filas += filas
+        self.invalidas += invalidas
+        self.arboles += arboles
+        ahora = time.perf_counter()
+        if ahora - self._ultimo >= self.intervalo:
+            self._ultimo = ahora
+            print(f"{self.filas:,} filas · {self.filas_por_segundo():,.0f} filas/s", file=self.flujo)
+
+    def filas_por_segundo(self):
+        return self.filas / max(time.perf_counter() - self.inicio, 1e-9)
+
+
+def evaluar_flujo(entrada, salida, rutas, tam_bloque=TAM_BLOQUE, procesos=None, progreso=None, confianza=None):
+    """Evalúa todas las líneas de ``entrada`` y escribe el resultado en ``salida``.
+
+    Con ``procesos <= 1`` se evalúa en el proceso actual. Con más procesos se
+    mantienen como mucho ``2 * procesos`` bloques en vuelo para acotar memoria.
+    """
+    progreso = progreso or _Progreso()
+    procesos = os.cpu_count() if procesos is None else procesos
+    artefactos = RegistroModelos(*rutas).obtener()
+    monitor = progreso.monitor = monitor_para(artefactos)
+
+    def escribir(resultado):
+        lineas, arboles, invalidas, deriva = resultado
+        salida.write("\n".join(lineas))
+        salida.write("\n")
+        progreso.sumar(len(lineas), arboles, invalidas)
+        if deriva is not None:
+            monitor.sumar(deriva)
+
+    if procesos <= 1:
+        for bloque in _bloques(entrada, tam_bloque):
+            escribir(puntuar_lineas(bloque, artefactos, confianza))
+        return progreso
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador, initargs=(rutas,)) as pool:
+        en_vuelo = deque()
+        for bloque in _bloques(entrada, tam_bloque):
+            en_vuelo.append(pool.submit(puntuar_lineas, bloque, None, confianza))
+            if len(en_vuelo) >= 2 * procesos:
+                escribir(en_vuelo.popleft().result())
+        while en_vuelo:
+            escribir(en_vuelo.popleft().result())
+    return progreso
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cardiorisk",
+        description="Evalúa el riesgo cardiovascular de registros JSONL (un paciente por línea).",
+    )
+    parser.add_argument("entrada", help="Archivo JSONL de entrada, o '-' para stdin")
+    parser.add_argument("-o", "--salida", default="-", help="Archivo JSONL de salida (por defecto stdout)")
+    parser.add_argument("--tam-bloque", type=int, default=TAM_BLOQUE, help="Líneas por bloque enviado a cada proceso")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count(), help="Procesos trabajadores (1 = sin pool)")
+    parser.add_argument(
+        "--solo-etiqueta", nargs="?", type=float, const=0.99, default=None, metavar="CONFIANZA",
+        help="Tamizaje solo de etiqueta con evaluación anticipada del bosque (confianza por defecto 0.99; 1 = exacto)",
+    )
+    parser.add_argument("--modelo", default=str(RUTA_MODELO))
+    parser.add_argument("--scaler", default=str(RUTA_SCALER))
+    parser.add_argument("--features", default=str(RUTA_FEATURES))
+    args = parser.parse_args(argv)
+
+    rutas = (args.modelo, args.scaler, args.features)
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8")
+    salida = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8")
+    try:
+        progreso = evaluar_flujo(
+            entrada, salida, rutas, tam_bloque=args.tam_bloque, procesos=args.procesos, confianza=args.solo_etiqueta,
+        )
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+
+    segundos = time.perf_counter() - progreso.inicio
+    evaluadas = progreso.filas - progreso.invalidas
+    print(
+        f"Listo: {evaluadas:,} filas evaluadas en {segundos:.2f} s ({evaluadas / max(segundos, 1e-9):,.0f} filas/s, "
+        f"{progreso.arboles / max(evaluadas, 1):.1f} árboles por fila)",
+        file=sys.stderr,
+    )
+    if progreso.invalidas:
+        print(f"{progreso.invalidas:,} filas rechazadas (ver el campo 'error' en la salida)", file=sys.stderr)
+    for fila in progreso.monitor.informe():
+        if fila["alerta"]:
+            print(f"Deriva en {fila['variable']}: {fila['motivo']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
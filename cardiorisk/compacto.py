@@ -0,0 +1,225 @@
+"""Formato compacto del bosque en un solo archivo, cargado con ``mmap``.
+
+``modelo_cardio.joblib`` es un objeto de sklearn serializado con pickle: cada
+proceso de Streamlit lo deserializa en su propia copia privada. El formato
+compacto guarda solo los arrays de nodos del bosque compilado, cada uno en el
+tipo más pequeño que conserva las predicciones, y se abre con ``mmap``: la
+carga no copia datos y los procesos que abren el mismo archivo comparten las
+páginas físicas.
+
+Estructura del archivo::
+
+    b"CRBOSQUE" | uint32 formato | uint32 largo del encabezado | encabezado JSON | arrays
+
+Cada array empieza alineado a 64 bytes. El encabezado lleva la versión de los
+artefactos de origen (hash de los ``.joblib``), ``feature_names``, las clases,
+la media/escala del escalador y el tipo, la forma y la posición de cada array.
+
+Exportar y verificar contra los artefactos originales::
+
+    python -m cardiorisk.compacto
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+from cardiorisk.motor import BosqueCompilado
+
+MAGIA = b"CRBOSQUE"
+FORMATO = 1
+ALINEACION = 64
+
+
+class ArchivoCompacto:
+    """Bosques y metadatos mapeados desde un archivo compacto (solo lectura)."""
+
+    def __init__(self, motor, motor_crudo, feature_names, version, media, escala, mapa):
+        self.motor = motor                  # Umbrales en espacio escalado (float32, entrada float32)
+        self.motor_crudo = motor_crudo      # Escalador plegado en los umbrales (float64)
+        self.feature_names = feature_names
+        self.version = version              # Versión de los .joblib de los que se exportó
+        self.media = media
+        self.escala = escala
+        self._mapa = mapa                   # Mantiene vivo el mmap mientras existan los arrays
+
+    @property
+    def tamano_bytes(self):
+        return len(self._mapa)
+
+
+def _reducir(array, tipos):
+    """Primer tipo de ``tipos`` que representa ``array`` sin pérdida (si no, el original)."""
+    for tipo in tipos:
+        convertido = array.astype(tipo)
+        if np.array_equal(convertido.astype(array.dtype), array):
+            return convertido
+    return array
+
+
+def _umbral_float32(umbral):
+    """Umbrales float64 redondeados hacia abajo a float32.
+
+    Para toda entrada float32 ``x``: ``x <= u`` equivale a ``x <= abajo32(u)``,
+    así que las comparaciones del bosque en espacio escalado no cambian.
+    """
+    umbral32 = umbral.astype(np.float32)
+    excede = umbral32.astype(np.float64) > umbral
+    umbral32[excede] = np.nextafter(umbral32[excede], np.float32(-np.inf))
+    return umbral32
+
+
+def exportar(artefactos, destino):
+    """Escribe el bosque de ``artefactos`` en ``destino`` con el formato compacto.
+
+    Se escribe en un archivo temporal y se renombra, para que un proceso que lo
+    abra en ese momento nunca vea un archivo a medias.
+    """
+    motor, motor_crudo, scaler = artefactos.motor, artefactos.motor_crudo, artefactos.scaler
+    arrays = {
+        "caracteristica": _reducir(motor.caracteristica, (np.uint8, np.uint16, np.int32)),
+        "umbral": _umbral_float32(motor.umbral),
+        "umbral_plegado": motor_crudo.umbral,     # Exacto solo en float64 (ver ``_umbral_plegado``)
+        "izquierdo": _reducir(motor.izquierdo, (np.int16, np.int32)),
+        "derecho": _reducir(motor.derecho, (np.int16, np.int32)),
+        "valor": _reducir(motor.valor, (np.float32,)),
+        "cobertura": _reducir(motor.cobertura, (np.float32,)),
+        "inicio": motor.inicio.astype(np.int32),
+        "hijos": motor._hijos.astype(np.int32),
+    }
+    encabezado = {
+        "version": artefactos.version,
+        "profundidad": motor.profundidad,
+        "clases": motor.clases.tolist(),
+        "feature_names": list(artefactos.feature_names),
+        "media": scaler.mean_.tolist() if scaler.mean_ is not None else None,
+        "escala": scaler.scale_.tolist() if scaler.scale_ is not None else None,
+        "arrays": {},
+    }
+
+    # Posiciones relativas al inicio de la zona de arrays; se ajustan abajo
+    posicion = 0
+    for nombre, array in arrays.items():
+        encabezado["arrays"][nombre] = {"tipo": array.dtype.str, "forma": list(array.shape), "posicion": posicion}
+        posicion = -(-(posicion + array.nbytes) // ALINEACION) * ALINEACION
+
+    texto = json.dumps(encabezado, ensure_ascii=False).encode("utf-8")
+    inicio_arrays = -(-(len(MAGIA) + 8 + len(texto)) // ALINEACION) * ALINEACION
+
+    temporal = f"{destino}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(MAGIA)
+        f.write(struct.pack("<II", FORMATO, len(texto)))
+        f.write(texto)
+        for nombre, array in arrays.items():
+            f.write(b"\0" * (inicio_arrays + encabezado["arrays"][nombre]["posicion"] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temporal, destino)
+
+
+def cargar(ruta):
+    """Abre un archivo compacto con ``mmap``; los arrays son vistas de solo lectura."""
+    with open(ruta, "rb") as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapa[:len(MAGIA)] != MAGIA:
+        raise ValueError(f"{ruta} no es un bosque compacto")
+    formato, largo = struct.unpack_from("<II", mapa, len(MAGIA))
+    if formato != FORMATO:
+        raise ValueError(f"Formato {formato} no soportado (se esperaba {FORMATO})")
+    inicio_texto = len(MAGIA) + 8
+    encabezado = json.loads(bytes(mapa[inicio_texto:inicio_texto + largo]).decode("utf-8"))
+    inicio_arrays = -(-(inicio_texto + largo) // ALINEACION) * ALINEACION
+
+    arrays = {}
+    for nombre, info in encabezado["arrays"].items():
+        tipo = np.dtype(info["tipo"])
+        cantidad = int(np.prod(info["forma"]))
+        arrays[nombre] = np.frombuffer(
+            mapa, dtype=tipo, count=cantidad, offset=inicio_arrays + info["posicion"],
+        ).reshape(info["forma"])
+
+    comunes = dict(
+        caracteristica=arrays["caracteristica"],
+        izquierdo=arrays["izquierdo"],
+        derecho=arrays["derecho"],
+        valor=arrays["valor"],
+        cobertura=arrays["cobertura"],
+        inicio=arrays["inicio"],
+        profundidad=encabezado["profundidad"],
+        clases=np.asarray(encabezado["clases"]),
+        hijos=arrays["hijos"],
+    )
+    return ArchivoCompacto(
+        motor=BosqueCompilado(umbral=arrays["umbral"], entrada_float32=True, **comunes),
+        motor_crudo=BosqueCompilado(umbral=arrays["umbral_plegado"], entrada_float32=False, **comunes),
+        feature_names=encabezado["feature_names"],
+        version=encabezado["version"],
+        media=np.asarray(encabezado["media"]) if encabezado["media"] is not None else None,
+        escala=np.asarray(encabezado["escala"]) if encabezado["escala"] is not None else None,
+        mapa=mapa,
+    )
+
+
+def leer_version(ruta):
+    """Versión de origen guardada en el encabezado, sin mapear los arrays."""
+    with open(ruta, "rb") as f:
+        cabecera = f.read(len(MAGIA) + 8)
+        if cabecera[:len(MAGIA)] != MAGIA:
+            return None
+        _, largo = struct.unpack_from("<II", cabecera, len(MAGIA))
+        return json.loads(f.read(largo).decode("utf-8"))["version"]
+
+
+def main(argv=None):
+    import warnings
+
+    from cardiorisk.motor import verificar_paridad
+    from cardiorisk.registro import RUTA_COMPACTO, RUTA_FEATURES, RUTA_MODELO, RUTA_SCALER, RegistroModelos
+
+    parser = argparse.ArgumentParser(prog="python -m cardiorisk.compacto", description=__doc__.splitlines()[0])
+    parser.add_argument("--destino", default=str(RUTA_COMPACTO))
+    parser.add_argument("--modelo", default=str(RUTA_MODELO))
+    parser.add_argument("--scaler", default=str(RUTA_SCALER))
+    parser.add_argument("--features", default=str(RUTA_FEATURES))
+    parser.add_argument("--filas", type=int, default=50_000, help="Filas aleatorias para la verificación de paridad")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore", category=UserWarning)  # Nombres de columnas en arrays
+    # Se cargan los .joblib aunque ya exista un archivo compacto, para compararlos
+    original = RegistroModelos(args.modelo, args.scaler, args.features, ruta_compacto=None).obtener()
+    exportar(original, args.destino)
+
+    t0 = time.perf_counter()
+    compacto = cargar(args.destino)
+    tiempo_compacto = time.perf_counter() - t0
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((args.filas, len(original.feature_names)))
+    X_crudo = original.scaler.inverse_transform(X)
+    paridad = verificar_paridad(original.modelo, compacto.motor, X)
+    paridad_crudo = verificar_paridad(original.modelo, compacto.motor_crudo, X_crudo, scaler=original.scaler)
+    print(f"Paridad (espacio escalado): {paridad}")
+    print(f"Paridad (escalador plegado): {paridad_crudo}")
+
+    tamano_joblib = sum(os.path.getsize(r) for r in (args.modelo, args.scaler, args.features))
+    print(
+        f"Tamaño: {tamano_joblib / 1e6:.2f} MB (.joblib) -> {compacto.tamano_bytes / 1e6:.2f} MB "
+        f"({compacto.tamano_bytes / tamano_joblib:.0%})"
+    )
+    print(
+        f"Carga: {original.tiempo_carga * 1e3:.1f} ms (.joblib + compilación) -> {tiempo_compacto * 1e3:.2f} ms (mmap)"
+    )
+    for resultado in (paridad, paridad_crudo):
+        if resultado["etiquetas_distintas"] or resultado["max_diff_proba"] > 1e-9:
+            os.remove(args.destino)
+            raise SystemExit("El archivo compacto no reproduce al modelo original; se eliminó")
+
+
+if __name__ == "__main__":
+    main()
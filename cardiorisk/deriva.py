@@ -0,0 +1,215 @@
+"""Monitor de deriva de las entradas frente a las estadísticas de entrenamiento.
+
+El escalador guarda la media y la desviación estándar de entrenamiento de
+cada variable de ``feature_names``. Cada predicción (formulario, servicio,
+lotes CSV/Parquet y JSONL) actualiza, en unidades estandarizadas
+``z = (x - media) / escala``:
+
+* momentos acumulados por variable (Welford, combinados por bloque con la
+  fórmula de Chan; una fila es el caso ``n = 1``),
+* un histograma de cubetas fijas en ``z`` (de -3 a 3 cada 0.5, más las colas).
+
+Solo se cuentan los valores que la entrada trae de verdad: los que se
+completan con 0 (p. ej. ``sysBP`` en el formulario, o las celdas vacías de
+un lote CSV/Parquet) no se consideran.
+
+Para que el monitor refleje el tráfico reciente sin crecer, las observaciones
+se acumulan en generaciones de ``ventana`` filas: la ventana reciente es la
+generación en curso más la anterior. La primera generación completa queda
+como referencia del tráfico en vivo. A pedido se calcula por variable:
+
+* **desplazamiento**: media reciente en desviaciones estándar de
+  entrenamiento, y razón entre la desviación reciente y la de entrenamiento;
+* **PSI** (índice de estabilidad poblacional) del histograma reciente frente
+  a la referencia.
+
+Una variable se marca cuando tiene al menos ``MINIMO_OBSERVACIONES`` recientes
+y supera alguno de los umbrales. La memoria es ``O(variables × cubetas)``
+sin importar el volumen de tráfico.
+"""
+
+import threading
+
+import numpy as np
+
+# Bordes de las cubetas en unidades estandarizadas (13 bordes: 14 cubetas con las colas)
+BORDES_Z = np.arange(-3.0, 3.01, 0.5)
+
+# Filas por generación de la ventana reciente
+VENTANA = 5_000
+
+# Umbrales de alerta
+MINIMO_OBSERVACIONES = 200
+UMBRAL_DESPLAZAMIENTO = 0.5         # Desviaciones estándar de entrenamiento
+RAZON_DESVIACION = (0.5, 2.0)       # Rango aceptable de desviación reciente / entrenamiento
+UMBRAL_PSI = 0.25                   # > 0.25: cambio significativo (0.10–0.25: moderado)
+EPSILON_PSI = 1e-4                  # Evita log(0) en cubetas vacías
+
+
+class _Acumulador:
+    """Momentos e histograma por variable de un conjunto de observaciones."""
+
+    def __init__(self, n_features):
+        self.n = np.zeros(n_features)
+        self.media = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.conteos = np.zeros((n_features, len(BORDES_Z) + 1), dtype=np.int64)
+        self.filas = 0
+
+    def agregar(self, z, presentes):
+        n_bloque = presentes.sum(axis=0)
+        con_datos = n_bloque > 0
+        media_bloque = np.where(presentes, z, 0.0).sum(axis=0) / np.maximum(n_bloque, 1)
+        m2_bloque = (np.where(presentes, z - media_bloque, 0.0) ** 2).sum(axis=0)
+        self._combinar(n_bloque, media_bloque, m2_bloque, con_datos)
+
+        n_features, n_cubetas = self.conteos.shape
+        cubetas = np.searchsorted(BORDES_Z, z, side="right")
+        indices = (np.arange(n_features) * n_cubetas + cubetas)[presentes]
+        self.conteos += np.bincount(indices, minlength=n_features * n_cubetas).reshape(n_features, n_cubetas)
+
+    def _combinar(self, n_b, media_b, m2_b, con_datos=None):
+        # Chan et al.: une dos conjuntos (n, media, M2) sin volver a recorrerlos
+        n = self.n + n_b
+        delta = media_b - self.media
+        con_datos = n > 0 if con_datos is None else con_datos
+        self.media = np.where(con_datos, self.media + delta * n_b / np.maximum(n, 1), self.media)
+        self.m2 = np.where(con_datos, self.m2 + m2_b + delta ** 2 * self.n * n_b / np.maximum(n, 1), self.m2)
+        self.n = n
+
+    def unir(self, otro):
+        unido = _Acumulador(len(self.n))
+        unido.n, unido.media, unido.m2 = self.n.copy(), self.media.copy(), self.m2.copy()
+        unido._combinar(otro.n, otro.media, otro.m2)
+        unido.conteos = self.conteos + otro.conteos
+        return unido
+
+
+class MonitorDeriva:
+    """Deriva de las entradas frente a la media/escala de entrenamiento, seguro para varios hilos."""
+
+    def __init__(self, media, escala, feature_names, ventana=VENTANA):
+        self.media = np.asarray(media, dtype=np.float64)
+        escala = np.asarray(escala, dtype=np.float64)
+        self.escala = np.where(escala > 0, escala, 1.0)      # Variables constantes en entrenamiento
+        self.feature_names = list(feature_names)
+        self.ventana = ventana
+        self._lock = threading.Lock()
+        self._total = np.zeros(len(self.feature_names), dtype=np.int64)
+        self._actual = _Acumulador(len(self.feature_names))
+        self._anterior = _Acumulador(len(self.feature_names))
+        self._referencia = None
+        self._filas_actual = 0
+
+    def observar(self, X, presentes=None):
+        """Agrega las filas de ``X`` ``(n, n_features)``.
+
+        ``presentes`` indica qué valores trae la entrada: máscara ``(n_features,)``
+        para toda la tabla o ``(n, n_features)`` por celda. Sin ella se cuentan todos.
+        """
+        resumen = self.resumir(X, presentes)
+        if resumen is not None:
+            self.sumar(resumen)
+
+    def resumir(self, X, presentes=None):
+        """Resumen de un bloque sin tocar el monitor (para sumarlo desde otro proceso)."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if presentes is None:
+            presentes = np.ones(X.shape, dtype=bool)
+        presentes = np.broadcast_to(presentes, X.shape)
+        if len(X) == 0 or not presentes.any():
+            return None
+        resumen = _Acumulador(len(self.feature_names))
+        resumen.agregar((X - self.media) / self.escala, presentes)
+        resumen.filas = len(X)
+        return resumen
+
+    def sumar(self, resumen):
+        """Suma un resumen de ``resumir`` (picklable) a la ventana en curso."""
+        with self._lock:
+            self._actual = self._actual.unir(resumen)
+            self._total += resumen.n.astype(np.int64)
+            self._filas_actual += resumen.filas
+            if self._filas_actual >= self.ventana:
+                if self._referencia is None:
+                    self._referencia = self._actual
+                self._anterior = self._actual
+                self._actual = _Acumulador(len(self.feature_names))
+                self._filas_actual = 0
+
+    def informe(self):
+        """Lista de dicts por variable observada: desplazamiento, PSI y alerta."""
+        with self._lock:
+            reciente = self._anterior.unir(self._actual)
+            referencia = self._referencia
+            total = self._total.copy()
+
+        filas = []
+        for j, nombre in enumerate(self.feature_names):
+            n = reciente.n[j]
+            if n == 0:
+                continue
+            desplazamiento = float(reciente.media[j])
+            razon = float(np.sqrt(reciente.m2[j] / n))
+            psi = None
+            if referencia is not None and referencia.n[j] >= MINIMO_OBSERVACIONES:
+                p = referencia.conteos[j] / referencia.n[j] + EPSILON_PSI
+                q = reciente.conteos[j] / n + EPSILON_PSI
+                psi = float(np.sum((q - p) * np.log(q / p)))
+
+            motivos = []
+            if n >= MINIMO_OBSERVACIONES:
+                if abs(desplazamiento) > UMBRAL_DESPLAZAMIENTO:
+                    motivos.append(f"media desplazada {desplazamiento:+.2f} σ")
+                if not RAZON_DESVIACION[0] <= razon <= RAZON_DESVIACION[1]:
+                    motivos.append(f"dispersión ×{razon:.2f}")
+                if psi is not None and psi > UMBRAL_PSI:
+                    motivos.append(f"PSI {psi:.2f}")
+
+            filas.append({
+                "variable": nombre,
+                "observaciones": int(n),
+                "total": int(total[j]),
+                "media": float(self.media[j] + desplazamiento * self.escala[j]),
+                "media_entrenamiento": float(self.media[j]),
+                "desplazamiento": desplazamiento,
+                "razon_desviacion": razon,
+                "psi": psi,
+                "alerta": bool(motivos),
+                "motivo": "; ".join(motivos),
+            })
+        return filas
+
+    def alertas(self):
+        """Variables marcadas con deriva en la ventana reciente."""
+        return [fila["variable"] for fila in self.informe() if fila["alerta"]]
+
+
+# --------------------------------------------------
+# MONITOR POR VERSIÓN DEL MODELO
+# --------------------------------------------------
+# Las estadísticas de referencia son las del escalador de cada versión: al
+# recargar el modelo, el monitor empieza de nuevo.
+_monitores = {}
+_lock = threading.Lock()
+
+
+def monitor_para(artefactos):
+    """``MonitorDeriva`` de la versión vigente del modelo (uno por proceso)."""
+    with _lock:
+        monitor = _monitores.get(artefactos.version)
+        if monitor is None:
+            monitor = MonitorDeriva(artefactos.media, artefactos.escala, artefactos.feature_names)
+            _monitores.clear()
+            _monitores[artefactos.version] = monitor
+        return monitor
+
+
+def observar_registros(artefactos, registros, X=None):
+    """Agrega dicts ``{campo: valor}`` al monitor; ``X`` evita rearmar la matriz si ya existe."""
+    plantilla = artefactos.plantilla
+    if X is None:
+        X, _ = plantilla.matriz_desde_registros(registros)
+    monitor_para(artefactos).observar(X, plantilla.presentes_desde_registros(registros))
@@ -0,0 +1,127 @@
+"""Construcción del vector de entrada del modelo a partir de los datos clínicos.
+
+El formulario solo pide 7 variables; el resto de columnas de ``feature_names``
+se completa con 0, igual que el ``input_dict`` original de ``app.py``. La
+plantilla de ceros se construye una vez por modelo y cada predicción solo
+copia el vector y escribe los 7 valores en sus posiciones. Las tablas (lotes
+CSV/Parquet) siguen la misma regla: columnas ausentes o vacías valen 0.
+"""
+
+import numpy as np
+
+# Variables que ingresa el usuario, en el orden del formulario
+CAMPOS_USUARIO = ("age", "BMI", "chol", "thalch", "oldpeak", "diabetes", "prevalentHyp")
+
+# Paso de cada widget del formulario (BMI usa el paso por defecto de st.number_input)
+PASOS = {"age": 1, "BMI": 0.01, "chol": 1.0, "thalch": 1, "oldpeak": 0.1, "diabetes": 1, "prevalentHyp": 1}
+
+# Rango (mínimo, máximo) de cada widget del formulario
+RANGOS = {
+    "age": (18, 100),
+    "BMI": (10.0, 60.0),
+    "chol": (100.0, 600.0),
+    "thalch": (60, 220),
+    "oldpeak": (0.0, 6.0),
+    "diabetes": (0, 1),
+    "prevalentHyp": (0, 1),
+}
+
+
+class PlantillaEntrada:
+    """Vector de ceros con las posiciones de los campos del formulario precalculadas."""
+
+    def __init__(self, feature_names):
+        self.feature_names = list(feature_names)
+        self.indices = np.array([self.feature_names.index(campo) for campo in CAMPOS_USUARIO])
+        self.posiciones = {nombre.lower(): j for j, nombre in enumerate(self.feature_names)}
+        self._ceros = np.zeros(len(self.feature_names), dtype=np.float64)
+
+    def vector(self, valores):
+        """Fila ``(1, n_features)`` a partir de un dict ``{campo: valor}``."""
+        x = self._ceros.copy()
+        x[self.indices] = [valores[campo] for campo in CAMPOS_USUARIO]
+        return x[None, :]
+
+    def matriz(self, valores):
+        """Matriz ``(n, n_features)`` a partir de un array ``(n, 7)`` en el orden de ``CAMPOS_USUARIO``."""
+        valores = np.asarray(valores, dtype=np.float64)
+        X = np.zeros((valores.shape[0], len(self.feature_names)), dtype=np.float64)
+        X[:, self.indices] = valores
+        return X
+
+    def matriz_desde_tabla(self, df):
+        """Matriz ``(n, n_features)`` a partir de un DataFrame con columnas arbitrarias.
+
+        Las columnas se emparejan con ``feature_names`` sin distinguir mayúsculas;
+        las que faltan (y las celdas vacías) se completan con 0. Como
+        ``matriz_desde_registros``, devuelve también el error de cada fila
+        (array de objetos, ``None`` si es válida): texto no numérico o valor no
+        finito en una celda. Las filas inválidas quedan en ceros.
+        """
+        import pandas as pd
+
+        X = np.zeros((len(df), len(self.feature_names)), dtype=np.float64)
+        errores = np.full(len(df), None, dtype=object)
+        for col in df.columns:
+            j = self.posiciones.get(str(col).strip().lower())
+            if j is None:
+                continue
+            valores = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            finitos = np.isfinite(valores)
+            # Celdas con algo escrito que no es un número finito (las vacías valen 0)
+            for i in np.flatnonzero(df[col].notna().to_numpy() & ~finitos):
+                if errores[i] is None:
+                    tipo = "no finito" if np.isinf(valores[i]) else "no numérico"
+                    errores[i] = f"valor {tipo} en '{col}': {df[col].iat[i]!r}"
+            X[:, j] = np.where(finitos, valores, 0.0)
+        X[errores.astype(bool)] = 0.0
+        return X, errores
+
+    def presentes_desde_tabla(self, df):
+        """Máscara ``(n, n_features)`` de las celdas informadas (no vacías) de un DataFrame.
+
+        Se calcula sobre la tabla original: las celdas vacías que
+        ``matriz_desde_tabla`` completa con 0 no cuentan como observadas.
+        """
+        presentes = np.zeros((len(df), len(self.feature_names)), dtype=bool)
+        for col in df.columns:
+            j = self.posiciones.get(str(col).strip().lower())
+            if j is not None:
+                presentes[:, j] = df[col].notna().to_numpy()
+        return presentes
+
+    def presentes_desde_registros(self, registros):
+        """Máscara ``(n, n_features)`` de los valores informados (no ausentes ni ``None``) en cada registro."""
+        presentes = np.zeros((len(registros), len(self.feature_names)), dtype=bool)
+        for i, registro in enumerate(registros):
+            for clave, valor in registro.items():
+                j = self.posiciones.get(str(clave).strip().lower())
+                if j is not None and valor is not None:
+                    presentes[i, j] = True
+        return presentes
+
+    def matriz_desde_registros(self, registros):
+        """Matriz ``(n, n_features)`` a partir de dicts (p. ej. líneas JSONL).
+
+        Misma regla que ``matriz_desde_tabla``: claves sin distinguir mayúsculas,
+        ausentes o ``None`` valen 0. Devuelve también una lista con el error de
+        cada registro (``None`` si es válido): valores no numéricos o no finitos
+        (``NaN``, ``Infinity``); los inválidos quedan en ceros.
+        """
+        X = np.zeros((len(registros), len(self.feature_names)), dtype=np.float64)
+        errores = [None] * len(registros)
+        for i, registro in enumerate(registros):
+            for clave, valor in registro.items():
+                j = self.posiciones.get(str(clave).strip().lower())
+                if j is None or valor is None:
+                    continue
+                try:
+                    X[i, j] = float(valor)
+                except (TypeError, ValueError):
+                    errores[i] = f"valor no numérico en '{clave}': {valor!r}"
+                if errores[i] is None and not np.isfinite(X[i, j]):
+                    errores[i] = f"valor no finito en '{clave}': {valor!r}"   # json acepta NaN e Infinity
+                if errores[i] is not None:
+                    X[i] = 0.0
+                    break
+        return X, errores
@@ -0,0 +1,215 @@
+"""Explicaciones del modelo: importancia global y contribuciones por paciente.
+
+* Importancia global: disminución media de impureza Gini (MDI), calculada
+  directamente sobre los arrays del bosque compilado. Coincide con
+  ``feature_importances_`` de sklearn y no necesita el objeto pickled.
+* Contribuciones por paciente: valores SHAP exactos con el algoritmo
+  TreeSHAP "path-dependent" (el mismo criterio de coberturas que usa la
+  librería ``shap``), vectorizado sobre todas las hojas del bosque.
+
+Para una hoja con valor ``v`` y variables distintas ``U`` en su camino, el
+valor esperado al conocer solo el subconjunto ``S`` es
+``v * prod_{j en U} (o_j si j en S, si no z_j)``, donde ``o_j`` indica si el
+paciente cumple todas las condiciones del camino sobre ``j`` y ``z_j`` es la
+fracción de cobertura que las sigue. Es un juego producto, cuyo valor de
+Shapley tiene forma cerrada::
+
+    phi_i = v * (o_i - z_i) * sum_k w(d, k) * [t^k] prod_{j != i} (z_j + o_j t)
+
+con ``w(d, k) = k! (d - 1 - k)! / d!``. Se precalculan por hoja las
+variables, intervalos y coberturas del camino; por paciente solo quedan
+operaciones sobre arrays ``(hojas, profundidad)``.
+"""
+
+import threading
+from math import factorial
+
+import numpy as np
+
+# Elementos máximos de los arrays intermedios por bloque de pacientes
+ELEMENTOS_POR_BLOQUE = 300_000
+
+# Nombres para mostrar de cada variable del modelo
+ETIQUETAS = {
+    "age": "Edad",
+    "BMI": "IMC",
+    "chol": "Colesterol",
+    "thalch": "Frecuencia Cardíaca",
+    "oldpeak": "Respuesta al Esfuerzo",
+    "diabetes": "Diabetes",
+    "prevalentHyp": "Hipertensión",
+    "prevalentStroke": "ACV Previo",
+    "BPMeds": "Antihipertensivos",
+    "sysBP": "Presión Sistólica",
+    "diaBP": "Presión Diastólica",
+    "glucose": "Glucosa",
+    "heartRate": "Pulso en Reposo",
+    "cigsPerDay": "Cigarrillos/Día",
+    "currentSmoker": "Fumador Actual",
+    "education": "Nivel Educativo",
+    "ca": "Vasos Coloreados (ca)",
+}
+
+
+def importancias_globales(motor):
+    """Importancia MDI normalizada por variable (igual a ``feature_importances_``)."""
+    n_features = int(motor.caracteristica.max()) + 1
+    importancia = np.zeros(n_features)
+    gini = 1.0 - np.sum(motor.valor ** 2, axis=1)
+    impureza = motor.cobertura * gini
+
+    for t, inicio in enumerate(motor.inicio):
+        fin = motor.inicio[t + 1] if t + 1 < motor.n_arboles else motor.n_nodos
+        nodos = np.arange(inicio, fin)
+        izq = inicio + motor.izquierdo[nodos]
+        der = inicio + motor.derecho[nodos]
+        interno = izq != nodos
+        decremento = impureza[nodos] - impureza[izq] - impureza[der]
+        arbol = np.bincount(motor.caracteristica[nodos][interno], weights=decremento[interno], minlength=n_features)
+        if arbol.sum() > 0:
+            importancia += arbol / arbol.sum()
+
+    return importancia / max(importancia.sum(), 1e-12)
+
+
+class ExplicadorTreeSHAP:
+    """Valores SHAP exactos (path-dependent) de la clase positiva del bosque."""
+
+    def __init__(self, motor, clase=1):
+        self.motor = motor
+        self.n_features = int(motor.caracteristica.max()) + 1
+        self._precalcular(clase)
+
+    def _precalcular(self, clase):
+        motor = self.motor
+        D = max(motor.profundidad, 1)
+        variables, bajos, altos, fracciones, valores = [], [], [], [], []
+        coberturas = motor.cobertura.astype(np.float64)   # Puede venir en float32 (bosque compacto)
+
+        for inicio in motor.inicio:
+            # Recorrido en profundidad: (nodo local, {variable: [bajo, alto, fracción]})
+            pila = [(0, {})]
+            while pila:
+                local, camino = pila.pop()
+                nodo = inicio + local
+                izq, der = motor.izquierdo[nodo], motor.derecho[nodo]
+                if izq == local:
+                    fila_var = np.zeros(D, dtype=np.int32)
+                    fila_bajo = np.full(D, np.inf)         # Relleno: o = 0
+                    fila_alto = np.full(D, -np.inf)
+                    fila_frac = np.ones(D)                 # Relleno: z = 1 (factor neutro)
+                    for k, (var, (bajo, alto, frac)) in enumerate(camino.items()):
+                        fila_var[k], fila_bajo[k], fila_alto[k], fila_frac[k] = var, bajo, alto, frac
+                    variables.append(fila_var)
+                    bajos.append(fila_bajo)
+                    altos.append(fila_alto)
+                    fracciones.append(fila_frac)
+                    valores.append((motor.valor[nodo, clase], len(camino)))
+                    continue
+
+                var = int(motor.caracteristica[nodo])
+                umbral = motor.umbral[nodo]
+                cobertura = coberturas[nodo]
+                bajo, alto, frac = camino.get(var, (-np.inf, np.inf, 1.0))
+                for hijo, nuevo_bajo, nuevo_alto in ((izq, bajo, min(alto, umbral)), (der, max(bajo, umbral), alto)):
+                    ratio = coberturas[inicio + hijo] / cobertura
+                    pila.append((hijo, {**camino, var: (nuevo_bajo, nuevo_alto, frac * ratio)}))
+
+        self.variables = np.array(variables)
+        self.bajos = np.array(bajos)
+        self.altos = np.array(altos)
+        self.fracciones = np.array(fracciones)
+        self.valores = np.array([v for v, _ in valores])
+        self.d = np.array([d for _, d in valores])
+        self.activo = np.arange(D)[None, :] < self.d[:, None]
+
+        # Pesos de Shapley w(d, k) por hoja; cero para k >= d
+        pesos = np.zeros((D + 1, D))
+        for d in range(1, D + 1):
+            for k in range(d):
+                pesos[d, k] = factorial(k) * factorial(d - 1 - k) / factorial(d)
+        self.pesos = pesos[self.d]
+
+        # Valor esperado del bosque (salida sin conocer ninguna variable)
+        self.valor_base = float(np.sum(self.valores * np.prod(self.fracciones, axis=1)) / motor.n_arboles)
+
+    def explicar(self, X):
+        """Contribuciones ``(n, n_features)`` a la probabilidad de la clase positiva.
+
+        Para cada fila, ``valor_base + contribuciones.sum()`` es la probabilidad
+        que entrega el bosque.
+        """
+        X = np.asarray(X, dtype=np.float32 if self.motor.entrada_float32 else np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        hojas, D = self.variables.shape
+        bloque = max(1, ELEMENTOS_POR_BLOQUE // (hojas * (D + 1)))
+        resultado = np.empty((len(X), self.n_features))
+        for desde in range(0, len(X), bloque):
+            resultado[desde:desde + bloque] = self._explicar_bloque(X[desde:desde + bloque])
+        return resultado
+
+    def _explicar_bloque(self, X):
+        n = len(X)
+        hojas, D = self.variables.shape
+        x = X[:, self.variables].astype(np.float64)                  # (n, hojas, D)
+        o = ((x > self.bajos) & (x <= self.altos)).astype(np.float64)
+        z = np.broadcast_to(self.fracciones, o.shape)
+
+        # Polinomio completo prod_j (z_j + o_j t), coeficientes de grado 0..D
+        P = np.zeros((n, hojas, D + 1))
+        P[..., 0] = 1.0
+        for j in range(D):
+            siguiente = P * z[..., j:j + 1]
+            siguiente[..., 1:] += P[..., :-1] * o[..., j:j + 1]
+            P = siguiente
+
+        # sum_k w_k [t^k] P / (z_i + o_i t) para cada variable i a la vez.
+        # Si o_i = 1: división sintética por (z_i + t), acumulando de grado alto a bajo.
+        Q = np.broadcast_to(P[..., D:D + 1], o.shape).copy()
+        suma = Q * self.pesos[:, None, D - 1]
+        for k in range(D - 1, 0, -1):
+            Q = P[..., k:k + 1] - z * Q
+            suma += Q * self.pesos[:, None, k - 1]
+        # Si o_i = 0: el factor es la constante z_i.
+        suma_cero = np.einsum("nhk,hk->nh", P[..., :D], self.pesos)[..., None] / z
+        suma = np.where(o > 0, suma, suma_cero)
+
+        phi = (self.valores[:, None] * self.activo) * (o - z) * suma   # (n, hojas, D)
+
+        # Acumula por variable: desplaza los índices de cada fila para un solo bincount
+        indices = self.variables[None, :, :] + (np.arange(n) * self.n_features)[:, None, None]
+        total = np.bincount(indices.ravel(), weights=phi.ravel(), minlength=n * self.n_features)
+        return total.reshape(n, self.n_features) / self.motor.n_arboles
+
+
+# --------------------------------------------------
+# CACHÉ POR VERSIÓN DEL MODELO
+# --------------------------------------------------
+# La importancia global es barata (~5 ms) y se pide al pintar la barra lateral;
+# el explicador TreeSHAP tarda unos cientos de ms en precalcularse, así que se
+# construye recién al primer uso o en el calentamiento de ``cardiorisk.arranque``.
+# Cada caché tiene su propio lock: pintar la barra lateral no espera al explicador.
+_importancias = ({}, threading.Lock())
+_explicadores = ({}, threading.Lock())
+
+
+def _por_version(cache, artefactos, construir):
+    valores, lock = cache
+    with lock:
+        valor = valores.get(artefactos.version)
+        if valor is None:
+            valor = construir(artefactos.motor_crudo)
+            valores.clear()     # Solo se conserva la versión vigente
+            valores[artefactos.version] = valor
+        return valor
+
+
+def importancias_para(artefactos):
+    """Importancia global MDI, calculada una vez por versión del modelo."""
+    return _por_version(_importancias, artefactos, importancias_globales)
+
+
+def explicador_para(artefactos):
+    """``ExplicadorTreeSHAP`` construido una vez por versión del modelo."""
+    return _por_version(_explicadores, artefactos, ExplicadorTreeSHAP)
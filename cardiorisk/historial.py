@@ -0,0 +1,94 @@
+"""Historial acotado de evaluaciones de una sesión, para comparar resultados.
+
+Cada sesión guarda sus últimas evaluaciones en un búfer circular de registros
+NumPy de tamaño fijo (``DTYPE_HISTORIAL``, ~47 bytes por evaluación): los 7
+datos del formulario, la probabilidad, la versión del modelo, la fecha y el
+número de evaluación dentro de la sesión. Agregar una evaluación escribe una
+fila en su lugar (O(1), sin DataFrames ni copias); al llenarse, la más nueva
+reemplaza a la más antigua. La memoria por sesión es ``capacidad`` filas sin
+importar cuánto dure la sesión.
+"""
+
+import time
+
+import numpy as np
+
+from cardiorisk.entrada import CAMPOS_USUARIO
+
+CAPACIDAD = 50
+CAPACIDAD_MAXIMA = 1_000
+
+# Tipos compactos: los rangos del formulario caben en int16/float32
+_TIPOS_CAMPOS = {
+    "age": np.int16,
+    "BMI": np.float32,
+    "chol": np.float32,
+    "thalch": np.int16,
+    "oldpeak": np.float32,
+    "diabetes": np.int8,
+    "prevalentHyp": np.int8,
+}
+
+DTYPE_HISTORIAL = np.dtype(
+    [("numero", np.uint32), ("fecha", np.float64)]
+    + [(campo, _TIPOS_CAMPOS[campo]) for campo in CAMPOS_USUARIO]
+    + [("prob_riesgo", np.float32), ("riesgo_alto", np.int8), ("version", "S12")]
+)
+
+
+class HistorialSesion:
+    """Búfer circular de evaluaciones con capacidad configurable."""
+
+    def __init__(self, capacidad=CAPACIDAD):
+        self._datos = np.zeros(capacidad, dtype=DTYPE_HISTORIAL)
+        self._siguiente = 0         # Posición donde se escribe la próxima evaluación
+        self._cantidad = 0
+        self.total = 0              # Evaluaciones agregadas en toda la sesión
+
+    @property
+    def capacidad(self):
+        return len(self._datos)
+
+    def __len__(self):
+        return self._cantidad
+
+    def agregar(self, paciente, resultado):
+        """Escribe una evaluación en el búfer, descartando la más antigua si está lleno."""
+        self.total += 1
+        fila = self._datos[self._siguiente]
+        fila["numero"] = self.total
+        fila["fecha"] = time.time()
+        for campo in CAMPOS_USUARIO:
+            fila[campo] = paciente[campo]
+        fila["prob_riesgo"] = resultado["prob_riesgo"]
+        fila["riesgo_alto"] = resultado["riesgo_alto"]
+        fila["version"] = str(resultado.get("version") or "")[:12].encode("ascii", "replace")
+        self._siguiente = (self._siguiente + 1) % self.capacidad
+        self._cantidad = min(self._cantidad + 1, self.capacidad)
+
+    def registros(self):
+        """Evaluaciones guardadas, de la más antigua a la más reciente (array estructurado)."""
+        if self._cantidad < self.capacidad:
+            return self._datos[:self._cantidad]
+        return np.concatenate((self._datos[self._siguiente:], self._datos[:self._siguiente]))
+
+    def anterior(self):
+        """Evaluación previa a la última (fila del array), o ``None``."""
+        if self._cantidad < 2:
+            return None
+        return self._datos[(self._siguiente - 2) % self.capacidad]
+
+    def redimensionar(self, capacidad):
+        """Cambia la capacidad conservando las evaluaciones más recientes que quepan."""
+        capacidad = int(min(max(capacidad, 1), CAPACIDAD_MAXIMA))
+        if capacidad == self.capacidad:
+            return
+        recientes = self.registros()[-capacidad:]
+        self._datos = np.zeros(capacidad, dtype=DTYPE_HISTORIAL)
+        self._datos[:len(recientes)] = recientes
+        self._cantidad = len(recientes)
+        self._siguiente = self._cantidad % capacidad
+
+    def limpiar(self):
+        self._cantidad = 0
+        self._siguiente = 0
@@ -0,0 +1,78 @@
+"""Incertidumbre de la predicción: dispersión entre árboles y ruido de medición.
+
+* Votos del conjunto: la probabilidad del bosque es el promedio de sus
+  árboles; la fracción de árboles que votan "alto riesgo" y el error estándar
+  de ese promedio salen del mismo recorrido que la predicción.
+* Ruido de medición (Monte Carlo): se perturban las entradas dentro de la
+  tolerancia clínica de cada medición y todas las muestras se evalúan como un
+  único lote.
+"""
+
+import numpy as np
+
+from cardiorisk.entrada import CAMPOS_USUARIO, PASOS, RANGOS
+
+# Desviación estándar del error de medición de cada campo del formulario.
+# Edad y diagnósticos (diabetes, hipertensión) se consideran exactos.
+TOLERANCIAS = {
+    "age": 0.0,
+    "BMI": 0.5,             # Balanza y tallímetro clínicos
+    "chol": 10.0,           # Variabilidad analítica del colesterol total (mg/dL)
+    "thalch": 5.0,          # Lectura de frecuencia máxima (lpm)
+    "oldpeak": 0.1,         # Lectura del descenso ST (mm)
+    "diabetes": 0.0,
+    "prevalentHyp": 0.0,
+}
+
+MUESTRAS_MONTE_CARLO = 500
+
+# Cuantil normal del intervalo del 95 %
+_Z_95 = 1.959964
+
+
+def resumen_votos(votos, umbral=0.5):
+    """Resumen por fila de las probabilidades ``(n, n_arboles)`` de cada árbol.
+
+    Devuelve arrays ``votos_alto`` (fracción de árboles por encima de
+    ``umbral``), ``desviacion`` (entre árboles) e ``intervalo`` ``(n, 2)``, el
+    IC del 95 % del promedio del conjunto.
+    """
+    media = votos.mean(axis=1)
+    desviacion = votos.std(axis=1)
+    margen = _Z_95 * desviacion / np.sqrt(votos.shape[1])
+    return {
+        "votos_alto": (votos > umbral).mean(axis=1),
+        "desviacion": desviacion,
+        "intervalo": np.clip(np.column_stack([media - margen, media + margen]), 0.0, 1.0),
+    }
+
+
+def muestras_ruido(paciente, muestras=MUESTRAS_MONTE_CARLO, semilla=0):
+    """Matriz ``(muestras, 7)`` con el paciente perturbado por el ruido de medición.
+
+    Cada valor se recorta al rango del widget y se redondea a su paso, igual
+    que si se hubiera ingresado en el formulario.
+    """
+    rng = np.random.default_rng(semilla)
+    base = np.array([float(paciente[campo]) for campo in CAMPOS_USUARIO])
+    sigma = np.array([TOLERANCIAS[campo] for campo in CAMPOS_USUARIO])
+    valores = base + rng.standard_normal((muestras, len(CAMPOS_USUARIO))) * sigma
+    minimos, maximos = np.array([RANGOS[campo] for campo in CAMPOS_USUARIO], dtype=np.float64).T
+    pasos = np.array([PASOS[campo] for campo in CAMPOS_USUARIO])
+    return np.round(np.clip(valores, minimos, maximos) / pasos) * pasos
+
+
+def ruido_medicion(motor, plantilla, paciente, muestras=MUESTRAS_MONTE_CARLO, semilla=0):
+    """Evalúa las muestras perturbadas en un solo lote.
+
+    Devuelve la probabilidad media, el intervalo central del 95 % y la fracción
+    de muestras clasificadas como alto riesgo.
+    """
+    etiquetas, probabilidades = motor.predecir(plantilla.matriz(muestras_ruido(paciente, muestras, semilla)))
+    probabilidades = probabilidades[:, 1]
+    return {
+        "muestras": muestras,
+        "media": float(probabilidades.mean()),
+        "intervalo": tuple(float(p) for p in np.percentile(probabilidades, [2.5, 97.5])),
+        "fraccion_alto": float(etiquetas.mean()),
+    }
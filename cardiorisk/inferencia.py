@@ -0,0 +1,100 @@
+"""Evaluación compartida de pacientes individuales para todo el proceso.
+
+Tanto los hilos de sesión de Streamlit como el servicio HTTP envían cada
+paciente al mismo ``MicroLotificador``; las solicitudes que coinciden en el
+tiempo se evalúan juntas en una sola pasada del bosque compilado, en lugar de
+competir por el GIL con llamadas pequeñas. Delante del lotificador hay una
+caché de predicciones compartida (``cardiorisk.cache``).
+"""
+
+import threading
+
+from cardiorisk.auditoria import bitacora
+from cardiorisk.cache import cache_predicciones, clave_cuantizada
+from cardiorisk.deriva import observar_registros
+from cardiorisk.entrada import CAMPOS_USUARIO
+from cardiorisk.incertidumbre import resumen_votos
+from cardiorisk.lotes import COLUMNA_ETIQUETA, COLUMNA_PROBABILIDAD
+from cardiorisk.metricas import metricas
+from cardiorisk.microlotes import MicroLotificador
+from cardiorisk.registro import registro
+from cardiorisk.variantes import motor_para, variante_activa
+
+# Parámetros del lotificador compartido por las sesiones de la app
+MAX_LOTE = 64
+MAX_ESPERA_MS = 2.0
+
+_lotificador = None
+_lock = threading.Lock()
+
+
+def predecir_pacientes(pacientes):
+    """Evalúa un lote de pacientes (dicts ``{campo: valor}``) con una sola llamada al bosque.
+
+    La matriz se arma aquí, con la plantilla de la misma versión del modelo que
+    la evalúa, por si los artefactos se recargaron mientras la solicitud esperaba.
+    """
+    artefactos = registro.obtener()
+    with metricas.medir("vector"):
+        X, _ = artefactos.plantilla.matriz_desde_registros(pacientes)
+    # No hay etapa de escalado: el escalador está plegado en los umbrales
+    with metricas.medir("bosque"):
+        etiquetas, probabilidades, votos = motor_para("interactivo", artefactos).predecir_votos(X)
+    votos = resumen_votos(votos)
+    return [
+        {
+            COLUMNA_PROBABILIDAD: round(float(probabilidades[i, 1]), 6),
+            COLUMNA_ETIQUETA: int(etiquetas[i]),
+            "votos_alto": round(float(votos["votos_alto"][i]), 4),
+            "ic_inferior": round(float(votos["intervalo"][i, 0]), 6),
+            "ic_superior": round(float(votos["intervalo"][i, 1]), 6),
+            "version": artefactos.version,
+        }
+        for i in range(len(X))
+    ]
+
+
+def lotificador_compartido():
+    """``MicroLotificador`` único del proceso (se crea en el primer uso)."""
+    global _lotificador
+    if _lotificador is None:
+        with _lock:
+            if _lotificador is None:
+                _lotificador = MicroLotificador(
+                    predecir_pacientes, max_lote=MAX_LOTE, max_espera_ms=MAX_ESPERA_MS, nombre="inferencia-app",
+                )
+    return _lotificador
+
+
+def predecir_paciente(paciente, lotificador=None, timeout=None, origen="app"):
+    """Predicción de un paciente pasando por la caché compartida y un lotificador.
+
+    Solo se usa la caché cuando el paciente trae únicamente campos del
+    formulario (la clave no distingue el resto de variables) y sus valores
+    están sobre la rejilla de pasos de los widgets. Por defecto se
+    usa el lotificador compartido del proceso. Cada resultado se encola en la
+    bitácora de auditoría con su ``origen`` y se suma al monitor de deriva,
+    también los que vienen de la caché.
+    """
+    resultado = _predecir_paciente(paciente, lotificador or lotificador_compartido(), timeout)
+    bitacora.registrar(paciente, resultado, origen)
+    observar_registros(registro.obtener(), [paciente])
+    return resultado
+
+
+def _predecir_paciente(paciente, lotificador, timeout):
+    if not set(paciente) <= set(CAMPOS_USUARIO):
+        return lotificador.enviar(paciente).result(timeout)
+
+    # La clave incluye la variante del bosque: cambiar la selección no reutiliza resultados
+    artefactos = registro.obtener()
+    motor_para("interactivo", artefactos)
+    clave = clave_cuantizada(paciente, f"{artefactos.version}/{variante_activa('interactivo')}")
+    if clave is None:
+        # Fuera de la rejilla del formulario: otro valor con la misma clave daría otro resultado
+        return lotificador.enviar(paciente).result(timeout)
+    resultado = cache_predicciones.obtener(clave)
+    if resultado is None:
+        resultado = lotificador.enviar(paciente).result(timeout)
+        cache_predicciones.guardar(clave, resultado)
+    return resultado
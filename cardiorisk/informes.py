@@ -0,0 +1,431 @@
+"""Generación de informes imprimibles en segundo plano.
+
+El "Informe Médico Preliminar" de un paciente (datos ingresados, probabilidad,
+gauge, interpretación y recomendaciones) se arma fuera del hilo de Streamlit:
+la app encarga el trabajo y recibe un ``TrabajoInforme`` cuyo avance consulta
+mientras un pool acotado de hilos escribe el archivo.
+
+* **Informe individual**: un documento HTML (o PDF si ``weasyprint`` está
+  instalado).
+* **Informe de lote**: un ZIP con un documento por paciente, leído fila a
+  fila del CSV de resultados de ``cardiorisk.lotes`` y escrito en el ZIP a
+  medida que se produce. La memoria no depende del tamaño del lote. El CSV se
+  lee con ``csv`` y no con pandas: importar pandas en un hilo de fondo hace
+  fallar las figuras de plotly de las sesiones (ver ``cardiorisk.arranque``).
+* **Contribuciones de un lote**: un CSV con los valores TreeSHAP de las
+  primeras ``MAX_FILAS_CONTRIBUCIONES`` filas del mismo CSV de resultados.
+  TreeSHAP exacto recorre todas las hojas del bosque por paciente (unas
+  decenas de filas por segundo), así que no entra en la evaluación del lote y
+  se limita a las filas que alguien va a revisar una por una.
+
+El gauge sale del esqueleto cacheado de ``cardiorisk.presentacion`` (solo se
+parchean el valor y la banda) y se dibuja con plotly.js en el navegador.
+plotly.js viaja con el informe (incrustado en el HTML, o una sola copia junto
+a los documentos del ZIP), así que se ve sin conexión; el resto del documento
+es una plantilla fija con CSS para impresión. El PDF no
+ejecuta JavaScript: en él el gauge se reemplaza por la barra de probabilidad
+que el HTML también incluye.
+
+El pool tiene ``max_trabajadores`` hilos y acepta como mucho
+``max_pendientes`` trabajos sin terminar; más allá de eso los encargos lanzan
+``RuntimeError`` para que la app avise en lugar de acumular trabajo. Son
+hilos y no procesos: el trabajo es armar texto y escribir archivos, y así los
+informes comparten el esqueleto del gauge ya construido.
+"""
+
+import atexit
+import csv
+import html
+import io
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from string import Template
+
+from cardiorisk import presentacion
+from cardiorisk.entrada import CAMPOS_USUARIO
+from cardiorisk.explicacion import ETIQUETAS
+from cardiorisk.lotes import (
+    COLUMNA_ARBOLES, COLUMNA_ERROR, COLUMNA_ETIQUETA, COLUMNA_PROBABILIDAD, PREFIJO_CONTRIBUCION,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_TRABAJADORES = 2
+MAX_PENDIENTES = 8
+MAX_HISTORIAL = 32              # Trabajos terminados que se recuerdan (y cuyos archivos se conservan)
+# Los informes tienen datos de pacientes: cada proceso los escribe en un directorio
+# temporal propio (0o700, se borra al salir) y cada archivo se crea con permisos 0o600
+PERMISOS_DIRECTORIO = 0o700
+PERMISOS_ARCHIVO = 0o600
+
+# Filas de un lote con contribuciones TreeSHAP (~40 filas/s por hilo)
+MAX_FILAS_CONTRIBUCIONES = 500
+FILAS_POR_PASO_CONTRIBUCIONES = 20      # Cada cuántas filas se actualiza el avance
+
+# En el ZIP de un lote, plotly.js va una vez en este archivo y no en cada documento
+ARCHIVO_PLOTLYJS = "plotly.min.js"
+
+
+@lru_cache(maxsize=1)
+def formatos_disponibles():
+    """``("html",)`` más ``"pdf"`` si ``weasyprint`` está instalado."""
+    try:
+        import weasyprint  # noqa: F401
+    except ImportError:
+        return ("html",)
+    return ("html", "pdf")
+
+
+# --------------------------------------------------
+# DOCUMENTO
+# --------------------------------------------------
+_ESTILO = presentacion.compactar("""
+    <style>
+        body { font-family: Inter, Arial, sans-serif; color: #1E293B; max-width: 820px; margin: 2rem auto; }
+        h1 { font-size: 1.5rem; margin: 0; }
+        .meta { color: #64748B; font-size: 0.85rem; margin: 0.3rem 0 1.5rem; }
+        .rama { padding: 1rem 1.5rem; border-radius: 10px; font-weight: 700; letter-spacing: 1px; }
+        .rama-bajo { background: #E8F8F5; color: #1E8449; border-left: 6px solid #27AE60; }
+        .rama-alto { background: #FDEDEC; color: #C0392B; border-left: 6px solid #E74C3C; }
+        table { border-collapse: collapse; width: 100%; margin: 1rem 0; }
+        td, th { border-bottom: 1px solid #E2E8F0; padding: 0.4rem 0.6rem; text-align: left; }
+        .barra { height: 14px; background: #E2E8F0; border-radius: 7px; overflow: hidden; }
+        .barra > div { height: 100%; }
+        .gauge { height: 300px; }
+        .aviso { color: #64748B; font-size: 0.8rem; margin-top: 2rem; }
+        @media print { .gauge { page-break-inside: avoid; } body { margin: 0 auto; } }
+    </style>
+""")
+
+_PLANTILLA = Template(presentacion.compactar("""
+    <!DOCTYPE html>
+    <html lang="es"><head><meta charset="utf-8"><title>Informe Médico Preliminar · $paciente</title>$estilo</head>
+    <body>
+        <h1>🫀 Informe Médico Preliminar</h1>
+        <div class="meta">Paciente: $paciente · Fecha: $fecha · Modelo v$version</div>
+        <div class="rama rama-$clase_rama">$titulo_rama</div>
+        <h3>Datos clínicos</h3>
+        <table>$filas</table>
+        <h3>Probabilidad de riesgo: $probabilidad</h3>
+        <div class="barra"><div style="width: $ancho%; background: $color;"></div></div>
+        <p>$banda</p>
+        <div id="gauge" class="gauge"></div>
+        <h3>Interpretación</h3>
+        <p>$interpretacion</p>
+        $recomendaciones
+        <p class="aviso">Estimación de un modelo estadístico como apoyo a la decisión clínica; no reemplaza la evaluación de un profesional de la salud.</p>
+        $script
+    </body></html>
+"""))
+
+_SCRIPT_GAUGE = Template(
+    '$plotlyjs'
+    '<script>var g = $spec; Plotly.newPlot("gauge", g.data, g.layout, {displayModeBar: false, staticPlot: true});</script>'
+)
+
+
+@lru_cache(maxsize=1)
+def _plotlyjs():
+    """Código de plotly.js (unos 4.8 MB), leído una vez por proceso."""
+    from plotly.offline import get_plotlyjs
+
+    return get_plotlyjs()
+
+
+def _formatear(valor):
+    if isinstance(valor, float):
+        return f"{valor:g}"
+    return html.escape(str(valor))
+
+
+def documento_html(paciente, prob, riesgo_alto, version, identificador="—", banda=None, fecha=None, gauge=True,
+                   ruta_plotlyjs=None):
+    """Informe completo de un paciente como texto HTML.
+
+    ``paciente`` es un dict ``{variable: valor}``; se listan primero los
+    campos del formulario y luego cualquier otra variable presente.
+    plotly.js se incrusta en el documento salvo que ``ruta_plotlyjs`` indique
+    un archivo local (relativo al documento) que lo contenga.
+    """
+    riesgo_alto = bool(riesgo_alto)
+    campos = [c for c in CAMPOS_USUARIO if c in paciente] + [c for c in paciente if c not in CAMPOS_USUARIO]
+    filas = "".join(
+        f"<tr><th>{html.escape(ETIQUETAS.get(campo, campo))}</th><td>{_formatear(paciente[campo])}</td></tr>"
+        for campo in campos
+    )
+    if banda is None:
+        texto_banda = ""
+        banda = (prob, prob)
+    else:
+        texto_banda = f"Intervalo del conjunto: {banda[0]:.1%} – {banda[1]:.1%}"
+    script = ""
+    if gauge:
+        spec = presentacion.especificacion_gauge(prob, banda, riesgo_alto)
+        if ruta_plotlyjs is None:
+            plotlyjs = f"<script>{_plotlyjs()}</script>"
+        else:
+            plotlyjs = f'<script src="{html.escape(ruta_plotlyjs)}"></script>'
+        script = _SCRIPT_GAUGE.substitute(plotlyjs=plotlyjs, spec=json.dumps(spec, separators=(",", ":")))
+    return _PLANTILLA.substitute(
+        estilo=_ESTILO,
+        paciente=html.escape(str(identificador)),
+        fecha=time.strftime("%Y-%m-%d %H:%M", time.localtime(fecha)),
+        version=html.escape(str(version)),
+        clase_rama="alto" if riesgo_alto else "bajo",
+        titulo_rama=presentacion.TITULO_RAMA[riesgo_alto],
+        filas=filas,
+        probabilidad=f"{prob:.1%}",
+        ancho=f"{prob * 100:.1f}",
+        color=presentacion.RAMAS[riesgo_alto]["barra"],
+        banda=texto_banda,
+        interpretacion=presentacion.TEXTO_INTERPRETACION[riesgo_alto],
+        recomendaciones=presentacion.HTML_RECOMENDACIONES[riesgo_alto],
+        script=script,
+    )
+
+
+def _documento(formato, **kwargs):
+    """Bytes del documento en ``formato`` (``"html"`` o ``"pdf"``)."""
+    if formato == "pdf":
+        from weasyprint import HTML
+
+        return HTML(string=documento_html(gauge=False, **kwargs)).write_pdf()
+    return documento_html(**kwargs).encode("utf-8")
+
+
+# --------------------------------------------------
+# TRABAJOS
+# --------------------------------------------------
+class TrabajoInforme:
+    """Estado de un informe encargado; lo actualiza el hilo que lo genera."""
+
+    def __init__(self, id, descripcion, total, ruta, nombre, mime):
+        self.id = id
+        self.descripcion = descripcion
+        self.total = total              # Pacientes esperados (None si no se conoce de antemano)
+        self.hechos = 0
+        self.estado = "pendiente"       # pendiente · en curso · listo · error
+        self.error = None
+        self.ruta = ruta                # Archivo generado (válido con estado "listo")
+        self.archivo_creado = False     # El archivo lo creó este trabajo (y solo entonces se borra)
+        self.nombre = nombre            # Nombre sugerido para la descarga
+        self.mime = mime
+        self.creado = time.time()
+        self.segundos = None
+
+    @property
+    def terminado(self):
+        return self.estado in ("listo", "error")
+
+    @property
+    def avance(self):
+        if self.estado == "listo":
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.hechos / self.total, 1.0)
+
+
+class GeneradorInformes:
+    """Pool acotado de hilos que genera informes y recuerda los últimos trabajos.
+
+    Sin ``directorio``, los archivos van a un directorio temporal privado que
+    se crea con el primer encargo y se borra al terminar el proceso.
+    """
+
+    def __init__(self, max_trabajadores=MAX_TRABAJADORES, max_pendientes=MAX_PENDIENTES, directorio=None):
+        self.max_trabajadores = max_trabajadores
+        self.max_pendientes = max_pendientes
+        self.directorio = directorio
+        self._pool = None
+        self._lock = threading.Lock()
+        self._trabajos = {}
+        self._ids = itertools.count(1)
+
+    def _encargar(self, descripcion, total, extension, mime, generar, *args):
+        with self._lock:
+            pendientes = sum(not t.terminado for t in self._trabajos.values())
+            if pendientes >= self.max_pendientes:
+                raise RuntimeError(f"Hay {pendientes} informes en preparación; intente de nuevo en unos segundos")
+            if self._pool is None:
+                # El pool se crea con el primer encargo: importar el módulo no crea hilos ni archivos
+                if self.directorio is None:
+                    self.directorio = tempfile.mkdtemp(prefix="cardiorisk-informes-")     # Ya con 0o700
+                    atexit.register(shutil.rmtree, self.directorio, ignore_errors=True)
+                else:
+                    os.makedirs(self.directorio, mode=PERMISOS_DIRECTORIO, exist_ok=True)
+                self._pool = ThreadPoolExecutor(self.max_trabajadores, thread_name_prefix="informes")
+            id = next(self._ids)
+            ruta = os.path.join(self.directorio, f"informe_{os.getpid()}_{id}.{extension}")
+            trabajo = TrabajoInforme(id, descripcion, total, ruta, f"{descripcion}.{extension}", mime)
+            self._trabajos[id] = trabajo
+            self._olvidar_antiguos()
+        self._pool.submit(self._ejecutar, trabajo, generar, *args)
+        return trabajo
+
+    def _olvidar_antiguos(self):
+        terminados = sorted((t for t in self._trabajos.values() if t.terminado), key=lambda t: t.creado)
+        for trabajo in terminados[:max(len(terminados) - MAX_HISTORIAL, 0)]:
+            del self._trabajos[trabajo.id]
+            if trabajo.archivo_creado and os.path.exists(trabajo.ruta):
+                os.remove(trabajo.ruta)
+
+    def _ejecutar(self, trabajo, generar, *args):
+        trabajo.estado = "en curso"
+        t0 = time.perf_counter()
+        try:
+            generar(trabajo, *args)
+            trabajo.estado = "listo"
+        except Exception as e:
+            logger.exception("Falló el informe %s", trabajo.descripcion)
+            trabajo.error = str(e)
+            trabajo.estado = "error"
+        finally:
+            trabajo.segundos = time.perf_counter() - t0
+
+    def trabajo(self, id):
+        with self._lock:
+            return self._trabajos.get(id)
+
+    def estadisticas(self):
+        with self._lock:
+            estados = [t.estado for t in self._trabajos.values()]
+        return {estado: estados.count(estado) for estado in ("pendiente", "en curso", "listo", "error")}
+
+    # --------------------------------------------------
+    # INFORME INDIVIDUAL
+    # --------------------------------------------------
+    def informe_paciente(self, paciente, resultado, formato="html"):
+        """Encarga el informe de un paciente evaluado (``resultado`` de ``predecir_paciente``)."""
+        return self._encargar(
+            time.strftime("informe_%Y%m%d_%H%M%S"), 1, formato, _MIME[formato], _generar_paciente,
+            dict(paciente), dict(resultado), formato,
+        )
+
+    # --------------------------------------------------
+    # INFORME DE LOTE
+    # --------------------------------------------------
+    def informe_lote(self, ruta_resultados, nombre, version, total=None, formato="html"):
+        """Encarga un ZIP con un informe por fila del CSV de resultados de un lote."""
+        return self._encargar(
+            f"informes_{nombre.rsplit('.', 1)[0]}", total, "zip", "application/zip", _generar_lote,
+            ruta_resultados, version, formato,
+        )
+
+
+    # --------------------------------------------------
+    # CONTRIBUCIONES DE UN LOTE
+    # --------------------------------------------------
+    def contribuciones_lote(self, ruta_resultados, nombre, explicador, plantilla, total=None,
+                            max_filas=MAX_FILAS_CONTRIBUCIONES):
+        """Encarga un CSV con las contribuciones TreeSHAP de las primeras ``max_filas`` filas de un lote.
+
+        ``total`` son las filas del lote, si se conocen (solo para el avance).
+        """
+        return self._encargar(
+            f"contribuciones_{nombre.rsplit('.', 1)[0]}", min(total or max_filas, max_filas), "csv", "text/csv",
+            _generar_contribuciones, ruta_resultados, explicador, plantilla, max_filas,
+        )
+
+
+_MIME = {"html": "text/html", "pdf": "application/pdf"}
+
+
+def _crear_archivo(trabajo):
+    """Abre ``trabajo.ruta`` para escribir, creándolo con ``PERMISOS_ARCHIVO``.
+
+    ``O_EXCL`` falla si ya existe: nunca se escribe (ni luego se borra) un
+    archivo que no haya creado este trabajo.
+    """
+    descriptor = os.open(trabajo.ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, PERMISOS_ARCHIVO)
+    trabajo.archivo_creado = True
+    return os.fdopen(descriptor, "wb")
+
+
+def _generar_paciente(trabajo, paciente, resultado, formato):
+    datos = _documento(
+        formato,
+        paciente=paciente,
+        prob=resultado["prob_riesgo"],
+        riesgo_alto=resultado["riesgo_alto"],
+        version=resultado.get("version"),
+        banda=(resultado["ic_inferior"], resultado["ic_superior"]) if "ic_inferior" in resultado else None,
+    )
+    with _crear_archivo(trabajo) as f:
+        f.write(datos)
+    trabajo.hechos = 1
+
+
+def _valor(texto):
+    try:
+        return float(texto)
+    except ValueError:
+        return texto
+
+
+def _generar_lote(trabajo, ruta_resultados, version, formato):
+    ancho = len(str(trabajo.total)) if trabajo.total else 6
+    fecha = time.time()
+    with open(ruta_resultados, newline="", encoding="utf-8") as origen, \
+            _crear_archivo(trabajo) as archivo, \
+            zipfile.ZipFile(archivo, "w", compression=zipfile.ZIP_DEFLATED) as destino:
+        lector = csv.DictReader(origen)
+        if COLUMNA_PROBABILIDAD not in (lector.fieldnames or []):
+            raise ValueError("El lote se evaluó solo con etiqueta (tamizaje rápido); no hay probabilidades")
+        if formato == "html":
+            destino.writestr(ARCHIVO_PLOTLYJS, _plotlyjs())
+        for fila in lector:
+            numero = trabajo.hechos + 1
+            if fila.pop(COLUMNA_ERROR, ""):
+                trabajo.hechos = numero     # Fila no evaluada (valores no numéricos): sin informe
+                continue
+            prob = float(fila.pop(COLUMNA_PROBABILIDAD))
+            riesgo_alto = int(float(fila.pop(COLUMNA_ETIQUETA)))
+            identificador = fila.pop("id", "") or numero
+            paciente = {
+                campo: _valor(texto) for campo, texto in fila.items()
+                if texto != "" and campo != COLUMNA_ARBOLES and not campo.startswith(PREFIJO_CONTRIBUCION)
+            }
+            datos = _documento(
+                formato, paciente=paciente, prob=prob, riesgo_alto=riesgo_alto,
+                version=version, identificador=identificador, fecha=fecha, ruta_plotlyjs=ARCHIVO_PLOTLYJS,
+            )
+            destino.writestr(f"paciente_{numero:0{ancho}d}.{formato}", datos)
+            trabajo.hechos = numero
+
+
+def _generar_contribuciones(trabajo, ruta_resultados, explicador, plantilla, max_filas):
+    nombres = list(plantilla.feature_names)
+    with open(ruta_resultados, newline="", encoding="utf-8") as origen, \
+            _crear_archivo(trabajo) as archivo, \
+            io.TextIOWrapper(archivo, encoding="utf-8", newline="") as destino:
+        escritor = csv.writer(destino)
+        escritor.writerow(["fila", "id", *(PREFIJO_CONTRIBUCION + nombre for nombre in nombres)])
+        filas = itertools.islice(csv.DictReader(origen), max_filas)
+        for paso in iter(lambda: list(itertools.islice(filas, FILAS_POR_PASO_CONTRIBUCIONES)), []):
+            # Las filas no evaluadas (valores no numéricos) quedan sin contribuciones
+            validas = [fila for fila in paso if not fila.get(COLUMNA_ERROR)]
+            registros = [{campo: texto for campo, texto in fila.items() if texto != ""} for fila in validas]
+            X, _ = plantilla.matriz_desde_registros(registros)
+            contribuciones = iter(explicador.explicar(X))
+            for fila in paso:
+                numero = trabajo.hechos + 1
+                if fila.get(COLUMNA_ERROR):
+                    valores = [""] * len(nombres)
+                else:
+                    valores = [round(float(v), 6) for v in next(contribuciones)]
+                escritor.writerow([numero, fila.get("id", ""), *valores])
+                trabajo.hechos = numero
+
+
+# Instancia única por proceso, compartida por todas las sesiones
+generador_informes = GeneradorInformes()
@@ -0,0 +1,145 @@
+"""Evaluación por lotes de archivos CSV/Parquet.
+
+El archivo se lee en bloques de tamaño fijo y cada bloque se evalúa con una
+sola llamada vectorizada al bosque compilado. Los resultados se escriben al
+disco a medida que se producen, así que la memoria usada depende del tamaño
+del bloque y no del tamaño del archivo.
+"""
+
+import time
+
+import numpy as np
+
+TAM_BLOQUE = 10_000
+
+# Columnas agregadas al archivo de resultados
+COLUMNA_PROBABILIDAD = "prob_riesgo"
+COLUMNA_ETIQUETA = "riesgo_alto"
+PREFIJO_CONTRIBUCION = "contrib_"
+COLUMNA_ARBOLES = "arboles_evaluados"
+COLUMNA_ERROR = "error"
+
+
+def es_parquet(nombre):
+    return str(nombre).lower().endswith((".parquet", ".pq"))
+
+
+def errores_de_lectura():
+    """Excepciones de un archivo vacío o mal formado, para informarlas en lugar de fallar."""
+    import pandas as pd
+
+    errores = (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError)
+    try:
+        import pyarrow
+    except ImportError:
+        return errores
+    return errores + (pyarrow.ArrowInvalid,)
+
+
+def leer_bloques(archivo, nombre, tam_bloque=TAM_BLOQUE):
+    """Itera ``(DataFrame, avance)`` con bloques de hasta ``tam_bloque`` filas.
+
+    ``avance`` es la fracción (0-1) del archivo ya leída, útil para barras de
+    progreso. ``archivo`` puede ser una ruta o un objeto tipo archivo.
+    """
+    if es_parquet(nombre):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(archivo)
+        total = max(parquet.metadata.num_rows, 1)
+        leidas = 0
+        for lote in parquet.iter_batches(batch_size=tam_bloque):
+            leidas += lote.num_rows
+            yield lote.to_pandas(), leidas / total
+    else:
+        import pandas as pd
+
+        # Avance aproximado según la posición de lectura en el archivo
+        total = getattr(archivo, "size", None)
+        # index_col=False: una coma final en las filas no convierte la primera columna en índice
+        for df in pd.read_csv(archivo, chunksize=tam_bloque, index_col=False):
+            avance = min(archivo.tell() / total, 1.0) if total else 0.0
+            yield df, avance
+
+
+def puntuar_bloques(bloques, motor, plantilla, confianza=None, monitor=None):
+    """Agrega probabilidad y etiqueta a cada bloque ``(DataFrame, avance)``.
+
+    Las contribuciones SHAP no se calculan aquí: a unas decenas de filas por
+    segundo detendrían el lote entero. Las da ``GeneradorInformes.contribuciones_lote``
+    para las primeras filas del resultado. Con ``confianza`` se hace un tamizaje
+    solo de etiqueta con evaluación anticipada del bosque: en lugar de la
+    probabilidad se agrega cuántos árboles se evaluaron por fila. Con
+    ``monitor`` (``MonitorDeriva``) cada bloque se suma al monitor de deriva.
+
+    Las filas con texto no numérico no detienen el bloque, igual que en la
+    CLI: quedan sin resultados y con el motivo en la columna ``error``.
+    """
+    import pandas as pd
+
+    for df, avance in bloques:
+        X, errores = plantilla.matriz_desde_tabla(df)
+        invalidas = errores.astype(bool)        # None -> False, mensaje -> True
+        if monitor is not None:
+            monitor.observar(X[~invalidas], plantilla.presentes_desde_tabla(df)[~invalidas])
+        if confianza is None:
+            etiquetas, probabilidades = motor.predecir(X)
+            columnas = {COLUMNA_PROBABILIDAD: np.where(invalidas, np.nan, np.round(probabilidades[:, 1], 6))}
+        else:
+            etiquetas, arboles = motor.predecir_anticipado(X, confianza=confianza)
+            columnas = {COLUMNA_ARBOLES: _sin_invalidas(arboles.astype(np.int16), "Int16", invalidas)}
+        columnas[COLUMNA_ETIQUETA] = _sin_invalidas(etiquetas.astype(np.int8), "Int8", invalidas)
+        columnas[COLUMNA_ERROR] = pd.array(errores, dtype="string")
+        yield df.assign(**columnas), avance
+
+
+def _sin_invalidas(valores, tipo, invalidas):
+    """Columna entera que queda vacía (``<NA>``) en las filas inválidas."""
+    import pandas as pd
+
+    columna = pd.array(valores, dtype=tipo)
+    columna[invalidas] = pd.NA
+    return columna
+
+
+def puntuar_archivo(archivo, nombre, destino, motor, plantilla, tam_bloque=TAM_BLOQUE, al_avanzar=None,
+                    confianza=None, monitor=None):
+    """Evalúa ``archivo`` y escribe los resultados en ``destino`` como CSV.
+
+    ``al_avanzar(avance, filas, filas_por_segundo)`` se invoca tras cada bloque.
+    Devuelve un resumen con filas procesadas, filas inválidas (no evaluadas),
+    segundos, casos de alto riesgo y árboles evaluados en promedio por fila
+    válida.
+    """
+    filas = 0
+    invalidas = 0
+    alto_riesgo = 0
+    arboles = 0
+    t0 = time.perf_counter()
+
+    bloques = puntuar_bloques(
+        leer_bloques(archivo, nombre, tam_bloque), motor, plantilla, confianza, monitor,
+    )
+    with open(destino, "w", newline="", encoding="utf-8") as salida:
+        for i, (df, avance) in enumerate(bloques):
+            df.to_csv(salida, index=False, header=(i == 0))
+            invalidas_bloque = int(df[COLUMNA_ERROR].notna().sum())
+            filas += len(df)
+            invalidas += invalidas_bloque
+            alto_riesgo += int(df[COLUMNA_ETIQUETA].sum())
+            if confianza is not None:
+                arboles += int(df[COLUMNA_ARBOLES].sum())
+            else:
+                arboles += (len(df) - invalidas_bloque) * motor.n_arboles
+            if al_avanzar is not None:
+                al_avanzar(avance, filas, filas / max(time.perf_counter() - t0, 1e-9))
+
+    segundos = time.perf_counter() - t0
+    return {
+        "filas": filas,
+        "filas_invalidas": invalidas,
+        "segundos": segundos,
+        "filas_por_segundo": filas / max(segundos, 1e-9),
+        "alto_riesgo": alto_riesgo,
+        "arboles_promedio": arboles / max(filas - invalidas, 1),
+    }
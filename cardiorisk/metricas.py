@@ -0,0 +1,103 @@
+"""Métricas de latencia por etapa, en memoria y compartidas por el proceso.
+
+Cada etapa (carga de artefactos, construcción del vector, predicción, figura,
+render HTML, ...) acumula sus tiempos en un histograma de cubetas fijas,
+exportable en formato de texto de Prometheus, y en una ventana móvil de las
+últimas muestras para calcular p50/p99 recientes. La memoria es constante.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Límites superiores (segundos) de las cubetas del histograma
+CUBETAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Muestras recientes por etapa para los percentiles
+VENTANA = 2_000
+
+
+class HistogramaMovil:
+    """Histograma acumulado de cubetas fijas más una ventana de muestras recientes."""
+
+    def __init__(self, cubetas=CUBETAS, ventana=VENTANA):
+        self.cubetas = np.asarray(cubetas, dtype=np.float64)
+        self.conteos = np.zeros(len(cubetas) + 1, dtype=np.int64)   # Última cubeta: +Inf
+        self.suma = 0.0
+        self.total = 0
+        self.recientes = deque(maxlen=ventana)
+
+    def observar(self, segundos):
+        self.conteos[np.searchsorted(self.cubetas, segundos)] += 1
+        self.suma += segundos
+        self.total += 1
+        self.recientes.append(segundos)
+
+    def percentil(self, q):
+        if not self.recientes:
+            return None
+        return float(np.percentile(np.fromiter(self.recientes, dtype=np.float64), q))
+
+
+class RegistroMetricas:
+    """Conjunto de histogramas por etapa, seguro para varios hilos."""
+
+    def __init__(self, prefijo="cardiorisk"):
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._etapas = {}
+
+    def observar(self, etapa, segundos):
+        with self._lock:
+            histograma = self._etapas.get(etapa)
+            if histograma is None:
+                histograma = self._etapas[etapa] = HistogramaMovil()
+            histograma.observar(segundos)
+
+    @contextmanager
+    def medir(self, etapa):
+        """Mide la duración del bloque ``with`` y la registra en ``etapa``."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(etapa, time.perf_counter() - t0)
+
+    def resumen(self):
+        """Lista de dicts por etapa: conteo, media, p50 y p99 recientes en ms."""
+        with self._lock:
+            filas = []
+            for etapa, h in self._etapas.items():
+                p50, p99 = h.percentil(50), h.percentil(99)
+                filas.append({
+                    "etapa": etapa,
+                    "conteo": h.total,
+                    "media_ms": h.suma / h.total * 1e3,
+                    "p50_ms": p50 * 1e3 if p50 is not None else None,
+                    "p99_ms": p99 * 1e3 if p99 is not None else None,
+                })
+            return filas
+
+    def exportar_prometheus(self):
+        """Texto en formato de exposición de Prometheus (histograma por etapa)."""
+        nombre = f"{self.prefijo}_etapa_segundos"
+        lineas = [
+            f"# HELP {nombre} Duración de cada etapa del flujo de predicción.",
+            f"# TYPE {nombre} histogram",
+        ]
+        with self._lock:
+            for etapa, h in sorted(self._etapas.items()):
+                acumulado = np.cumsum(h.conteos)
+                for limite, valor in zip(h.cubetas, acumulado):
+                    lineas.append(f'{nombre}_bucket{{etapa="{etapa}",le="{limite:g}"}} {valor}')
+                lineas.append(f'{nombre}_bucket{{etapa="{etapa}",le="+Inf"}} {h.total}')
+                lineas.append(f'{nombre}_sum{{etapa="{etapa}"}} {h.suma:.9f}')
+                lineas.append(f'{nombre}_count{{etapa="{etapa}"}} {h.total}')
+        return "\n".join(lineas) + "\n"
+
+
+# Instancia única por proceso, compartida por todas las sesiones
+metricas = RegistroMetricas()
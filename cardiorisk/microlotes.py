@@ -0,0 +1,106 @@
+"""Agrupación dinámica de predicciones individuales en micro-lotes.
+
+Los hilos que atienden solicitudes de un solo paciente encolan su fila y
+reciben un ``Future``. Un hilo trabajador toma la primera fila pendiente,
+espera como mucho ``max_espera_ms`` a que lleguen más (hasta ``max_lote``) y
+evalúa todas juntas en una sola llamada vectorizada.
+"""
+
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Muestras de latencia conservadas para calcular percentiles
+VENTANA_LATENCIAS = 10_000
+
+
+class MicroLotificador:
+    """Cola compartida que agrupa solicitudes y las procesa por lotes.
+
+    ``procesar(entradas)`` recibe la lista de entradas del lote y debe devolver
+    una lista de resultados en el mismo orden.
+    """
+
+    def __init__(self, procesar, max_lote=64, max_espera_ms=5.0, nombre="microlotes"):
+        self.procesar = procesar
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000.0
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._tamanos = Counter()
+        self._latencias = deque(maxlen=VENTANA_LATENCIAS)
+        self._solicitudes = 0
+        self._lotes = 0
+        self._activo = True
+        self._hilo = threading.Thread(target=self._bucle, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def enviar(self, entrada):
+        """Encola una entrada y devuelve un ``Future`` con su resultado."""
+        if not self._activo:
+            raise RuntimeError("El micro-lotificador está cerrado")
+        futuro = Future()
+        self._cola.put((entrada, futuro, time.perf_counter()))
+        return futuro
+
+    def cerrar(self, timeout=None):
+        self._activo = False
+        self._cola.put(None)
+        self._hilo.join(timeout)
+
+    def _bucle(self):
+        while True:
+            primero = self._cola.get()
+            if primero is None:
+                return
+            lote = [primero]
+            limite = time.perf_counter() + self.max_espera
+            while len(lote) < self.max_lote:
+                restante = limite - time.perf_counter()
+                try:
+                    elemento = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if elemento is None:
+                    self._cola.put(None)    # Se procesa el lote actual y luego se sale
+                    break
+                lote.append(elemento)
+            self._ejecutar(lote)
+
+    def _ejecutar(self, lote):
+        entradas = [entrada for entrada, _, _ in lote]
+        try:
+            resultados = self.procesar(entradas)
+        except Exception as error:
+            for _, futuro, _ in lote:
+                futuro.set_exception(error)
+            return
+
+        fin = time.perf_counter()
+        for (_, futuro, encolado), resultado in zip(lote, resultados):
+            futuro.set_result(resultado)
+
+        with self._lock:
+            self._solicitudes += len(lote)
+            self._lotes += 1
+            # Histograma en potencias de 2: 1, 2, 4, 8, ...
+            self._tamanos[1 << (len(lote) - 1).bit_length()] += 1
+            self._latencias.extend(fin - encolado for _, _, encolado in lote)
+
+    def estadisticas(self):
+        """Profundidad de cola, histograma de tamaños de lote y latencias p50/p99 (ms)."""
+        with self._lock:
+            latencias = np.fromiter(self._latencias, dtype=np.float64)
+            return {
+                "profundidad_cola": self._cola.qsize(),
+                "solicitudes": self._solicitudes,
+                "lotes": self._lotes,
+                "tamano_medio_lote": self._solicitudes / self._lotes if self._lotes else 0.0,
+                "histograma_lotes": {f"<={k}": v for k, v in sorted(self._tamanos.items())},
+                "latencia_p50_ms": float(np.percentile(latencias, 50) * 1e3) if len(latencias) else None,
+                "latencia_p99_ms": float(np.percentile(latencias, 99) * 1e3) if len(latencias) else None,
+            }
@@ -0,0 +1,446 @@
+"""Motor de inferencia compilado para el RandomForest.
+
+Aplana todos los árboles del bosque en arrays contiguos de NumPy (característica,
+umbral, hijo izquierdo, hijo derecho, valor del nodo) y recorre todos los
+árboles para un lote de filas de forma vectorizada. Un solo recorrido entrega
+la clase y la probabilidad, en lugar de los dos recorridos (y las dos
+validaciones) de ``predict`` + ``predict_proba``.
+
+Para lotes grandes el recorrido usa un montículo: cada árbol se completa hasta
+``profundidad`` (las hojas poco profundas se repiten hacia abajo) y la
+posición de una fila avanza con ``h = 2 * h + ir_izquierda``, sin leer los
+hijos. Cada nivel son siete operaciones de NumPy en buffers reutilizados sobre
+todas las filas del bloque y todos los árboles a la vez. Si el montículo no
+cabe en ``MAX_CASILLAS_MONTICULO`` (árboles muy profundos) se recorren los
+hijos nodo a nodo.
+
+Aun así, NumPy no supera al recorrido en C de sklearn en lotes de miles de
+filas. Si se conoce el ``predict_proba`` equivalente (``respaldo``), los lotes
+de ``FILAS_A_SKLEARN`` filas o más se le entregan a él.
+
+Paridad con sklearn: los árboles de sklearn convierten la entrada a ``float32``
+antes de comparar contra umbrales ``float64``; aquí se hace lo mismo. El bosque
+con el escalador plegado compara en ``float64`` contra umbrales ajustados para
+reproducir exactamente ese redondeo (ver ``_umbral_plegado``).
+
+Uso rápido (paridad y latencia contra el modelo empaquetado)::
+
+    python -m cardiorisk.motor
+"""
+
+import time
+
+import numpy as np
+
+_MASCARA_SIGNO = np.int64(0x7FFFFFFFFFFFFFFF)
+
+# Casillas del montículo (árboles × 2^(profundidad + 1)); por encima se recorren los hijos
+MAX_CASILLAS_MONTICULO = 1 << 19
+
+# Filas desde las que ``predecir`` usa ``respaldo`` (sklearn) si está disponible
+FILAS_A_SKLEARN = 4_096
+
+# Pares (fila, árbol) por bloque del recorrido: los buffers de un nivel quedan en caché
+ELEMENTOS_POR_BLOQUE = 1 << 16
+
+
+def _clave_orden(x):
+    """Mapea float64 a int64 preservando el orden (y viceversa: es involutiva)."""
+    bits = x.view(np.int64)
+    return bits ^ ((bits >> 63) & _MASCARA_SIGNO)
+
+
+def _umbral_plegado(umbral, media, escala):
+    """Mayor ``x`` float64 tal que ``float32((x - media) / escala) <= umbral``.
+
+    Es lo que evalúa sklearn tras ``scaler.transform``; la función es monótona
+    en ``x``, así que el corte se encuentra por bisección sobre el orden de los
+    float64, partiendo del valor algebraico ``umbral * escala + media``.
+    """
+    def pasa(x):
+        return ((x - media) / escala).astype(np.float32) <= umbral
+
+    centro = umbral * escala + media
+    delta = np.abs(escala) * (np.abs(umbral) + 1.0) * 1e-6 + 1e-300
+    bajo, alto = centro - delta, centro + delta
+    while True:
+        fuera = ~pasa(bajo) | pasa(alto)
+        if not fuera.any():
+            break
+        delta = np.where(fuera, delta * 16, delta)
+        bajo, alto = centro - delta, centro + delta
+
+    clave_bajo, clave_alto = _clave_orden(bajo), _clave_orden(alto)
+    while True:
+        abierto = clave_alto - clave_bajo > 1
+        if not abierto.any():
+            break
+        medio = clave_bajo + (clave_alto - clave_bajo) // 2
+        ok = pasa(_clave_orden(medio).view(np.float64))
+        clave_bajo = np.where(abierto & ok, medio, clave_bajo)
+        clave_alto = np.where(abierto & ~ok, medio, clave_alto)
+    return _clave_orden(clave_bajo).view(np.float64)
+
+
+def _columnas(valor):
+    """Una columna contigua por clase: evita materializar el array ``(filas, T, n_clases)``."""
+    return tuple(np.ascontiguousarray(columna) for columna in valor.T)
+
+
+class BosqueCompilado:
+    """Bosque de decisión aplanado en arrays contiguos.
+
+    Los índices de hijos son locales a cada árbol; ``inicio[t]`` es la posición
+    del nodo raíz del árbol ``t`` dentro de los arrays planos. Las hojas apuntan
+    a sí mismas, de modo que basta iterar ``profundidad`` pasos para que todas las
+    filas lleguen a una hoja.
+    """
+
+    def __init__(self, caracteristica, umbral, izquierdo, derecho, valor, cobertura, inicio, profundidad, clases,
+                 entrada_float32=True, hijos=None):
+        self.caracteristica = caracteristica
+        self.umbral = umbral
+        self.izquierdo = izquierdo
+        self.derecho = derecho
+        self.valor = valor              # (n_nodos, n_clases) probabilidades por nodo
+        self.cobertura = cobertura      # Peso de muestras de entrenamiento por nodo
+        self.inicio = inicio
+        self.profundidad = int(profundidad)
+        self.clases = clases
+        # sklearn compara la entrada redondeada a float32; el bosque plegado no
+        self.entrada_float32 = entrada_float32
+
+        # Hijos globales intercalados [derecho, izquierdo] por nodo: un solo
+        # ``take`` con índice ``2 * nodo + ir_izquierda`` avanza un nivel.
+        # Se puede recibir ya calculado (p. ej. mapeado desde un archivo compacto).
+        if hijos is None:
+            tamanos = np.diff(np.append(inicio, len(umbral)))
+            base = np.repeat(inicio, tamanos)[:, None]
+            hijos = (np.stack([derecho, izquierdo], axis=1) + base).astype(np.int32).ravel()
+        self._hijos = hijos
+        self._tablas = None             # Tablas del recorrido; se arman con el primer uso
+        # ``predict_proba`` de sklearn con la misma entrada que este motor, para lotes grandes
+        self.respaldo = None
+
+    @property
+    def n_arboles(self):
+        return len(self.inicio)
+
+    @property
+    def n_nodos(self):
+        return len(self.umbral)
+
+    @classmethod
+    def desde_sklearn(cls, modelo):
+        """Compila un ``RandomForestClassifier`` (o cualquier bosque con ``estimators_``).
+
+        Un bosque regresor (p. ej. destilado sobre probabilidades) se compila
+        como clasificador binario: su salida es la probabilidad de la clase 1.
+        """
+        caracteristicas, umbrales, izquierdos, derechos, valores, coberturas, inicios = [], [], [], [], [], [], []
+        profundidad = 0
+        desplazamiento = 0
+
+        for estimador in modelo.estimators_:
+            arbol = estimador.tree_
+            n = arbol.node_count
+            locales = np.arange(n, dtype=np.int32)
+            es_hoja = arbol.children_left < 0
+
+            caracteristicas.append(np.where(es_hoja, 0, arbol.feature).astype(np.int32))
+            umbrales.append(np.where(es_hoja, 0.0, arbol.threshold))
+            izquierdos.append(np.where(es_hoja, locales, arbol.children_left).astype(np.int32))
+            derechos.append(np.where(es_hoja, locales, arbol.children_right).astype(np.int32))
+
+            valor = arbol.value[:, 0, :].astype(np.float64)
+            if valor.shape[1] == 1:
+                valor = np.column_stack([1.0 - valor[:, 0], valor[:, 0]])
+            valores.append(valor / valor.sum(axis=1, keepdims=True))
+            coberturas.append(arbol.weighted_n_node_samples.astype(np.float64))
+
+            inicios.append(desplazamiento)
+            desplazamiento += n
+            profundidad = max(profundidad, arbol.max_depth)
+
+        return cls(
+            caracteristica=np.concatenate(caracteristicas),
+            umbral=np.concatenate(umbrales),
+            izquierdo=np.concatenate(izquierdos),
+            derecho=np.concatenate(derechos),
+            valor=np.ascontiguousarray(np.concatenate(valores)),
+            cobertura=np.concatenate(coberturas),
+            inicio=np.asarray(inicios, dtype=np.int32),
+            profundidad=profundidad,
+            clases=np.asarray(getattr(modelo, "classes_", [0, 1])),
+        )
+
+    def plegar_escalador(self, scaler):
+        """Devuelve un bosque equivalente que recibe las variables sin escalar.
+
+        ``StandardScaler`` es afín y creciente por columna, así que
+        ``(x - media) / escala <= u`` equivale a ``x <= u * escala + media``.
+        Plegarlo en los umbrales una vez permite predecir directamente sobre los
+        valores clínicos, sin ``scaler.transform`` por cada predicción.
+        """
+        n_features = scaler.n_features_in_
+        media = scaler.mean_ if scaler.mean_ is not None else np.zeros(n_features)
+        escala = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+        umbral = _umbral_plegado(self.umbral, media[self.caracteristica], escala[self.caracteristica])
+
+        return BosqueCompilado(
+            caracteristica=self.caracteristica,
+            umbral=umbral,
+            izquierdo=self.izquierdo,
+            derecho=self.derecho,
+            valor=self.valor,
+            cobertura=self.cobertura,
+            inicio=self.inicio,
+            profundidad=self.profundidad,
+            clases=self.clases,
+            entrada_float32=False,
+            hijos=self._hijos,
+        )
+
+    def _tablas_recorrido(self):
+        """``(caracteristica, umbral, hijos, hoja, valores)`` indexados por posición del recorrido.
+
+        Con montículo, ``hijos`` es ``None`` y ``hoja``/``valores`` dan la hoja
+        global y sus probabilidades (una columna contigua por clase) para cada
+        posición final. Sin montículo las posiciones son los nodos globales
+        (``hoja`` es ``None``).
+        """
+        if self._tablas is not None:
+            return self._tablas
+        T, D = self.n_arboles, self.profundidad
+        if (2 * T) << D > MAX_CASILLAS_MONTICULO:
+            tablas = (self.caracteristica.astype(np.int32), np.asarray(self.umbral, dtype=np.float64),
+                      self._hijos.astype(np.int32), None, _columnas(self.valor))
+        else:
+            caracteristica = np.zeros((2 * T) << D, dtype=np.int32)
+            umbral = np.zeros((2 * T) << D, dtype=np.float64)
+            h = np.arange(T, 2 * T)
+            nodo = self.inicio.astype(np.int64)
+            for _ in range(D):
+                caracteristica[h] = self.caracteristica[nodo]
+                umbral[h] = self.umbral[nodo]
+                # Las hojas apuntan a sí mismas: todo su subárbol completado termina en ellas
+                nodo = self._hijos[2 * nodo[:, None] + np.array([0, 1])].ravel()
+                h = (2 * h[:, None] + np.array([0, 1])).ravel()
+            hoja = np.zeros((2 * T) << D, dtype=np.int32)
+            hoja[h] = nodo
+            tablas = (caracteristica, umbral, None, hoja, _columnas(self.valor[hoja]))
+        self._tablas = tablas
+        return tablas
+
+    def _recorrer(self, X, arboles=None, bloque=None):
+        """Itera ``(desde, posiciones)`` por bloques de filas; ``posiciones`` es ``(filas, árboles)``.
+
+        Con ``arboles`` (índices) solo se recorren esos árboles.
+        """
+        if self.entrada_float32:
+            # sklearn compara la entrada redondeada a float32 contra umbrales float64
+            X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        n, n_features = X.shape
+        caracteristica, umbral, hijos, hoja, _ = self._tablas_recorrido()
+        arboles = np.arange(self.n_arboles) if arboles is None else np.asarray(arboles)
+        raices = (arboles + self.n_arboles if hoja is not None else self.inicio[arboles]).astype(np.int32)
+        bloque = bloque or max(ELEMENTOS_POR_BLOQUE // max(len(raices), 1), 1)
+
+        for desde in range(0, n, bloque):
+            plano = X[desde:desde + bloque].ravel()
+            filas = len(plano) // n_features
+            base = (np.arange(filas, dtype=np.int32) * n_features)[:, None]
+            h = np.repeat(raices[None, :], filas, axis=0)
+            f = np.empty_like(h)
+            x = np.empty(h.shape)
+            u = np.empty(h.shape)
+            ir_izquierda = np.empty(h.shape, dtype=bool)
+            # mode="clip": las posiciones siempre son válidas y así ``take`` no verifica límites
+            for _ in range(self.profundidad):
+                np.take(caracteristica, h, out=f, mode="clip")
+                f += base
+                np.take(plano, f, out=x, mode="clip")
+                np.take(umbral, h, out=u, mode="clip")
+                np.less_equal(x, u, out=ir_izquierda)
+                h <<= 1
+                h |= ir_izquierda
+                if hijos is not None:
+                    np.take(hijos, h, out=f, mode="clip")
+                    h, f = f, h
+            yield desde, h
+
+    def hojas(self, X, bloque=None, arboles=None):
+        """Índice global de la hoja alcanzada por cada fila en cada árbol, ``(n, T)``.
+
+        Las filas se recorren en bloques de ``bloque`` (por defecto según
+        ``ELEMENTOS_POR_BLOQUE``) para que los arrays intermedios quepan en
+        caché aunque el lote sea grande. Con ``arboles`` (índices) solo se
+        recorren esos árboles.
+        """
+        hoja = self._tablas_recorrido()[3]
+        n = len(X) if np.ndim(X) > 1 else 1
+        resultado = np.empty((n, self.n_arboles if arboles is None else len(arboles)), dtype=np.int32)
+        for desde, h in self._recorrer(X, arboles, bloque):
+            resultado[desde:desde + len(h)] = h if hoja is None else hoja[h]
+        return resultado
+
+    def _probabilidades(self, X, votos=False):
+        columnas = self._tablas_recorrido()[4]
+        n = len(X) if np.ndim(X) > 1 else 1
+        probabilidades = np.empty((n, len(columnas)))
+        por_arbol = np.empty((n, self.n_arboles)) if votos else None
+        for desde, h in self._recorrer(X):
+            hasta = desde + len(h)
+            for c, columna in enumerate(columnas):
+                probabilidades[desde:hasta, c] = np.take(columna, h, mode="clip").mean(axis=1)
+            if votos:
+                por_arbol[desde:hasta] = np.take(columnas[-1], h, mode="clip")
+        return probabilidades, por_arbol
+
+    def predecir(self, X):
+        """Devuelve ``(etiquetas, probabilidades)`` con un único recorrido del bosque.
+
+        ``probabilidades`` tiene la misma forma que ``predict_proba`` de sklearn.
+        """
+        if self.respaldo is not None and np.ndim(X) > 1 and len(X) >= FILAS_A_SKLEARN:
+            probabilidades = self.respaldo(X)
+        else:
+            probabilidades, _ = self._probabilidades(X)
+        etiquetas = self.clases[np.argmax(probabilidades, axis=1)]
+        return etiquetas, probabilidades
+
+    def predecir_votos(self, X):
+        """Como ``predecir``, y además la probabilidad de la última clase según cada árbol.
+
+        Devuelve ``(etiquetas, probabilidades, votos)`` con ``votos`` de forma
+        ``(n, n_arboles)``, obtenido del mismo recorrido del bosque.
+        """
+        probabilidades, votos = self._probabilidades(X, votos=True)
+        etiquetas = self.clases[np.argmax(probabilidades, axis=1)]
+        return etiquetas, probabilidades, votos
+
+    def predecir_anticipado(self, X, confianza=1.0, paso=10, umbral=0.5):
+        """Etiqueta binaria recorriendo los árboles en orden y deteniéndose antes si es posible.
+
+        Tras cada grupo de ``paso`` árboles, una fila se da por decidida cuando
+        los árboles restantes ya no pueden cambiar su etiqueta (cota exacta:
+        aunque todos votaran 0 o 1). Con ``confianza < 1`` se detiene además
+        cuando la media parcial se aleja del umbral más que la cota de Serfling
+        (muestreo sin reemplazo de los árboles), con probabilidad de error
+        ``1 - confianza``. Solo sirve para la etiqueta: si se necesita la
+        probabilidad, usar ``predecir``.
+
+        Devuelve ``(etiquetas, arboles_evaluados)``, ambos de forma ``(n,)``.
+        """
+        X = np.asarray(X, dtype=np.float32 if self.entrada_float32 else np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        n, T = len(X), self.n_arboles
+        positiva = self.valor[:, -1]
+        suma = np.zeros(n)
+        evaluados = np.zeros(n, dtype=np.int32)
+        activas = np.arange(n)
+        log_delta = np.log(2.0 / (1.0 - confianza)) if confianza < 1.0 else None
+
+        for desde in range(0, T, paso):
+            arboles = np.arange(desde, min(desde + paso, T))
+            suma[activas] += positiva[self.hojas(X[activas], arboles=arboles)].sum(axis=1)
+            k = arboles[-1] + 1
+            evaluados[activas] = k
+            if k == T:
+                break
+
+            # La etiqueta es 1 si la media final supera el umbral (empate -> clase 0)
+            parcial = suma[activas]
+            decidida = (parcial > umbral * T) | (parcial + (T - k) <= umbral * T)
+            if log_delta is not None:
+                epsilon = np.sqrt((1.0 - (k - 1) / T) * log_delta / (2.0 * k))
+                decidida |= np.abs(parcial / k - umbral) > epsilon
+            activas = activas[~decidida]
+            if len(activas) == 0:
+                break
+
+        # Filas detenidas: su media parcial decide; las que llegaron al final, la media completa
+        media = suma / evaluados
+        etiquetas = self.clases[(media > umbral).astype(np.int64)]
+        return etiquetas, evaluados
+
+
+# --------------------------------------------------
+# VERIFICACIÓN CONTRA SKLEARN
+# --------------------------------------------------
+def verificar_paridad(modelo, motor, X, scaler=None):
+    """Compara etiquetas y probabilidades del motor contra el modelo de sklearn.
+
+    Si se pasa ``scaler``, ``X`` está en unidades clínicas (motor con el
+    escalador plegado) y sklearn recibe ``scaler.transform(X)``.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    etiquetas, probabilidades = motor.predecir(X)
+    X_modelo = scaler.transform(X) if scaler is not None else X
+    esperado_etiquetas = modelo.predict(X_modelo)
+    esperado_proba = modelo.predict_proba(X_modelo)
+    return {
+        "filas": len(X),
+        "etiquetas_distintas": int(np.sum(etiquetas != esperado_etiquetas)),
+        "max_diff_proba": float(np.max(np.abs(probabilidades - esperado_proba))),
+    }
+
+
+def comparar_latencia(modelo, motor, fila, repeticiones=200):
+    """Mediana (ms) de una predicción de una fila: sklearn (2 llamadas) vs motor."""
+    fila = np.asarray(fila, dtype=np.float64).reshape(1, -1)
+
+    def mediana_ms(funcion):
+        tiempos = []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - t0)
+        return float(np.median(tiempos) * 1e3)
+
+    return {
+        "sklearn_ms": mediana_ms(lambda: (modelo.predict(fila), modelo.predict_proba(fila))),
+        "motor_ms": mediana_ms(lambda: motor.predecir(fila)),
+    }
+
+
+if __name__ == "__main__":
+    import warnings
+
+    from cardiorisk.registro import RegistroModelos
+
+    warnings.filterwarnings("ignore", category=UserWarning)  # Nombres de columnas en arrays
+    artefactos = RegistroModelos(ruta_compacto=None).obtener()     # Se compara contra el modelo de sklearn
+    motor = BosqueCompilado.desde_sklearn(artefactos.modelo)
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((50_000, len(artefactos.feature_names)))
+
+    paridad = verificar_paridad(artefactos.modelo, motor, X)
+    print(f"Paridad: {paridad}")
+    if paridad["etiquetas_distintas"] or paridad["max_diff_proba"] > 1e-9:
+        raise SystemExit("El motor compilado no reproduce al modelo de sklearn")
+
+    # Modo de variables crudas: el escalador va plegado en los umbrales
+    X_crudo = artefactos.scaler.inverse_transform(X)
+    motor_crudo = motor.plegar_escalador(artefactos.scaler)
+    paridad_crudo = verificar_paridad(artefactos.modelo, motor_crudo, X_crudo, scaler=artefactos.scaler)
+    print(f"Paridad (escalador plegado): {paridad_crudo}")
+    if paridad_crudo["etiquetas_distintas"] or paridad_crudo["max_diff_proba"] > 1e-9:
+        raise SystemExit("El bosque con el escalador plegado no reproduce al modelo de sklearn")
+
+    etiquetas, _ = motor_crudo.predecir(X_crudo)
+    for confianza in (1.0, 0.99):
+        t0 = time.perf_counter()
+        anticipadas, arboles = motor_crudo.predecir_anticipado(X_crudo, confianza=confianza)
+        print(
+            f"Evaluación anticipada (confianza {confianza}): {arboles.mean():.1f} árboles por fila, "
+            f"{(anticipadas != etiquetas).sum()} etiquetas distintas, {time.perf_counter() - t0:.2f} s"
+        )
+
+    latencia = comparar_latencia(artefactos.modelo, motor, X[0])
+    print(f"Latencia 1 fila: sklearn {latencia['sklearn_ms']:.2f} ms | motor {latencia['motor_ms']:.3f} ms")
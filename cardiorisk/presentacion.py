@@ -0,0 +1,298 @@
+"""Presentación del resultado: gauge y fragmentos HTML pre-armados por tema y rama.
+
+El resultado de una predicción se pinta siempre con las mismas piezas; solo
+cambian la probabilidad, la banda de confianza y la rama (bajo/alto riesgo):
+
+* **Gauge**: el esqueleto de la figura se construye y valida con plotly una
+  vez por ``(rama, tema)`` y se guarda como dict (plotly se importa recién
+  ahí, no al importar este módulo). En cada resultado se copia,
+  se parchean el valor y la banda, y se entrega a ``st.plotly_chart`` sin
+  volver a validar. El esqueleto lleva una plantilla vacía: la plantilla por
+  defecto de Streamlit (~3 KB) viajaba con cada gauge sin que se usara.
+* **HTML**: el banner y las recomendaciones de cada rama son constantes ya
+  compactadas (sin la indentación del código fuente).
+* **Lluvia de calaveras**: en lugar de 30 clases CSS aleatorias por clic, hay
+  ``VARIANTES_LLUVIA`` fragmentos generados una vez con semillas fijas; la app
+  los alterna para que la animación vuelva a reproducirse en cada cálculo.
+
+``armar_resultado`` devuelve las piezas y los bytes que se envían al
+navegador; ``registrar_envio``/``estadisticas`` acumulan bytes por resultado
+para el panel de administración (el tiempo se mide en ``metricas``).
+"""
+
+import copy
+import json
+import random
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from cardiorisk.entrada import CAMPOS_USUARIO
+from cardiorisk.estilos import TEMA_OSCURO
+from cardiorisk.explicacion import ETIQUETAS
+
+UMBRAL_ALTO = 50                    # Línea del umbral en el gauge (%)
+VARIANTES_LLUVIA = 4
+CALAVERAS = 30
+
+# Colores por rama del resultado
+RAMAS = {
+    False: {"barra": "#27AE60", "numero": "#27AE60", "umbral": "#E74C3C"},
+    True: {"barra": "#E74C3C", "numero": "#C0392B", "umbral": "red"},
+}
+
+# Color del texto del gauge por tema
+TEXTO_GAUGE = {False: "#2C3E50", True: TEMA_OSCURO["text_color"]}
+
+
+def compactar(html):
+    """Quita la indentación y los saltos de línea de un bloque HTML."""
+    return "".join(linea.strip() for linea in html.strip().splitlines())
+
+
+# --------------------------------------------------
+# FRAGMENTOS HTML POR RAMA
+# --------------------------------------------------
+BANNER = {
+    False: compactar("""
+        <div class='result-box result-safe'>
+            <div class='result-icon'>🛡️</div>
+            <div class='result-title'>BAJO RIESGO CARDIOVASCULAR</div>
+            <div class='result-subtitle'>Análisis completado con éxito</div>
+        </div>
+    """),
+    True: compactar("""
+        <style>
+            @keyframes pulse-red {
+                0% { box-shadow: 0 0 0 0 rgba(231, 76, 60, 0.7); }
+                70% { box-shadow: 0 0 0 20px rgba(231, 76, 60, 0); }
+                100% { box-shadow: 0 0 0 0 rgba(231, 76, 60, 0); }
+            }
+            .result-danger { animation: pulse-red 2s infinite; }
+        </style>
+        <div class='result-box result-danger'>
+            <div class='result-icon'>⚠️</div>
+            <div class='result-title' style='font-family: "Arial Black", sans-serif; letter-spacing: 2px;'>ALTO RIESGO DETECTADO</div>
+            <div class='result-subtitle'>Se sugiere atención médica prioritaria</div>
+        </div>
+    """),
+}
+
+TEXTO_INTERPRETACION = {
+    False: (
+        "Los parámetros clínicos ingresados sugieren una baja probabilidad de desarrollar complicaciones "
+        "cardiovasculares en el corto plazo."
+    ),
+    True: "El modelo ha detectado patrones consistentes con un riesgo elevado de enfermedad cardiovascular.",
+}
+INTERPRETACION = {rama: f"**Interpretación:**\n{texto}" for rama, texto in TEXTO_INTERPRETACION.items()}
+
+# Título del banner por rama (también en el informe imprimible)
+TITULO_RAMA = {False: "BAJO RIESGO CARDIOVASCULAR", True: "ALTO RIESGO DETECTADO"}
+
+# Título e ítems de las recomendaciones (también los usa el informe imprimible)
+RECOMENDACIONES = {
+    False: ("✅ Recomendaciones Preventivas", (
+        "Mantener actividad física moderada (30 min/día).",
+        "Dieta balanceada baja en sodio y grasas saturadas.",
+        "Control anual de perfil lipídico.",
+    )),
+    True: ("🚨 Plan de Acción Sugerido", (
+        "Agendar consulta cardiológica a la brevedad.",
+        "Monitoreo frecuente de presión arterial.",
+        "Revisión estricta de dieta y medicación.",
+    )),
+}
+
+_FONDO_RECOMENDACIONES = {False: "#F8F9FA", True: "#FFF5F5"}
+
+
+def _html_recomendaciones(riesgo_alto):
+    titulo, items = RECOMENDACIONES[riesgo_alto]
+    color = RAMAS[riesgo_alto]["barra"]
+    lista = "".join(f"<li>{item}</li>" for item in items)
+    return (
+        f"<div style='background-color: {_FONDO_RECOMENDACIONES[riesgo_alto]}; padding: 1.5rem; "
+        f"border-radius: 10px; border-left: 4px solid {color};'>"
+        f"<h5 style='color: {color}; margin:0;'>{titulo}</h5>"
+        f"<ul style='margin-top: 0.5rem; padding-left: 1.2rem; color: #555;'>{lista}</ul></div>"
+    )
+
+
+HTML_RECOMENDACIONES = {rama: _html_recomendaciones(rama) for rama in (False, True)}
+
+_CALAVERA = "<div class='skull-drop'>💀</div>"
+
+
+@lru_cache(maxsize=VARIANTES_LLUVIA)
+def lluvia_calaveras(variante):
+    """Animación de alto riesgo (solo CSS, sin texto traducible), generada una vez por variante."""
+    rng = random.Random(variante)
+    reglas = "".join(
+        f".skull-drop:nth-child({i + 1}){{left:{rng.randint(0, 100)}vw;"
+        f"animation-duration:{rng.uniform(2, 5):.1f}s;animation-delay:{rng.uniform(0, 3):.1f}s}}"
+        for i in range(CALAVERAS)
+    )
+    # El nombre de la animación cambia por variante: el navegador la reproduce de nuevo
+    return (
+        f"<style>@keyframes fall-{variante}{{0%{{top:-10vh;opacity:1;transform:rotate(0deg)}}"
+        f"100%{{top:105vh;opacity:0;transform:rotate(360deg)}}}}"
+        f".skull-drop{{position:fixed;z-index:9999;user-select:none;pointer-events:none;font-size:2.5rem;"
+        f"animation-name:fall-{variante};animation-timing-function:linear;animation-fill-mode:forwards}}"
+        f"{reglas}</style>"
+        f"<div class='notranslate'>{_CALAVERA * CALAVERAS}</div>"
+    )
+
+
+# --------------------------------------------------
+# GAUGE
+# --------------------------------------------------
+@lru_cache(maxsize=4)
+def _esqueleto_gauge(riesgo_alto, modo_oscuro):
+    """Figura validada una vez por rama y tema, como dict listo para serializar."""
+    import plotly.graph_objects as go
+
+    rama, texto = RAMAS[riesgo_alto], TEXTO_GAUGE[modo_oscuro]
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=0,
+        title={'text': "Probabilidad de Riesgo", 'font': {'size': 18, 'color': texto}},
+        number={'suffix': "%", 'font': {'size': 40, 'color': rama["numero"]}},
+        gauge={
+            'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': texto, 'tickfont': {'color': texto}},
+            'bar': {'color': rama["barra"]},
+            'bgcolor': "white",
+            'borderwidth': 1,
+            'bordercolor': "#E9ECEF",
+            'steps': [
+                {'range': [0, 40], 'color': '#E8F8F5'},
+                {'range': [40, 70], 'color': '#FEF9E7'},
+                {'range': [70, 100], 'color': '#FADBD8'},
+                {'range': [0, 0], 'color': 'rgba(44, 62, 80, 0.35)', 'thickness': 0.3},    # Banda de confianza
+            ],
+            'threshold': {
+                'line': {'color': rama["umbral"], 'width': 4},
+                'thickness': 0.75,
+                'value': UMBRAL_ALTO
+            }
+        }
+    ))
+    fig.update_layout(
+        height=300,
+        margin=dict(l=20, r=20, t=50, b=20),
+        paper_bgcolor='rgba(0,0,0,0)',
+        font={'family': "Inter"},
+        template=go.layout.Template(),
+    )
+    return fig.to_dict()
+
+
+def especificacion_gauge(prob, banda, riesgo_alto, modo_oscuro=False):
+    """Dict del gauge con el valor y la banda del paciente (copia del esqueleto)."""
+    spec = copy.deepcopy(_esqueleto_gauge(bool(riesgo_alto), bool(modo_oscuro)))
+    indicador = spec["data"][0]
+    indicador["value"] = round(prob * 100, 2)
+    indicador["gauge"]["steps"][-1]["range"] = [round(banda[0] * 100, 2), round(banda[1] * 100, 2)]
+    return spec
+
+
+def figura_desde_spec(spec):
+    import plotly.graph_objects as go
+
+    # El esqueleto ya se validó al construirlo; solo cambian números
+    return go.Figure(spec, _validate=False)
+
+
+def armar_resultado(prob, banda, riesgo_alto, modo_oscuro=False, animacion=None):
+    """Piezas del resultado y bytes que se enviarán al navegador.
+
+    ``animacion`` es la variante de la lluvia de calaveras (solo en alto
+    riesgo y al pulsar *Calcular*), o ``None``.
+    """
+    riesgo_alto = bool(riesgo_alto)
+    spec = especificacion_gauge(prob, banda, riesgo_alto, modo_oscuro)
+    piezas = {
+        "banner": BANNER[riesgo_alto],
+        "animacion": lluvia_calaveras(animacion % VARIANTES_LLUVIA) if riesgo_alto and animacion is not None else None,
+        "gauge": figura_desde_spec(spec),
+        "interpretacion": INTERPRETACION[riesgo_alto],
+        "recomendaciones": HTML_RECOMENDACIONES[riesgo_alto],
+    }
+    textos = (piezas["banner"], piezas["animacion"] or "", piezas["interpretacion"], piezas["recomendaciones"])
+    piezas["bytes"] = (
+        sum(len(texto.encode("utf-8")) for texto in textos)
+        + len(json.dumps(spec, separators=(",", ":")).encode("utf-8"))
+    )
+    return piezas
+
+
+# --------------------------------------------------
+# TENDENCIA DE LA SESIÓN
+# --------------------------------------------------
+@lru_cache(maxsize=2)
+def _esqueleto_tendencia(modo_oscuro):
+    """Gráfico de tendencia sin puntos, validado una vez por tema."""
+    import plotly.graph_objects as go
+
+    texto = TEXTO_GAUGE[modo_oscuro]
+    detalle = " · ".join(f"{ETIQUETAS[campo]} %{{customdata[{i}]}}" for i, campo in enumerate(CAMPOS_USUARIO))
+    fig = go.Figure(go.Scatter(
+        x=[], y=[], customdata=[],
+        mode='lines+markers',
+        line=dict(color='#3498DB', width=2),
+        marker=dict(size=10, line=dict(color='white', width=1)),
+        hovertemplate=f'Evaluación #%{{x}}: %{{y:.1f}}%<br>{detalle}<extra></extra>'
+    ))
+    fig.add_hline(y=UMBRAL_ALTO, line_dash='dash', line_color=RAMAS[True]["umbral"])
+    fig.update_layout(
+        height=280,
+        margin=dict(l=0, r=0, t=10, b=0),
+        xaxis=dict(title='Evaluación', tickformat='d', color=texto),
+        yaxis=dict(title='Probabilidad de riesgo (%)', range=[0, 100], color=texto),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font={'family': "Inter"},
+        showlegend=False,
+        template=go.layout.Template(),
+    )
+    return fig.to_dict()
+
+
+def figura_tendencia(registros, modo_oscuro=False):
+    """Tendencia de la sesión a partir del array estructurado de ``HistorialSesion``.
+
+    Las columnas del array se usan tal cual como datos de la traza; el resto
+    de la figura es el esqueleto cacheado.
+    """
+    spec = copy.deepcopy(_esqueleto_tendencia(bool(modo_oscuro)))
+    traza = spec["data"][0]
+    traza["x"] = registros["numero"].tolist()
+    traza["y"] = np.round(registros["prob_riesgo"] * 100, 1).tolist()
+    traza["customdata"] = np.column_stack([registros[campo] for campo in CAMPOS_USUARIO]).round(2).tolist()
+    traza["marker"]["color"] = np.where(
+        registros["riesgo_alto"] == 1, RAMAS[True]["barra"], RAMAS[False]["barra"],
+    ).tolist()
+    return figura_desde_spec(spec)
+
+
+# --------------------------------------------------
+# BYTES ENVIADOS POR RESULTADO
+# --------------------------------------------------
+_lock = threading.Lock()
+_envios = {"resultados": 0, "bytes": 0, "ultimo": None}
+
+
+def registrar_envio(n_bytes):
+    with _lock:
+        _envios["resultados"] += 1
+        _envios["bytes"] += n_bytes
+        _envios["ultimo"] = n_bytes
+
+
+def estadisticas():
+    with _lock:
+        return {
+            **_envios,
+            "bytes_promedio": _envios["bytes"] / _envios["resultados"] if _envios["resultados"] else None,
+        }
@@ -0,0 +1,255 @@
+"""Prueba de carga local: N sesiones simuladas concurrentes sobre ``app.py``.
+
+Cada sesión es un ``AppTest`` propio (el arnés de pruebas de Streamlit, en
+el mismo proceso y sin red) que repite el flujo de un médico: editar algunos
+campos del formulario y pulsar *Calcular*, o alternar el modo oscuro. Todas
+las sesiones comparten el proceso, igual que en un servidor de Streamlit:
+el registro de artefactos, la caché de predicciones y el lotificador.
+
+Se aumenta la cantidad de sesiones por niveles (1, 2, 4, ...) y en cada nivel
+se informa:
+
+* latencia de rerun por sesión (p50/p95/p99) y reruns por segundo,
+* CPU del proceso (núcleos usados en promedio),
+* memoria residente (RSS) adicional por sesión,
+* el punto de saturación: el primer nivel en que p95 supera el objetivo o en
+  que agregar sesiones ya no aumenta los reruns por segundo.
+
+``AppTest`` supone una sola sesión por proceso: instala un runtime simulado
+global al empezar cada rerun, lo borra al terminar y recompila el script cada
+vez (``ast.parse`` en varios hilos a la vez no es seguro en CPython 3.11). ``arnes_concurrente`` lo adapta a varias sesiones como en un servidor
+real: un solo ``ScriptCache`` compartido (el script se compila una vez) y, si
+otra sesión ya borró el runtime global, se usa el último instalado.
+
+Uso (solo Linux, lee ``/proc/self/statm``)::
+
+    python -m cardiorisk.prueba_carga --sesiones 1 2 4 8 16 --duracion 10 --pausa-ms 500
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import resource
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
+
+from cardiorisk.entrada import PASOS, RANGOS
+from cardiorisk.registro import DIRECTORIO_BASE
+
+# Etiquetas (parciales) de los widgets que manejan las sesiones simuladas
+WIDGETS_NUMERICOS = {
+    "age": "Edad",
+    "BMI": "Masa Corporal",
+    "chol": "Colesterol",
+    "thalch": "Frecuencia Cardíaca",
+    "oldpeak": "Oldpeak",
+}
+WIDGETS_SELECCION = {"diabetes": "Diabetes", "prevalentHyp": "Hipertensión"}
+ETIQUETA_CALCULAR = "Calcular"
+ETIQUETA_MODO_OSCURO = "Modo Oscuro"
+
+# Fracción de acciones que alternan el modo oscuro (el resto son cálculos)
+PROBABILIDAD_MODO_OSCURO = 0.2
+
+# Un nivel está saturado si agregar sesiones mejora el rendimiento menos que esto
+GANANCIA_MINIMA = 0.10
+
+
+def _rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _cpu_segundos():
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    return uso.ru_utime + uso.ru_stime
+
+
+@contextmanager
+def arnes_concurrente():
+    """Permite reruns simultáneos de varios ``AppTest`` en el mismo proceso."""
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    cache = ScriptCache()
+    ultimo = [None]
+
+    def cache_compartida():
+        # AppTest crea la caché justo después de instalar su runtime simulado
+        ultimo[0] = Runtime._instance
+        return cache
+
+    def instancia(cls):
+        if cls._instance is not None:
+            return cls._instance
+        if ultimo[0] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return ultimo[0]
+
+    with mock.patch.object(app_test, "ScriptCache", cache_compartida), \
+            mock.patch.object(local_script_runner, "ScriptCache", lambda: cache), \
+            mock.patch.object(Runtime, "instance", classmethod(instancia)), \
+            mock.patch.object(Runtime, "exists", classmethod(lambda cls: cls._instance is not None or ultimo[0] is not None)):
+        yield
+
+
+def _buscar(elementos, texto):
+    return next(e for e in elementos if texto in e.label)
+
+
+class SesionSimulada:
+    """Una sesión de ``AppTest`` que alterna cálculos y cambios de tema."""
+
+    def __init__(self, semilla, pausa_s):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = np.random.default_rng(semilla)
+        self.pausa_s = pausa_s
+        self.latencias = []
+        self.errores = 0
+        self.app = AppTest.from_file(str(DIRECTORIO_BASE / "app.py"), default_timeout=120)
+        self.app.run()
+
+    def _valor_aleatorio(self, campo):
+        minimo, maximo = RANGOS[campo]
+        pasos = int(round((maximo - minimo) / PASOS[campo]))
+        valor = minimo + self.rng.integers(0, pasos + 1) * PASOS[campo]
+        return type(minimo)(round(valor, 2))
+
+    def _accion(self):
+        app = self.app
+        if self.rng.random() < PROBABILIDAD_MODO_OSCURO:
+            interruptor = _buscar(app.toggle, ETIQUETA_MODO_OSCURO)
+            interruptor.set_value(not interruptor.value)
+        else:
+            # Se editan 1 a 3 campos antes de pulsar Calcular (el formulario hace un solo rerun)
+            campos = list(WIDGETS_NUMERICOS) + list(WIDGETS_SELECCION)
+            for campo in self.rng.choice(campos, size=self.rng.integers(1, 4), replace=False):
+                if campo in WIDGETS_NUMERICOS:
+                    _buscar(app.number_input, WIDGETS_NUMERICOS[campo]).set_value(self._valor_aleatorio(campo))
+                else:
+                    _buscar(app.selectbox, WIDGETS_SELECCION[campo]).set_value(int(self.rng.integers(0, 2)))
+            _buscar(app.button, ETIQUETA_CALCULAR).click()
+
+        t0 = time.perf_counter()
+        app.run()
+        self.latencias.append(time.perf_counter() - t0)
+        if app.exception:
+            self.errores += 1
+
+    def ejecutar(self, duracion, inicio):
+        inicio.wait()
+        hasta = time.perf_counter() + duracion
+        while time.perf_counter() < hasta:
+            self._accion()
+            if self.pausa_s:
+                # Tiempo de "lectura" del médico, con variación para no sincronizar sesiones
+                time.sleep(self.pausa_s * self.rng.uniform(0.5, 1.5))
+
+
+def medir_nivel(n_sesiones, duracion, pausa_s, semilla=0):
+    """Corre ``n_sesiones`` concurrentes durante ``duracion`` segundos y resume el nivel."""
+    gc.collect()            # Sesiones del nivel anterior
+    rss_antes = _rss_bytes()
+    sesiones = [SesionSimulada(semilla + i, pausa_s) for i in range(n_sesiones)]
+    gc.collect()
+    rss_sesiones = _rss_bytes() - rss_antes
+
+    inicio = threading.Event()
+    hilos = [threading.Thread(target=s.ejecutar, args=(duracion, inicio), daemon=True) for s in sesiones]
+    for hilo in hilos:
+        hilo.start()
+    cpu0, t0 = _cpu_segundos(), time.perf_counter()
+    inicio.set()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.perf_counter() - t0
+    cpu = (_cpu_segundos() - cpu0) / transcurrido
+
+    latencias = np.concatenate([s.latencias for s in sesiones]) * 1e3
+    p50, p95, p99 = (float(np.percentile(latencias, q)) for q in (50, 95, 99))
+    return {
+        "sesiones": n_sesiones,
+        "reruns": int(latencias.size),
+        "reruns_por_segundo": latencias.size / transcurrido,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "p99_por_sesion_ms": [float(np.percentile(np.asarray(s.latencias) * 1e3, 99)) for s in sesiones],
+        "cpu_nucleos": cpu,
+        "rss_total_mb": _rss_bytes() / 1e6,
+        "rss_por_sesion_mb": rss_sesiones / n_sesiones / 1e6,
+        "errores": sum(s.errores for s in sesiones),
+    }
+
+
+def punto_saturacion(niveles, objetivo_p95_ms):
+    """Primer nivel saturado (p95 sobre el objetivo o sin ganancia de rendimiento), o ``None``."""
+    for anterior, nivel in zip([None] + niveles[:-1], niveles):
+        if nivel["p95_ms"] > objetivo_p95_ms:
+            return {"sesiones": nivel["sesiones"], "motivo": f"p95 {nivel['p95_ms']:.0f} ms > {objetivo_p95_ms:.0f} ms"}
+        if anterior is not None:
+            ganancia = nivel["reruns_por_segundo"] / anterior["reruns_por_segundo"] - 1.0
+            if ganancia < GANANCIA_MINIMA:
+                return {"sesiones": nivel["sesiones"], "motivo": f"rendimiento +{ganancia:.0%} respecto de {anterior['sesiones']}"}
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cardiorisk.prueba_carga", description=__doc__.splitlines()[0])
+    parser.add_argument("--sesiones", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Niveles de concurrencia")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos por nivel")
+    parser.add_argument("--pausa-ms", type=float, default=500.0, help="Pausa media entre acciones de una sesión")
+    parser.add_argument("--objetivo-p95-ms", type=float, default=1_000.0, help="Latencia p95 aceptable por rerun")
+    parser.add_argument("--json", help="Además, guarda el informe en este archivo")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)     # Avisos de deprecación en cada rerun
+    from cardiorisk.arranque import esperar_calentamiento, iniciar_calentamiento
+    from cardiorisk.auditoria import redirigir_a_temporal
+
+    redirigir_a_temporal()      # Las sesiones simuladas no son pacientes
+    # Los artefactos y el calentamiento se pagan antes de medir, como en un servidor ya levantado
+    iniciar_calentamiento()
+    esperar_calentamiento(120)
+
+    niveles = []
+    with arnes_concurrente():
+        SesionSimulada(semilla=len(args.sesiones) * max(args.sesiones), pausa_s=0.0)   # Primer rerun, fuera de la medición
+        print(f"{'sesiones':>8} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'CPU':>5} {'MB/sesión':>10} {'errores':>8}")
+        for n in args.sesiones:
+            nivel = medir_nivel(n, args.duracion, args.pausa_ms / 1e3)
+            niveles.append(nivel)
+            print(
+                f"{n:>8} {nivel['reruns_por_segundo']:>9.1f} {nivel['p50_ms']:>8.0f} {nivel['p95_ms']:>8.0f} "
+                f"{nivel['p99_ms']:>8.0f} {nivel['cpu_nucleos']:>5.2f} {nivel['rss_por_sesion_mb']:>10.2f} "
+                f"{nivel['errores']:>8}"
+            )
+
+    saturacion = punto_saturacion(niveles, args.objetivo_p95_ms)
+    if saturacion is None:
+        print(f"Sin saturación hasta {args.sesiones[-1]} sesiones")
+    else:
+        print(f"Saturación con {saturacion['sesiones']} sesiones ({saturacion['motivo']})")
+
+    if args.json:
+        informe = {
+            "parametros": {**vars(args), "cpus": os.cpu_count()},
+            "niveles": niveles,
+            "saturacion": saturacion,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Registro de artefactos del modelo compartido por todo el proceso.
+
+Streamlit re-ejecuta ``app.py`` en cada interacción, pero los módulos
+importados viven mientras vive el proceso. El registro carga el modelo, el
+escalador y la lista de columnas una sola vez y los comparte entre todas las
+sesiones. En cada consulta solo se revisa ``mtime``/tamaño de los archivos:
+si cambiaron, se calcula su hash, se cargan los nuevos artefactos y se
+reemplazan de forma atómica (las sesiones en curso conservan la versión
+anterior hasta terminar su rerun).
+
+Si junto a los ``.joblib`` hay un bosque compacto (``cardiorisk.compacto``)
+exportado de esa misma versión, se mapea con ``mmap`` en lugar de
+deserializar el pickle de sklearn; en ese caso ``modelo`` y ``scaler`` son
+``None``. Los lotes grandes usan igual el ``predict_proba`` de sklearn
+(``BosqueCompilado.respaldo``): el pickle se deserializa con el primer lote
+que lo necesita.
+"""
+
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from cardiorisk import compacto
+from cardiorisk.entrada import PlantillaEntrada
+from cardiorisk.metricas import metricas
+from cardiorisk.motor import BosqueCompilado
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------
+# RUTAS POR DEFECTO
+# --------------------------------------------------
+DIRECTORIO_BASE = Path(__file__).resolve().parent.parent
+RUTA_MODELO = DIRECTORIO_BASE / "modelo_cardio.joblib"
+RUTA_SCALER = DIRECTORIO_BASE / "scaler.joblib"
+RUTA_FEATURES = DIRECTORIO_BASE / "feature_names.joblib"
+RUTA_COMPACTO = DIRECTORIO_BASE / "modelo_cardio.bosque"
+
+
+@dataclass(frozen=True)
+class Artefactos:
+    """Conjunto inmutable de artefactos cargados en memoria."""
+
+    modelo: object          # None si se cargó desde el bosque compacto
+    motor: object           # BosqueCompilado equivalente a ``modelo``
+    motor_crudo: object     # BosqueCompilado con el escalador plegado en los umbrales
+    scaler: object          # None si se cargó desde el bosque compacto
+    feature_names: list
+    media: object           # Media de entrenamiento por variable (del escalador), o None
+    escala: object          # Desviación estándar de entrenamiento por variable, o None
+    plantilla: object       # PlantillaEntrada para los campos del formulario
+    version: str            # Hash corto del contenido de los tres archivos
+    tiempo_carga: float     # Segundos que tomó deserializar (o mapear) los artefactos
+    tamano_bytes: int       # Tamaño residente estimado (arrays + objetos)
+    cargado_en: float       # time.time() de la carga
+
+
+def _huella_archivos(rutas):
+    """Clave barata (ruta, mtime, tamaño) para detectar reemplazos en disco."""
+    huella = []
+    for ruta in rutas:
+        info = os.stat(ruta)
+        huella.append((str(ruta), info.st_mtime_ns, info.st_size))
+    return tuple(huella)
+
+
+def _hash_archivos(rutas):
+    """Hash SHA-256 combinado del contenido; se usa como versión del modelo."""
+    h = hashlib.sha256()
+    for ruta in rutas:
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+    return h.hexdigest()[:12]
+
+
+def _tamano_residente(obj, vistos=None):
+    """Estima los bytes que ocupa ``obj`` recorriendo sus atributos.
+
+    Los árboles de sklearn guardan sus nodos en arrays de NumPy accesibles vía
+    ``__getstate__``; para ellos se suman los ``nbytes`` de esos arrays.
+    """
+    if vistos is None:
+        vistos = {}
+    if id(obj) in vistos:
+        return 0
+    # Se guarda la referencia para que los dicts temporales de ``__getstate__``
+    # no se liberen y su id se reutilice durante el recorrido.
+    vistos[id(obj)] = obj
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            _tamano_residente(k, vistos) + _tamano_residente(v, vistos) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(_tamano_residente(v, vistos) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + _tamano_residente(vars(obj), vistos)
+
+    # Objetos de extensión (p. ej. sklearn.tree._tree.Tree)
+    try:
+        estado = obj.__getstate__()
+    except Exception:
+        estado = None
+    if isinstance(estado, dict):
+        return sys.getsizeof(obj) + _tamano_residente(estado, vistos)
+    return sys.getsizeof(obj)
+
+
+class _SklearnDiferido:
+    """Modelo y escalador de sklearn para ``BosqueCompilado.respaldo``.
+
+    Con el bosque compacto no están en memoria: se cargan de los ``.joblib``
+    con el primer lote grande.
+    """
+
+    def __init__(self, ruta_modelo, ruta_scaler, modelo=None, scaler=None):
+        self._rutas = (ruta_modelo, ruta_scaler)
+        self._lock = threading.Lock()
+        self._cargados = (modelo, scaler) if modelo is not None else None
+        # Se ajustaron con un DataFrame; los lotes llegan como arrays en el orden de ``feature_names``
+        warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+
+    def _obtener(self):
+        with self._lock:
+            if self._cargados is None:
+                import joblib
+
+                self._cargados = tuple(joblib.load(ruta) for ruta in self._rutas)
+            return self._cargados
+
+    def probabilidades(self, X):
+        """Para ``motor``: entrada ya escalada."""
+        return self._obtener()[0].predict_proba(X)
+
+    def probabilidades_crudo(self, X):
+        """Para ``motor_crudo``: entrada en unidades originales."""
+        modelo, scaler = self._obtener()
+        return modelo.predict_proba(scaler.transform(X))
+
+
+def _conectar_respaldo(motor, motor_crudo, sklearn):
+    motor.respaldo = sklearn.probabilidades
+    motor_crudo.respaldo = sklearn.probabilidades_crudo
+
+
+class RegistroModelos:
+    """Caché de artefactos por proceso con recarga en caliente.
+
+    ``obtener()`` es seguro para llamarse desde varios hilos de sesión a la vez;
+    solo uno de ellos realiza la carga cuando los archivos cambian.
+    """
+
+    def __init__(self, ruta_modelo=RUTA_MODELO, ruta_scaler=RUTA_SCALER, ruta_features=RUTA_FEATURES,
+                 ruta_compacto=RUTA_COMPACTO):
+        self.rutas = (Path(ruta_modelo), Path(ruta_scaler), Path(ruta_features))
+        self.ruta_compacto = Path(ruta_compacto) if ruta_compacto is not None else None
+        self._lock = threading.Lock()
+        self._huella = None
+        self._actual = None
+
+    def obtener(self):
+        """Devuelve los artefactos vigentes, recargándolos si cambiaron en disco."""
+        rutas = self.rutas
+        if self.ruta_compacto is not None and self.ruta_compacto.exists():
+            rutas += (self.ruta_compacto,)
+        try:
+            huella = _huella_archivos(rutas)
+        except OSError:
+            # Un archivo puede faltar un instante mientras se reemplaza
+            if self._actual is not None:
+                return self._actual
+            raise
+
+        if huella == self._huella:
+            return self._actual
+
+        with self._lock:
+            if huella != self._huella:
+                self._recargar(huella)
+            return self._actual
+
+    def _recargar(self, huella):
+        version = _hash_archivos(self.rutas)
+        if self._actual is not None and version == self._actual.version:
+            # Solo cambió el mtime (p. ej. ``touch``): no hace falta recargar
+            self._huella = huella
+            return
+
+        try:
+            artefactos = self._cargar(version)
+        except Exception:
+            if self._actual is None:
+                raise
+            # Artefacto a medio escribir o corrupto: se conserva la versión previa
+            # y se reintenta en la próxima consulta.
+            logger.exception("No se pudo recargar el modelo; se mantiene la versión %s", self._actual.version)
+            return
+
+        self._actual = artefactos
+        self._huella = huella
+        metricas.observar("carga_artefactos", artefactos.tiempo_carga)
+        logger.info(
+            "Modelo %s cargado en %.3f s (%.2f MB residentes)",
+            artefactos.version, artefactos.tiempo_carga, artefactos.tamano_bytes / 1e6,
+        )
+
+    def _cargar(self, version):
+        if self.ruta_compacto is not None and self.ruta_compacto.exists():
+            if compacto.leer_version(self.ruta_compacto) == version:
+                return self._cargar_compacto(version)
+            logger.warning("%s no corresponde a la versión %s; se usan los .joblib", self.ruta_compacto, version)
+
+        import joblib
+
+        ruta_modelo, ruta_scaler, ruta_features = self.rutas
+        t0 = time.perf_counter()
+        modelo = joblib.load(ruta_modelo)
+        scaler = joblib.load(ruta_scaler)
+        feature_names = list(joblib.load(ruta_features))
+        motor = BosqueCompilado.desde_sklearn(modelo)
+        motor_crudo = motor.plegar_escalador(scaler)
+        tiempo_carga = time.perf_counter() - t0
+        _conectar_respaldo(motor, motor_crudo, _SklearnDiferido(ruta_modelo, ruta_scaler, modelo, scaler))
+
+        return Artefactos(
+            modelo=modelo,
+            motor=motor,
+            motor_crudo=motor_crudo,
+            scaler=scaler,
+            feature_names=feature_names,
+            media=getattr(scaler, "mean_", None),
+            escala=getattr(scaler, "scale_", None),
+            plantilla=PlantillaEntrada(feature_names),
+            version=version,
+            tiempo_carga=tiempo_carga,
+            tamano_bytes=_tamano_residente((modelo, motor, motor_crudo, scaler, feature_names)),
+            cargado_en=time.time(),
+        )
+
+    def _cargar_compacto(self, version):
+        t0 = time.perf_counter()
+        archivo = compacto.cargar(self.ruta_compacto)
+        tiempo_carga = time.perf_counter() - t0
+        _conectar_respaldo(archivo.motor, archivo.motor_crudo, _SklearnDiferido(*self.rutas[:2]))
+
+        return Artefactos(
+            modelo=None,
+            motor=archivo.motor,
+            motor_crudo=archivo.motor_crudo,
+            scaler=None,
+            feature_names=archivo.feature_names,
+            media=archivo.media,
+            escala=archivo.escala,
+            plantilla=PlantillaEntrada(archivo.feature_names),
+            version=version,
+            tiempo_carga=tiempo_carga,
+            # Páginas mapeadas: se comparten entre procesos que abren el mismo archivo
+            tamano_bytes=archivo.tamano_bytes,
+            cargado_en=time.time(),
+        )
+
+
+# Instancia única por proceso, compartida por todas las sesiones de Streamlit
+registro = RegistroModelos()
@@ -0,0 +1,438 @@
+"""Suite de rendimiento reproducible con comparación contra una línea base.
+
+Mide cinco cosas, cada una con la misma semilla y los mismos pacientes:
+
+* **Carga de artefactos**: bosque compacto (``mmap``) y ``.joblib`` +
+  compilación. La carga en frío (``carga_*``) se mide en un intérprete nuevo
+  por repetición, como en ``cardiorisk.arranque``: incluye importar joblib y
+  sklearn, que es lo que paga el primer arranque. La recarga (``recarga_*``)
+  usa un ``RegistroModelos`` nuevo en el mismo proceso, con todo ya importado.
+* **Rerun completo** de ``app.py`` con ``AppTest``: sin cambios y pulsando
+  *Calcular* con un paciente distinto cada vez (sin aciertos de caché).
+* **Latencia de una predicción** (p50/p99): la ruta original de la app
+  (``DataFrame`` + ``scaler.transform`` + ``predict`` + ``predict_proba``),
+  el bosque compilado con el escalador plegado y ``predecir_pacientes``.
+  La ruta original es solo referencia: se informa pero no cuenta como regresión.
+* **Rendimiento por lotes** (filas/s) del bosque compilado a varios tamaños
+  de lote, y de sklearn como referencia. El motor no puede ser más lento que
+  sklearn en ningún tamaño (salvo ``TOLERANCIA_FRENTE_A_SKLEARN`` de ruido).
+* **Render del resultado**: armado del gauge y los fragmentos HTML de
+  ``cardiorisk.presentacion`` (p50/p99) y bytes enviados por rama.
+
+Uso::
+
+    python -m cardiorisk.rendimiento                       # mide y compara con la línea base
+    python -m cardiorisk.rendimiento --salida r.json       # además guarda los resultados
+    python -m cardiorisk.rendimiento --guardar-base        # reemplaza la línea base
+    python -m cardiorisk.rendimiento --rapido              # menos repeticiones (CI)
+
+Termina con código 1 si alguna métrica empeora más que su tolerancia respecto
+de la línea base también al repetir la suite (se toma el mejor valor de las
+dos corridas, para no fallar por ruido de otros procesos), o si el motor
+procesa lotes más lento que sklearn. Los tiempos dependen de la máquina: la línea base debe
+regenerarse en el equipo donde se compara.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import warnings
+from importlib import metadata
+
+import numpy as np
+
+from cardiorisk.entrada import CAMPOS_USUARIO, RANGOS
+from cardiorisk.registro import DIRECTORIO_BASE, RUTA_COMPACTO, RegistroModelos
+
+RUTA_BASE = DIRECTORIO_BASE / "rendimiento_base.json"
+
+# Tamaños de lote para el rendimiento en filas/s (una fila ya la cubre la latencia p50/p99)
+TAMANOS_LOTE = (64, 1_024, 16_384, 131_072)
+
+# Empeoramiento relativo tolerado, por prefijo de métrica (el primero que coincida)
+TOLERANCIAS = (
+    ("carga_", 0.50),
+    ("recarga_", 0.50),
+    ("rerun_", 0.35),
+    ("prediccion_", 0.35),
+    ("lote_", 0.35),
+    ("render_", 0.35),
+)
+TOLERANCIA_P99 = 0.60       # Las colas son más ruidosas que la mediana
+
+# Desde ``motor.FILAS_A_SKLEARN`` filas ambos corren ``predict_proba``: la diferencia es ruido
+TOLERANCIA_FRENTE_A_SKLEARN = 0.15
+
+SEMILLA = 0
+
+
+def _pacientes(n, semilla=SEMILLA):
+    """``n`` pacientes aleatorios dentro de los rangos del formulario, como array ``(n, 7)``."""
+    rng = np.random.default_rng(semilla)
+    columnas = []
+    for campo in CAMPOS_USUARIO:
+        minimo, maximo = RANGOS[campo]
+        if isinstance(minimo, int):
+            columnas.append(rng.integers(minimo, maximo + 1, n).astype(np.float64))
+        else:
+            columnas.append(np.round(rng.uniform(minimo, maximo, n), 1))
+    return np.column_stack(columnas)
+
+
+def _percentiles(tiempos):
+    tiempos = np.asarray(tiempos) * 1e3
+    return float(np.percentile(tiempos, 50)), float(np.percentile(tiempos, 99))
+
+
+def _cronometrar(funcion, repeticiones):
+    tiempos = []
+    for i in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion(i)
+        tiempos.append(time.perf_counter() - t0)
+    return tiempos
+
+
+def _version_paquete(nombre):
+    try:
+        return metadata.version(nombre)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _metrica(valor, unidad, mejor="menor", referencia=False):
+    # Las métricas de referencia (sklearn) se informan pero no cuentan como regresión
+    return {"valor": round(valor, 6), "unidad": unidad, "mejor": mejor, "referencia": referencia}
+
+
+# --------------------------------------------------
+# MEDICIONES
+# --------------------------------------------------
+_CODIGO_CARGA = """
+import json, time, warnings
+warnings.filterwarnings("ignore")
+from cardiorisk.registro import RegistroModelos
+t0 = time.perf_counter()
+RegistroModelos(ruta_compacto={ruta_compacto}).obtener()
+print(json.dumps(time.perf_counter() - t0))
+"""
+
+
+def medir_carga(repeticiones, repeticiones_frio):
+    from cardiorisk.arranque import medir_en_proceso_nuevo
+
+    resultados = {}
+    origenes = [("joblib", None)]
+    if RUTA_COMPACTO.exists():
+        origenes.insert(0, ("compacto", RUTA_COMPACTO))
+    for nombre, ruta in origenes:
+        codigo = _CODIGO_CARGA.format(ruta_compacto=None if ruta is None else repr(str(ruta)))
+        tiempos = [medir_en_proceso_nuevo(codigo) for _ in range(repeticiones_frio)]
+        resultados[f"carga_{nombre}_ms"] = _metrica(float(np.median(tiempos)) * 1e3, "ms")
+        tiempos = _cronometrar(lambda _: RegistroModelos(ruta_compacto=ruta).obtener(), repeticiones)
+        resultados[f"recarga_{nombre}_ms"] = _metrica(float(np.median(tiempos)) * 1e3, "ms")
+    return resultados
+
+
+def medir_rerun(repeticiones):
+    from streamlit.testing.v1 import AppTest
+
+    from cardiorisk.arranque import esperar_calentamiento
+
+    at = AppTest.from_file(str(DIRECTORIO_BASE / "app.py"), default_timeout=120)
+    at.run()
+    esperar_calentamiento(120)
+    at.run()
+
+    resultados = {}
+    p50, p99 = _percentiles(_cronometrar(lambda _: at.run(), repeticiones))
+    resultados["rerun_sin_cambios_p50_ms"] = _metrica(p50, "ms")
+    resultados["rerun_sin_cambios_p99_ms"] = _metrica(p99, "ms")
+
+    edad = next(w for w in at.number_input if "Edad" in w.label)
+    calcular = next(b for b in at.button if "Calcular" in b.label)
+    minimo, maximo = RANGOS["age"]
+
+    def con_calcular(i):
+        # Una edad distinta por repetición: cada clic evalúa el bosque y el explicador
+        edad.set_value(minimo + i % (maximo - minimo + 1))
+        calcular.click().run()
+
+    p50, p99 = _percentiles(_cronometrar(con_calcular, repeticiones))
+    resultados["rerun_calcular_p50_ms"] = _metrica(p50, "ms")
+    resultados["rerun_calcular_p99_ms"] = _metrica(p99, "ms")
+    if at.exception:
+        raise RuntimeError(f"La app falló durante la medición: {at.exception}")
+    return resultados
+
+
+def medir_prediccion(repeticiones):
+    from cardiorisk.inferencia import predecir_pacientes
+
+    resultados = {}
+    artefactos = RegistroModelos().obtener()
+    pacientes = _pacientes(repeticiones)
+    plantilla = artefactos.plantilla
+
+    def medir(nombre, funcion, n, referencia=False):
+        p50, p99 = _percentiles(_cronometrar(funcion, n))
+        resultados[f"prediccion_{nombre}_p50_ms"] = _metrica(p50, "ms", referencia=referencia)
+        resultados[f"prediccion_{nombre}_p99_ms"] = _metrica(p99, "ms", referencia=referencia)
+
+    medir("motor", lambda i: artefactos.motor_crudo.predecir(plantilla.vector(dict(zip(CAMPOS_USUARIO, pacientes[i])))),
+          repeticiones)
+    registros = [dict(zip(CAMPOS_USUARIO, fila)) for fila in pacientes]
+    medir("inferencia", lambda i: predecir_pacientes([registros[i]]), repeticiones)
+
+    # Ruta original de la app: dict sobre feature_names -> DataFrame -> transform -> 2 recorridos
+    try:
+        import pandas as pd
+
+        original = RegistroModelos(ruta_compacto=None).obtener()
+    except ImportError:
+        return resultados
+    modelo, scaler = original.modelo, original.scaler
+
+    def ruta_original(i):
+        fila = {nombre: 0 for nombre in original.feature_names}
+        fila.update(registros[i])
+        df = pd.DataFrame([fila])
+        escalado = scaler.transform(df)
+        modelo.predict(escalado)
+        modelo.predict_proba(escalado)
+
+    medir("sklearn", ruta_original, max(repeticiones // 10, 20), referencia=True)
+    return resultados
+
+
+def medir_lotes(tamanos, duracion_minima, rondas=3):
+    resultados = {}
+    artefactos = RegistroModelos().obtener()
+    X = artefactos.plantilla.matriz(_pacientes(max(tamanos)))
+    modelos = [("motor", artefactos.motor_crudo.predecir)]
+    try:
+        original = RegistroModelos(ruta_compacto=None).obtener()
+        scaler, modelo = original.scaler, original.modelo
+        modelos.append(("sklearn", lambda lote: modelo.predict_proba(scaler.transform(lote))))
+    except ImportError:
+        pass
+
+    for nombre, predecir in modelos:
+        for tamano in tamanos:
+            lote = X[:tamano]
+            predecir(lote)                                   # Primera llamada fuera de la medición
+            # La mejor de varias rondas: el ruido de otros procesos solo puede restar
+            mejor = 0.0
+            for _ in range(rondas):
+                filas, t0 = 0, time.perf_counter()
+                while True:
+                    predecir(lote)
+                    filas += tamano
+                    transcurrido = time.perf_counter() - t0
+                    if transcurrido >= duracion_minima / rondas:
+                        break
+                mejor = max(mejor, filas / transcurrido)
+            resultados[f"lote_{nombre}_{tamano}_filas_s"] = _metrica(
+                mejor, "filas/s", mejor="mayor", referencia=nombre == "sklearn",
+            )
+    return resultados
+
+
+def medir_render(repeticiones):
+    from cardiorisk import presentacion
+
+    resultados = {}
+    rng = np.random.default_rng(SEMILLA)
+    probs = rng.uniform(0, 1, repeticiones)
+
+    def armar(i):
+        # Alterna rama y tema como en uso real; la animación solo en alto riesgo
+        prob = float(probs[i])
+        presentacion.armar_resultado(prob, (max(prob - 0.1, 0), min(prob + 0.1, 1)), prob >= 0.5, i % 2 == 1, i)
+
+    p50, p99 = _percentiles(_cronometrar(armar, repeticiones))
+    resultados["render_resultado_p50_ms"] = _metrica(p50, "ms")
+    resultados["render_resultado_p99_ms"] = _metrica(p99, "ms")
+    for nombre, riesgo_alto in (("bajo", False), ("alto", True)):
+        piezas = presentacion.armar_resultado(0.5, (0.4, 0.6), riesgo_alto, animacion=0)
+        resultados[f"render_bytes_{nombre}"] = _metrica(piezas["bytes"], "bytes")
+    return resultados
+
+
+def ejecutar(rapido=False):
+    """Corre la suite completa y devuelve ``{"entorno": ..., "metricas": {...}}``."""
+    warnings.filterwarnings("ignore", category=UserWarning)  # Nombres de columnas en arrays
+    escala = 0.25 if rapido else 1.0
+    metricas = {}
+    metricas.update(medir_carga(max(int(10 * escala), 3), max(int(5 * escala), 1)))
+    metricas.update(medir_prediccion(max(int(2_000 * escala), 200)))
+    metricas.update(medir_lotes(TAMANOS_LOTE, duracion_minima=0.5 * escala))
+    metricas.update(medir_render(max(int(2_000 * escala), 200)))
+    metricas.update(medir_rerun(max(int(40 * escala), 10)))
+
+    return {
+        "entorno": {
+            "version_modelo": RegistroModelos().obtener().version,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": _version_paquete("scikit-learn"),
+            "streamlit": _version_paquete("streamlit"),
+            "maquina": platform.machine(),
+            "cpus": os.cpu_count(),
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "rapido": rapido,
+        },
+        "metricas": metricas,
+    }
+
+
+# --------------------------------------------------
+# COMPARACIÓN CONTRA LA LÍNEA BASE
+# --------------------------------------------------
+def tolerancia(nombre):
+    if "_p99_" in nombre:
+        return TOLERANCIA_P99
+    for prefijo, valor in TOLERANCIAS:
+        if nombre.startswith(prefijo):
+            return valor
+    return 0.25
+
+
+def comparar(actual, base):
+    """Filas ``{metrica, base, actual, cambio, tolerancia, referencia, regresion}`` de las métricas comunes.
+
+    ``cambio`` es el empeoramiento relativo (positivo = peor), sea la métrica
+    un tiempo (menor es mejor) o un rendimiento (mayor es mejor).
+    """
+    filas = []
+    for nombre, medida in actual["metricas"].items():
+        previa = base["metricas"].get(nombre)
+        if previa is None or not previa["valor"]:
+            continue
+        if medida["mejor"] == "menor":
+            cambio = medida["valor"] / previa["valor"] - 1.0
+        else:
+            cambio = previa["valor"] / medida["valor"] - 1.0
+        filas.append({
+            "metrica": nombre,
+            "base": previa["valor"],
+            "actual": medida["valor"],
+            "cambio": cambio,
+            "tolerancia": tolerancia(nombre),
+            "referencia": bool(medida.get("referencia")),
+            "regresion": not medida.get("referencia") and cambio > tolerancia(nombre),
+        })
+    return filas
+
+
+def frente_a_sklearn(actual):
+    """Filas ``{tamano, motor, sklearn, cambio, regresion}`` por tamaño de lote medido en ambos.
+
+    ``cambio`` es cuánto más lento es el motor que sklearn (positivo = peor).
+    """
+    metricas = actual["metricas"]
+    filas = []
+    for tamano in TAMANOS_LOTE:
+        motor = metricas.get(f"lote_motor_{tamano}_filas_s")
+        sklearn = metricas.get(f"lote_sklearn_{tamano}_filas_s")
+        if motor is None or sklearn is None:
+            continue
+        cambio = sklearn["valor"] / motor["valor"] - 1.0
+        filas.append({
+            "tamano": tamano,
+            "motor": motor["valor"],
+            "sklearn": sklearn["valor"],
+            "cambio": cambio,
+            "regresion": cambio > TOLERANCIA_FRENTE_A_SKLEARN,
+        })
+    return filas
+
+
+def combinar(a, b):
+    """Mejor valor de cada métrica entre dos corridas (para confirmar regresiones)."""
+    metricas = {}
+    for nombre, medida in a["metricas"].items():
+        otra = b["metricas"].get(nombre, medida)
+        elegir = min if medida["mejor"] == "menor" else max
+        metricas[nombre] = {**medida, "valor": elegir(medida["valor"], otra["valor"])}
+    return {**a, "metricas": metricas}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cardiorisk.rendimiento", description=__doc__.splitlines()[0])
+    parser.add_argument("--salida", help="Guarda los resultados en este archivo JSON")
+    parser.add_argument("--base", default=str(RUTA_BASE), help="Línea base contra la que se compara")
+    parser.add_argument("--guardar-base", action="store_true", help="Guarda los resultados como nueva línea base")
+    parser.add_argument("--rapido", action="store_true", help="Menos repeticiones (más ruido)")
+    parser.add_argument(
+        "--sin-confirmar", action="store_true",
+        help="No repetir la suite para confirmar una regresión antes de fallar",
+    )
+    args = parser.parse_args(argv)
+
+    from cardiorisk.auditoria import redirigir_a_temporal
+
+    redirigir_a_temporal()      # Los clics de la medición no son pacientes
+    base = None
+    if not args.guardar_base and os.path.exists(args.base):
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+
+    resultados = ejecutar(rapido=args.rapido)
+    filas = comparar(resultados, base) if base is not None else []
+    lotes = frente_a_sklearn(resultados)
+    if any(fila["regresion"] for fila in filas + lotes) and not args.sin_confirmar:
+        # Una regresión debe reproducirse: se repite la suite y se toma lo mejor de ambas
+        print("Posible regresión; repitiendo la suite para confirmarla...")
+        resultados = combinar(resultados, ejecutar(rapido=args.rapido))
+        filas = comparar(resultados, base) if base is not None else []
+        lotes = frente_a_sklearn(resultados)
+
+    for nombre, medida in resultados["metricas"].items():
+        print(f"{nombre:<40} {medida['valor']:>14,.3f} {medida['unidad']}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    print("\nMotor frente a sklearn por lotes:")
+    for fila in lotes:
+        print(
+            f"  {fila['tamano']:>8} filas {fila['motor']:>12,.0f} vs {fila['sklearn']:>12,.0f} filas/s "
+            f"({fila['cambio']:+.0%}, tolerancia {TOLERANCIA_FRENTE_A_SKLEARN:.0%}) "
+            f"{'MÁS LENTO' if fila['regresion'] else 'ok'}"
+        )
+    mas_lentos = [fila["tamano"] for fila in lotes if fila["regresion"]]
+    if mas_lentos:
+        print(f"El motor es más lento que sklearn en lotes de {', '.join(map(str, mas_lentos))} filas")
+        sys.exit(1)
+
+    if args.guardar_base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"Línea base guardada en {args.base}")
+        return
+    if base is None:
+        print(f"No hay línea base en {args.base}; use --guardar-base para crearla")
+        return
+    if base["entorno"].get("version_modelo") != resultados["entorno"]["version_modelo"]:
+        print(f"Aviso: la línea base es del modelo v{base['entorno'].get('version_modelo')}")
+
+    print(f"\nComparación con {args.base}:")
+    for fila in filas:
+        marca = "REGRESIÓN" if fila["regresion"] else ("referencia" if fila["referencia"] else "ok")
+        print(
+            f"  {fila['metrica']:<40} {fila['base']:>12,.3f} -> {fila['actual']:>12,.3f} "
+            f"({fila['cambio']:+.0%}, tolerancia {fila['tolerancia']:.0%}) {marca}"
+        )
+    regresiones = [fila["metrica"] for fila in filas if fila["regresion"]]
+    if regresiones:
+        print(f"{len(regresiones)} métrica(s) empeoraron más que su tolerancia")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Servicio HTTP de predicción con micro-lotes dinámicos.
+
+Expone el mismo modelo, escalador y esquema de ``feature_names`` que
+``app.py`` (vía el registro de artefactos), usando solo la biblioteca
+estándar::
+
+    python -m cardiorisk.servicio --puerto 8600 --max-lote 64 --max-espera-ms 5
+
+Rutas:
+
+* ``POST /predecir`` — cuerpo JSON con un paciente (``{"age": 61, "chol": 250, ...}``);
+  responde ``{"prob_riesgo", "riesgo_alto", "votos_alto", "ic_inferior", "ic_superior", "version"}``
+  (fracción de árboles que votan alto riesgo e IC del 95 % del promedio del bosque).
+  Responde 400 si el cuerpo no trae ninguno de los campos del formulario, si
+  trae claves que no son variables del modelo o si algún valor no es un
+  número finito.
+* ``GET /metricas`` — profundidad de cola, histograma de lotes, latencias p50/p99
+  y aciertos/fallos de la caché de predicciones.
+* ``GET /metricas/prometheus`` — latencias por etapa en formato de texto de Prometheus.
+* ``GET /salud`` — versión del modelo cargado.
+* ``GET /auditoria?pagina=0`` — página del historial de predicciones auditadas
+  (las entradas de cada una, anidadas en ``entradas``).
+* ``GET /deriva`` — deriva de las entradas por variable y variables en alerta.
+
+Las solicitudes concurrentes se encolan unos milisegundos y se evalúan juntas
+en una sola llamada al bosque compilado.
+"""
+
+import argparse
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from cardiorisk.auditoria import bitacora
+from cardiorisk.cache import cache_predicciones
+from cardiorisk.deriva import monitor_para
+from cardiorisk.entrada import CAMPOS_USUARIO
+from cardiorisk.inferencia import predecir_paciente, predecir_pacientes
+from cardiorisk.metricas import metricas
+from cardiorisk.microlotes import MicroLotificador
+from cardiorisk.registro import registro
+
+logger = logging.getLogger(__name__)
+
+# Tiempo máximo que una solicitud espera su resultado
+TIMEOUT_PREDICCION = 10.0
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    lotificador = None      # Se asigna en ``crear_servidor``
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        if self.path == "/metricas":
+            self._responder(200, {**self.lotificador.estadisticas(), "cache": cache_predicciones.estadisticas()})
+        elif self.path == "/metricas/prometheus":
+            datos = metricas.exportar_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+        elif self.path == "/salud":
+            self._responder(200, {"estado": "ok", "version": registro.obtener().version})
+        elif self.path == "/deriva":
+            informe = monitor_para(registro.obtener()).informe()
+            self._responder(200, {"variables": informe, "alertas": [f["variable"] for f in informe if f["alerta"]]})
+        elif urlsplit(self.path).path == "/auditoria":
+            try:
+                pagina = int(parse_qs(urlsplit(self.path).query).get("pagina", ["0"])[0])
+            except ValueError:
+                self._responder(400, {"error": "pagina debe ser un entero"})
+                return
+            filas, total = bitacora.historial(max(pagina, 0))
+            self._responder(200, {"pagina": pagina, "total": total, "registros": filas})
+        else:
+            self._responder(404, {"error": "ruta no encontrada"})
+
+    def do_POST(self):
+        if self.path != "/predecir":
+            self._responder(404, {"error": "ruta no encontrada"})
+            return
+
+        try:
+            largo = int(self.headers.get("Content-Length", 0))
+            paciente = json.loads(self.rfile.read(largo) or b"{}")
+            if not isinstance(paciente, dict):
+                raise ValueError("se esperaba un objeto JSON")
+        except ValueError as error:
+            self._responder(400, {"error": f"JSON inválido: {error}"})
+            return
+
+        # Un cuerpo vacío o con nombres mal escritos no debe evaluarse como un paciente con todo en 0
+        plantilla = registro.obtener().plantilla
+        desconocidas = [str(clave) for clave in paciente if str(clave).strip().lower() not in plantilla.posiciones]
+        if desconocidas:
+            self._responder(400, {"error": f"campos desconocidos: {', '.join(desconocidas)}"})
+            return
+        informados = {str(clave).strip().lower() for clave, valor in paciente.items() if valor is not None}
+        if not informados & {campo.lower() for campo in CAMPOS_USUARIO}:
+            self._responder(400, {"error": f"se esperaba al menos uno de los campos: {', '.join(CAMPOS_USUARIO)}"})
+            return
+
+        _, errores = plantilla.matriz_desde_registros([paciente])
+        if errores[0] is not None:
+            self._responder(400, {"error": errores[0]})
+            return
+
+        try:
+            resultado = predecir_paciente(paciente, self.lotificador, timeout=TIMEOUT_PREDICCION, origen="servicio")
+        except Exception:
+            logger.exception("Error al evaluar la solicitud")
+            self._responder(500, {"error": "error interno al evaluar el modelo"})
+            return
+        self._responder(200, resultado)
+
+    def log_message(self, formato, *args):
+        logger.debug("%s - %s", self.address_string(), formato % args)
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256    # Ráfagas de clientes concurrentes sin rechazar conexiones
+
+
+def crear_servidor(host="127.0.0.1", puerto=8600, max_lote=64, max_espera_ms=5.0):
+    """Crea el servidor HTTP (sin iniciarlo). Con ``puerto=0`` se elige uno libre."""
+    lotificador = MicroLotificador(predecir_pacientes, max_lote=max_lote, max_espera_ms=max_espera_ms)
+    manejador = type("Manejador", (_Manejador,), {"lotificador": lotificador})
+    servidor = _Servidor((host, puerto), manejador)
+    servidor.lotificador = lotificador
+    return servidor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cardiorisk.servicio", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8600)
+    parser.add_argument("--max-lote", type=int, default=64, help="Máximo de solicitudes por lote")
+    parser.add_argument("--max-espera-ms", type=float, default=5.0, help="Espera máxima para completar un lote")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    registro.obtener()  # Carga los artefactos antes de aceptar conexiones
+    servidor = crear_servidor(args.host, args.puerto, args.max_lote, args.max_espera_ms)
+    logger.info("Escuchando en http://%s:%d", *servidor.server_address[:2])
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.lotificador.cerrar()
+        bitacora.cerrar()
+
+
+if __name__ == "__main__":
+    main()
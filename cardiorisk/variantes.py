@@ -0,0 +1,282 @@
+"""Variantes reducidas del bosque y selección por modo de uso.
+
+Herramienta de compactación: a partir de ``modelo_cardio.joblib`` y un
+conjunto etiquetado de validación genera variantes más pequeñas del bosque
+(menos árboles, profundidad acotada y un bosque superficial destilado de las
+probabilidades del original) y reporta AUC/exactitud frente a latencia de una
+fila, rendimiento por lotes y memoria::
+
+    python -m cardiorisk.variantes validacion.csv --objetivo target
+
+Cada variante se guarda en ``variantes/`` con el formato compacto
+(``cardiorisk.compacto``) y ``variantes/seleccion.json`` indica cuál usar en
+cada modo: ``interactivo`` (menor latencia de una fila) y ``lote`` (mayor
+rendimiento), entre las que no pierden más de ``--tolerancia-auc`` de AUC.
+La app, el servicio y la CLI consultan ``motor_para(modo, artefactos)``; si
+no hay selección (o es de otra versión del modelo) usan el bosque completo.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from cardiorisk import compacto
+from cardiorisk.motor import BosqueCompilado
+from cardiorisk.registro import DIRECTORIO_BASE
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_VARIANTES = DIRECTORIO_BASE / "variantes"
+RUTA_SELECCION = DIRECTORIO_VARIANTES / "seleccion.json"
+MODOS = ("interactivo", "lote")
+
+
+# --------------------------------------------------
+# CONSTRUCCIÓN DE VARIANTES
+# --------------------------------------------------
+def recortar(motor, n_arboles=None, profundidad=None):
+    """Bosque con los primeros ``n_arboles`` árboles y nodos hasta ``profundidad``.
+
+    Los nodos que quedan a la profundidad máxima pasan a ser hojas (su valor
+    ya es la distribución de clases de sus muestras) y los nodos inalcanzables
+    se eliminan, así que la variante ocupa menos memoria.
+    """
+    n_arboles = motor.n_arboles if n_arboles is None else min(n_arboles, motor.n_arboles)
+    profundidad = motor.profundidad if profundidad is None else min(profundidad, motor.profundidad)
+    nodos, izquierdos, derechos, inicios = [], [], [], []
+    desplazamiento = 0
+
+    for inicio in motor.inicio[:n_arboles]:
+        # Recorrido en anchura: posición nueva de cada nodo conservado
+        orden, nivel, nuevo = [0], {0: 0}, {0: 0}
+        for local in orden:
+            izq, der = int(motor.izquierdo[inicio + local]), int(motor.derecho[inicio + local])
+            if izq != local and nivel[local] < profundidad:
+                for hijo in (izq, der):
+                    nivel[hijo] = nivel[local] + 1
+                    nuevo[hijo] = len(orden)
+                    orden.append(hijo)
+
+        inicios.append(desplazamiento)
+        desplazamiento += len(orden)
+        orden = np.asarray(orden)
+        hoja = np.array([nivel[local] >= profundidad or motor.izquierdo[inicio + local] == local for local in orden])
+        propios = np.arange(len(orden))
+        izquierdos.append(np.where(hoja, propios, [nuevo.get(int(motor.izquierdo[inicio + l]), 0) for l in orden]))
+        derechos.append(np.where(hoja, propios, [nuevo.get(int(motor.derecho[inicio + l]), 0) for l in orden]))
+        nodos.append((inicio + orden, hoja))
+
+    globales = np.concatenate([g for g, _ in nodos])
+    hojas = np.concatenate([h for _, h in nodos])
+    return BosqueCompilado(
+        caracteristica=np.where(hojas, 0, motor.caracteristica[globales]).astype(np.int32),
+        umbral=np.where(hojas, 0.0, motor.umbral[globales]).astype(motor.umbral.dtype),
+        izquierdo=np.concatenate(izquierdos).astype(np.int32),
+        derecho=np.concatenate(derechos).astype(np.int32),
+        valor=np.ascontiguousarray(motor.valor[globales]),
+        cobertura=np.asarray(motor.cobertura[globales], dtype=np.float64),
+        inicio=np.asarray(inicios, dtype=np.int32),
+        profundidad=profundidad,
+        clases=motor.clases,
+        entrada_float32=motor.entrada_float32,
+    )
+
+
+def destilar(motor, X_escalado, n_arboles=20, profundidad=6, muestras=100_000, ruido=0.1, semilla=0):
+    """Bosque superficial que imita las probabilidades de ``motor`` (espacio escalado).
+
+    Se entrena un ``RandomForestRegressor`` sobre filas de ``X_escalado``
+    remuestreadas con ruido gaussiano (``ruido`` desviaciones estándar),
+    etiquetadas con la probabilidad del bosque original.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(semilla)
+    filas = X_escalado[rng.integers(0, len(X_escalado), muestras)]
+    filas = filas + rng.standard_normal(filas.shape) * ruido
+    _, probabilidades = motor.predecir(filas)
+
+    alumno = RandomForestRegressor(
+        n_estimators=n_arboles, max_depth=profundidad, min_samples_leaf=20, random_state=semilla, n_jobs=1,
+    )
+    alumno.fit(filas.astype(np.float32), probabilidades[:, 1])
+    return BosqueCompilado.desde_sklearn(alumno)
+
+
+def tamano_bytes(motor):
+    """Memoria de los arrays de nodos del bosque."""
+    return sum(a.nbytes for a in (
+        motor.caracteristica, motor.umbral, motor.izquierdo, motor.derecho, motor.valor, motor.cobertura,
+        motor.inicio, motor._hijos,
+    ))
+
+
+def evaluar(motor_crudo, X, y, referencia=None, repeticiones=300, filas_lote=50_000):
+    """AUC, exactitud, acuerdo con ``referencia``, latencia de una fila, filas/s y memoria."""
+    from sklearn.metrics import roc_auc_score
+
+    etiquetas, probabilidades = motor_crudo.predecir(X)
+    tiempos = []
+    for i in range(repeticiones):
+        t0 = time.perf_counter()
+        motor_crudo.predecir(X[i % len(X)][None, :])
+        tiempos.append(time.perf_counter() - t0)
+
+    lote = X[np.arange(filas_lote) % len(X)]
+    t0 = time.perf_counter()
+    motor_crudo.predecir(lote)
+    segundos = time.perf_counter() - t0
+
+    return {
+        "arboles": motor_crudo.n_arboles,
+        "profundidad": motor_crudo.profundidad,
+        "nodos": motor_crudo.n_nodos,
+        "auc": float(roc_auc_score(y, probabilidades[:, 1])),
+        "exactitud": float((etiquetas == y).mean()),
+        "acuerdo": float((etiquetas == referencia).mean()) if referencia is not None else 1.0,
+        "latencia_ms": float(np.median(tiempos) * 1e3),
+        "filas_por_segundo": filas_lote / segundos,
+        "memoria_kb": tamano_bytes(motor_crudo) / 1024,
+    }
+
+
+def seleccionar(resultados, tolerancia_auc=0.005):
+    """Variante por modo entre las que no pierden más de ``tolerancia_auc`` frente a ``completo``."""
+    minimo = resultados["completo"]["auc"] - tolerancia_auc
+    aptas = {nombre: r for nombre, r in resultados.items() if r["auc"] >= minimo}
+    return {
+        "interactivo": min(aptas, key=lambda n: aptas[n]["latencia_ms"]),
+        "lote": max(aptas, key=lambda n: aptas[n]["filas_por_segundo"]),
+    }
+
+
+# --------------------------------------------------
+# USO EN LA APP / SERVICIO / CLI
+# --------------------------------------------------
+_estado = {"huella": None, "motores": {}, "nombres": {}}
+_lock = threading.Lock()
+
+
+def _cargar_seleccion(version):
+    """``({modo: motor_crudo}, {modo: nombre})`` de ``seleccion.json`` si es de esta versión."""
+    with open(RUTA_SELECCION, encoding="utf-8") as f:
+        seleccion = json.load(f)
+    if seleccion.get("version") != version:
+        logger.warning("%s es de la versión %s; se usa el bosque completo", RUTA_SELECCION, seleccion.get("version"))
+        return {}, {}
+
+    motores, nombres = {}, {}
+    for modo in MODOS:
+        nombre = seleccion.get(modo)
+        if nombre is not None and nombre != "completo":
+            motores[modo] = compacto.cargar(DIRECTORIO_VARIANTES / f"{nombre}.bosque").motor_crudo
+            nombres[modo] = nombre
+    return motores, nombres
+
+
+def motor_para(modo, artefactos):
+    """Bosque (escalador plegado) elegido para ``modo``; el completo si no hay selección."""
+    try:
+        huella = (artefactos.version, os.stat(RUTA_SELECCION).st_mtime_ns)
+    except OSError:
+        huella = (artefactos.version, None)     # Sin selección: se olvida la anterior
+    if huella != _estado["huella"]:
+        with _lock:
+            if huella != _estado["huella"]:
+                try:
+                    if huella[1] is None:
+                        _estado["motores"], _estado["nombres"] = {}, {}
+                    else:
+                        _estado["motores"], _estado["nombres"] = _cargar_seleccion(artefactos.version)
+                except Exception:
+                    logger.exception("No se pudieron cargar las variantes; se usa el bosque completo")
+                    _estado["motores"], _estado["nombres"] = {}, {}
+                _estado["huella"] = huella
+    return _estado["motores"].get(modo, artefactos.motor_crudo)
+
+
+def variante_activa(modo):
+    """Nombre de la variante en uso para ``modo`` (``"completo"`` si no hay)."""
+    return _estado["nombres"].get(modo, "completo")
+
+
+# --------------------------------------------------
+# HERRAMIENTA DE LÍNEA DE COMANDOS
+# --------------------------------------------------
+def main(argv=None):
+    import warnings
+
+    import pandas as pd
+
+    from cardiorisk.lotes import es_parquet
+    from cardiorisk.registro import RegistroModelos
+
+    parser = argparse.ArgumentParser(prog="python -m cardiorisk.variantes", description=__doc__.splitlines()[0])
+    parser.add_argument("datos", help="CSV o Parquet etiquetado de validación")
+    parser.add_argument("--objetivo", default="target", help="Columna con la etiqueta (0/1)")
+    parser.add_argument("--arboles", type=int, nargs="*", default=[10, 25, 50])
+    parser.add_argument("--profundidades", type=int, nargs="*", default=[5, 7])
+    parser.add_argument("--destilado", type=int, nargs=2, default=[20, 6], metavar=("ARBOLES", "PROFUNDIDAD"))
+    parser.add_argument("--tolerancia-auc", type=float, default=0.005)
+    parser.add_argument("--destino", default=str(DIRECTORIO_VARIANTES))
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore", category=UserWarning)  # Nombres de columnas en arrays
+    original = RegistroModelos(ruta_compacto=None).obtener()
+    datos = pd.read_parquet(args.datos) if es_parquet(args.datos) else pd.read_csv(args.datos)
+    y = datos.pop(args.objetivo).to_numpy().astype(original.motor.clases.dtype)
+    X, errores = original.plantilla.matriz_desde_tabla(datos)
+    validas = ~errores.astype(bool)
+    if not validas.all():
+        print(f"Se omiten {int((~validas).sum()):,} filas con valores no numéricos")
+        X, y = X[validas], y[validas]
+
+    # La destilación usa la primera mitad (sin etiquetas); todas las variantes se evalúan en la segunda
+    mitad = len(X) // 2
+    X_destilacion, X_eval, y_eval = X[:mitad], X[mitad:], y[mitad:]
+    media, escala = original.scaler.mean_, original.scaler.scale_
+
+    escalados = {"completo": original.motor}
+    for n in args.arboles:
+        escalados[f"arboles_{n}"] = recortar(original.motor, n_arboles=n)
+    for d in args.profundidades:
+        escalados[f"profundidad_{d}"] = recortar(original.motor, profundidad=d)
+    for n in args.arboles:
+        for d in args.profundidades:
+            escalados[f"arboles_{n}_profundidad_{d}"] = recortar(original.motor, n_arboles=n, profundidad=d)
+    n, d = args.destilado
+    escalados[f"destilado_{n}x{d}"] = destilar(original.motor, (X_destilacion - media) / escala, n, d)
+
+    referencia, _ = original.motor_crudo.predecir(X_eval)
+    os.makedirs(args.destino, exist_ok=True)
+    resultados = {}
+    for nombre, motor in escalados.items():
+        motor_crudo = motor.plegar_escalador(original.scaler)
+        resultados[nombre] = evaluar(motor_crudo, X_eval, y_eval, referencia)
+        if nombre != "completo":
+            variante = SimpleNamespace(
+                motor=motor, motor_crudo=motor_crudo, scaler=original.scaler,
+                feature_names=original.feature_names, version=original.version,
+            )
+            compacto.exportar(variante, os.path.join(args.destino, f"{nombre}.bosque"))
+
+    print(f"{'variante':<28}{'árboles':>8}{'prof.':>6}{'nodos':>8}{'AUC':>8}{'exact.':>8}{'acuerdo':>9}"
+          f"{'1 fila ms':>11}{'filas/s':>12}{'memoria KB':>12}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<28}{r['arboles']:>8}{r['profundidad']:>6}{r['nodos']:>8}{r['auc']:>8.4f}{r['exactitud']:>8.4f}"
+              f"{r['acuerdo']:>9.4f}{r['latencia_ms']:>11.3f}{r['filas_por_segundo']:>12,.0f}{r['memoria_kb']:>12,.0f}")
+
+    seleccion = seleccionar(resultados, args.tolerancia_auc)
+    print(f"Selección (tolerancia AUC {args.tolerancia_auc}): {seleccion}")
+    with open(os.path.join(args.destino, "seleccion.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": original.version, **seleccion, "resultados": resultados}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
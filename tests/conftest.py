@@ -0,0 +1,33 @@
+"""Fixtures compartidas: los artefactos reales del repositorio y una bitácora temporal."""
+
+import warnings
+
+import numpy as np
+import pytest
+
+from cardiorisk.auditoria import redirigir_a_temporal
+
+# Las predicciones de las pruebas no son pacientes: no van a auditoria.sqlite3
+redirigir_a_temporal()
+
+
+@pytest.fixture(scope="session")
+def original():
+    """Artefactos cargados de los ``.joblib``: con ``modelo`` y ``scaler`` de sklearn."""
+    from cardiorisk.registro import RegistroModelos
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")     # Versión de sklearn distinta a la del pickle
+        return RegistroModelos(ruta_compacto=None).obtener()
+
+
+@pytest.fixture(scope="session")
+def X_escalado(original):
+    """Filas aleatorias en el espacio del escalador (la entrada de ``modelo``)."""
+    return np.random.default_rng(0).standard_normal((2_000, len(original.feature_names)))
+
+
+@pytest.fixture(scope="session")
+def X_crudo(original, X_escalado):
+    """Las mismas filas en unidades clínicas (la entrada del motor con el escalador plegado)."""
+    return original.scaler.inverse_transform(X_escalado)
@@ -0,0 +1,29 @@
+"""Evaluación JSONL: las líneas rechazadas no cuentan como evaluadas."""
+
+import json
+
+import pytest
+
+from cardiorisk.cli import puntuar_lineas
+
+LINEAS = ['{"age": 61, "chol": 250}', "no es json", '{"age": "x"}', "[1]", '{"age": 50}']
+
+
+@pytest.mark.parametrize("confianza", [None, 1.0])
+def test_lineas_invalidas_se_informan_aparte(original, confianza):
+    salida, arboles, invalidas, _ = puntuar_lineas(LINEAS, original, confianza)
+    registros = [json.loads(linea) for linea in salida]
+    assert ["error" in r for r in registros] == [False, True, True, True, False]
+    assert invalidas == 3
+    assert 0 < arboles <= 2 * original.motor_crudo.n_arboles
+    if confianza is None:
+        assert arboles == 2 * original.motor_crudo.n_arboles
+
+    unica, _, _, _ = puntuar_lineas([LINEAS[-1]], original, confianza)
+    assert json.loads(unica[0]) == registros[-1]        # Mismo resultado con o sin filas rechazadas al lado
+
+
+def test_bloque_sin_filas_validas(original):
+    salida, arboles, invalidas, deriva = puntuar_lineas(["{", "[]"], original)
+    assert (arboles, invalidas, deriva) == (0, 2, None)
+    assert all("error" in json.loads(linea) for linea in salida)
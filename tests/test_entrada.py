@@ -0,0 +1,115 @@
+"""Vector de entrada, errores por fila y claves de la caché de predicciones."""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cardiorisk.cache import CachePredicciones, clave_cuantizada
+from cardiorisk.entrada import CAMPOS_USUARIO, PlantillaEntrada
+
+PACIENTE = {"age": 61, "BMI": 24.3, "chol": 250.0, "thalch": 150, "oldpeak": 1.4, "diabetes": 0, "prevalentHyp": 1}
+
+
+@pytest.fixture(scope="module")
+def plantilla(original):
+    return PlantillaEntrada(original.feature_names)
+
+
+def _columna(plantilla, campo):
+    return plantilla.feature_names.index(campo)
+
+
+# --------------------------------------------------
+# REGISTROS (JSON / JSONL)
+# --------------------------------------------------
+def test_registros_validos_coinciden_con_el_formulario(plantilla):
+    X, errores = plantilla.matriz_desde_registros([PACIENTE, {"AGE ": 50}])
+    assert errores == [None, None]
+    np.testing.assert_array_equal(X[0], plantilla.vector(PACIENTE)[0])
+    assert X[1, _columna(plantilla, "age")] == 50       # Claves sin distinguir mayúsculas ni espacios
+    assert X[1].sum() == 50                             # Lo ausente vale 0
+
+
+@pytest.mark.parametrize("valor, motivo", [
+    ("abc", "no numérico"),
+    ([1, 2], "no numérico"),
+    (float("nan"), "no finito"),
+    (float("inf"), "no finito"),
+    ("-Infinity", "no finito"),
+])
+def test_registro_invalido_informa_el_motivo_y_queda_en_ceros(plantilla, valor, motivo):
+    X, errores = plantilla.matriz_desde_registros([{**PACIENTE, "chol": valor}, PACIENTE])
+    assert motivo in errores[0] and "'chol'" in errores[0]
+    assert not X[0].any()
+    assert errores[1] is None                           # Las demás filas no se ven afectadas
+    np.testing.assert_array_equal(X[1], plantilla.vector(PACIENTE)[0])
+
+
+def test_none_cuenta_como_ausente(plantilla):
+    X, errores = plantilla.matriz_desde_registros([{"chol": None, "age": 40}])
+    assert errores == [None]
+    assert X[0, _columna(plantilla, "chol")] == 0
+    assert not plantilla.presentes_desde_registros([{"chol": None}]).any()
+
+
+# --------------------------------------------------
+# TABLAS (CSV / PARQUET)
+# --------------------------------------------------
+def test_tabla_informa_celdas_invalidas_por_fila(plantilla):
+    df = pd.DataFrame({
+        "age": ["61", "abc", "50", None],
+        "CHOL": [250, 200, np.inf, 180],
+        "otra": ["x", "y", "z", "w"],                   # Columna que el modelo no usa
+    })
+    X, errores = plantilla.matriz_desde_tabla(df)
+    assert errores[0] is None and errores[3] is None
+    assert "no numérico" in errores[1] and "'age'" in errores[1]
+    assert "no finito" in errores[2] and "'CHOL'" in errores[2]
+    assert not X[1].any() and not X[2].any()
+    assert X[0, _columna(plantilla, "age")] == 61 and X[0, _columna(plantilla, "chol")] == 250
+    assert X[3, _columna(plantilla, "age")] == 0        # Celda vacía: 0 sin error
+
+
+def test_celdas_vacias_no_cuentan_como_observadas(plantilla):
+    df = pd.DataFrame({"age": [61, None], "chol": [None, 200]})
+    presentes = plantilla.presentes_desde_tabla(df)
+    assert presentes[:, _columna(plantilla, "age")].tolist() == [True, False]
+    assert presentes[:, _columna(plantilla, "chol")].tolist() == [False, True]
+
+
+# --------------------------------------------------
+# CLAVES DE LA CACHÉ
+# --------------------------------------------------
+def test_clave_igual_para_el_mismo_paciente_en_la_rejilla():
+    clave = clave_cuantizada(PACIENTE, "v1")
+    assert clave is not None and clave[0] == "v1"
+    assert clave_cuantizada({**PACIENTE, "BMI": 24.300000000001}, "v1") == clave      # Error de coma flotante
+    assert clave_cuantizada({**PACIENTE, "chol": 251.0}, "v1") != clave
+    assert clave_cuantizada(PACIENTE, "v2") != clave
+
+
+@pytest.mark.parametrize("campo, valor", [
+    ("oldpeak", 0.049),         # Entre pasos de 0.1: no comparte resultado con 0.0
+    ("BMI", 24.305),
+    ("age", 61.5),
+    ("chol", math.nan),
+    ("chol", math.inf),
+    ("oldpeak", -math.inf),
+])
+def test_clave_nula_fuera_de_la_rejilla_o_no_finita(campo, valor):
+    assert clave_cuantizada({**PACIENTE, campo: valor}, "v1") is None
+
+
+def test_clave_cubre_todos_los_campos_del_formulario():
+    assert len(clave_cuantizada(PACIENTE, "v1")) == len(CAMPOS_USUARIO) + 1
+
+
+def test_cache_se_vacia_al_cambiar_de_version():
+    cache = CachePredicciones(capacidad=2, ttl=60)
+    clave = clave_cuantizada(PACIENTE, "v1")
+    cache.guardar(clave, {"prob_riesgo": 0.3})
+    assert cache.obtener(clave) == {"prob_riesgo": 0.3}
+    assert cache.obtener(clave_cuantizada(PACIENTE, "v2")) is None
+    assert cache.obtener(clave) is None
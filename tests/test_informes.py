@@ -0,0 +1,42 @@
+"""Los informes HTML no dependen de la red para dibujar el gauge."""
+
+import re
+import time
+import zipfile
+
+import pandas as pd
+
+from cardiorisk import informes
+from cardiorisk.lotes import COLUMNA_ERROR, COLUMNA_ETIQUETA, COLUMNA_PROBABILIDAD
+
+PACIENTE = {"age": 61, "chol": 250.0}
+
+
+def _scripts_externos(documento):
+    return re.findall(r'<script src="([^"]*)"', documento)
+
+
+def test_informe_individual_incrusta_plotlyjs():
+    documento = informes.documento_html(PACIENTE, 0.42, 0, "v1")
+    assert _scripts_externos(documento) == []
+    assert informes._plotlyjs() in documento
+
+
+def test_lote_comparte_una_copia_local_de_plotlyjs(tmp_path):
+    ruta = tmp_path / "resultados.csv"
+    pd.DataFrame({
+        "id": ["p1", "p2"], "age": [61, 50], COLUMNA_ERROR: ["", ""],
+        COLUMNA_PROBABILIDAD: [0.42, 0.7], COLUMNA_ETIQUETA: [0, 1],
+    }).to_csv(ruta, index=False)
+    trabajo = informes.GeneradorInformes(directorio=tmp_path / "informes").informe_lote(ruta, "lote", "v1", total=2)
+    limite = time.monotonic() + 60
+    while not trabajo.terminado and time.monotonic() < limite:
+        time.sleep(0.05)
+    assert trabajo.estado == "listo", trabajo.error
+
+    with zipfile.ZipFile(trabajo.ruta) as archivo:
+        assert archivo.read(informes.ARCHIVO_PLOTLYJS).decode("utf-8") == informes._plotlyjs()
+        documentos = [nombre for nombre in archivo.namelist() if nombre.endswith(".html")]
+        assert len(documentos) == 2
+        for nombre in documentos:
+            assert _scripts_externos(archivo.read(nombre).decode("utf-8")) == [informes.ARCHIVO_PLOTLYJS]
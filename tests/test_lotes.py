@@ -0,0 +1,64 @@
+"""Evaluación por lotes: columna de error, lectura de CSV y archivos ilegibles."""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cardiorisk import lotes
+from cardiorisk.entrada import PlantillaEntrada
+
+
+@pytest.fixture(scope="module")
+def plantilla(original):
+    return PlantillaEntrada(original.feature_names)
+
+
+def _archivo(contenido):
+    archivo = io.BytesIO(contenido)
+    archivo.size = len(contenido)
+    return archivo
+
+
+def _puntuar(tmp_path, original, plantilla, texto, nombre="lote.csv", **kwargs):
+    destino = tmp_path / "resultados.csv"
+    archivo = _archivo(texto.encode("utf-8"))
+    resumen = lotes.puntuar_archivo(archivo, nombre, destino, original.motor_crudo, plantilla, **kwargs)
+    return resumen, pd.read_csv(destino)
+
+
+def test_filas_invalidas_quedan_sin_resultado(tmp_path, original, plantilla):
+    resumen, resultados = _puntuar(tmp_path, original, plantilla, "age,chol\n61,250\nabc,200\n50,inf\n45,\n")
+    assert resumen["filas"] == 4 and resumen["filas_invalidas"] == 2
+    assert resultados[lotes.COLUMNA_ERROR].notna().tolist() == [False, True, True, False]
+    assert resultados[lotes.COLUMNA_PROBABILIDAD].isna().tolist() == [False, True, True, False]
+    assert resumen["arboles_promedio"] == original.motor_crudo.n_arboles
+
+    X = plantilla.matriz_desde_registros([{"age": 61, "chol": 250}, {"age": 45}])[0]
+    esperado = np.round(original.motor_crudo.predecir(X)[1][:, 1], 6)
+    np.testing.assert_allclose(resultados[lotes.COLUMNA_PROBABILIDAD].dropna(), esperado)
+
+
+def test_coma_final_no_desplaza_las_columnas(tmp_path, original, plantilla):
+    _, resultados = _puntuar(tmp_path, original, plantilla, "id,age,chol\np1,61,250,\np2,50,200,\n")
+    assert resultados["id"].tolist() == ["p1", "p2"]
+    assert resultados["age"].tolist() == [61, 50]
+    assert resultados[lotes.COLUMNA_ERROR].isna().all()
+
+
+def test_tamizaje_rapido_cuenta_arboles(tmp_path, original, plantilla):
+    resumen, resultados = _puntuar(tmp_path, original, plantilla, "age,chol\n61,250\n30,150\n", confianza=0.99)
+    assert lotes.COLUMNA_PROBABILIDAD not in resultados
+    assert 0 < resumen["arboles_promedio"] <= original.motor_crudo.n_arboles
+
+
+@pytest.mark.parametrize("nombre, contenido", [
+    ("vacio.csv", b""),
+    ("mal_formado.csv", b'age,chol\n61,"250\n'),
+    ("binario.csv", b"age,chol\n\xff\xfe\x00\x01\n"),
+    ("no_es_parquet.parquet", b"age,chol\n61,250\n"),
+])
+def test_archivo_ilegible_lanza_error_de_lectura(tmp_path, original, plantilla, nombre, contenido):
+    with pytest.raises(lotes.errores_de_lectura()):
+        lotes.puntuar_archivo(_archivo(contenido), nombre, tmp_path / "r.csv", original.motor_crudo, plantilla)
@@ -0,0 +1,115 @@
+"""Paridad del bosque compilado con sklearn, evaluación anticipada y formato compacto."""
+
+import numpy as np
+import pytest
+
+from cardiorisk import compacto, motor
+from cardiorisk.motor import BosqueCompilado, verificar_paridad
+
+
+@pytest.fixture(scope="module")
+def compilado(original):
+    return BosqueCompilado.desde_sklearn(original.modelo)
+
+
+@pytest.fixture(scope="module")
+def plegado(original, compilado):
+    return compilado.plegar_escalador(original.scaler)
+
+
+def _sin_diferencias(paridad):
+    assert paridad["etiquetas_distintas"] == 0
+    assert paridad["max_diff_proba"] < 1e-12
+
+
+def test_paridad_con_predict_proba(original, compilado, X_escalado):
+    _sin_diferencias(verificar_paridad(original.modelo, compilado, X_escalado))
+
+
+def test_paridad_con_escalador_plegado(original, plegado, X_crudo):
+    _sin_diferencias(verificar_paridad(original.modelo, plegado, X_crudo, scaler=original.scaler))
+
+
+def test_una_fila_sin_dimension_de_lote(original, plegado, X_crudo):
+    etiquetas, probabilidades = plegado.predecir(X_crudo[0])
+    esperado = original.modelo.predict_proba(original.scaler.transform(X_crudo[:1]))
+    assert etiquetas.shape == (1,)
+    np.testing.assert_allclose(probabilidades, esperado, atol=1e-12)
+
+
+def test_recorrido_por_hijos_coincide_con_monticulo(monkeypatch, original, X_crudo):
+    con_monticulo = BosqueCompilado.desde_sklearn(original.modelo).plegar_escalador(original.scaler)
+    monkeypatch.setattr(motor, "MAX_CASILLAS_MONTICULO", 0)
+    por_hijos = BosqueCompilado.desde_sklearn(original.modelo).plegar_escalador(original.scaler)
+    assert por_hijos._tablas_recorrido()[3] is None
+    np.testing.assert_array_equal(por_hijos.hojas(X_crudo), con_monticulo.hojas(X_crudo))
+
+
+def test_votos_promedian_la_probabilidad(plegado, X_crudo):
+    _, probabilidades, votos = plegado.predecir_votos(X_crudo)
+    assert votos.shape == (len(X_crudo), plegado.n_arboles)
+    np.testing.assert_allclose(votos.mean(axis=1), probabilidades[:, 1], atol=1e-12)
+
+
+def test_lotes_grandes_usan_respaldo(plegado, X_crudo):
+    X = np.tile(X_crudo, (motor.FILAS_A_SKLEARN // len(X_crudo) + 1, 1))
+    llamadas = []
+
+    def respaldo(lote):
+        llamadas.append(len(lote))
+        return plegado._probabilidades(lote)[0]
+
+    plegado.respaldo = respaldo
+    try:
+        etiquetas, _ = plegado.predecir(X)
+        plegado.predecir(X[:motor.FILAS_A_SKLEARN - 1])
+    finally:
+        plegado.respaldo = None
+    assert llamadas == [len(X)]
+    np.testing.assert_array_equal(etiquetas, plegado.predecir(X)[0])
+
+
+# --------------------------------------------------
+# EVALUACIÓN ANTICIPADA
+# --------------------------------------------------
+def test_anticipado_exacto_coincide_con_las_etiquetas(plegado, X_crudo):
+    etiquetas, _ = plegado.predecir(X_crudo)
+    anticipadas, arboles = plegado.predecir_anticipado(X_crudo, confianza=1.0)
+    np.testing.assert_array_equal(anticipadas, etiquetas)
+    assert arboles.max() <= plegado.n_arboles
+    assert arboles.mean() < plegado.n_arboles      # Alguna fila se decidió antes
+
+
+def test_anticipado_con_confianza_casi_siempre_coincide(plegado, X_crudo):
+    etiquetas, _ = plegado.predecir(X_crudo)
+    anticipadas, arboles = plegado.predecir_anticipado(X_crudo, confianza=0.99)
+    assert np.mean(anticipadas != etiquetas) <= 0.01
+    assert arboles.mean() <= plegado.predecir_anticipado(X_crudo, confianza=1.0)[1].mean()
+
+
+# --------------------------------------------------
+# FORMATO COMPACTO
+# --------------------------------------------------
+def test_compacto_ida_y_vuelta(tmp_path, original, compilado, plegado, X_escalado, X_crudo):
+    destino = tmp_path / "modelo.bosque"
+    compacto.exportar(original, destino)
+    archivo = compacto.cargar(destino)
+
+    assert compacto.leer_version(destino) == original.version
+    assert archivo.feature_names == original.feature_names
+    np.testing.assert_array_equal(archivo.media, original.scaler.mean_)
+    np.testing.assert_array_equal(archivo.escala, original.scaler.scale_)
+    for nombre in ("caracteristica", "izquierdo", "derecho", "inicio", "clases"):
+        np.testing.assert_array_equal(getattr(archivo.motor_crudo, nombre), getattr(plegado, nombre))
+    np.testing.assert_array_equal(archivo.motor_crudo.umbral, plegado.umbral)
+    np.testing.assert_array_equal(archivo.motor_crudo._hijos, plegado._hijos)
+
+    _sin_diferencias(verificar_paridad(original.modelo, archivo.motor, X_escalado))
+    _sin_diferencias(verificar_paridad(original.modelo, archivo.motor_crudo, X_crudo, scaler=original.scaler))
+
+
+def test_compacto_rechaza_otro_formato(tmp_path):
+    ruta = tmp_path / "no_es_un_bosque.bosque"
+    ruta.write_bytes(b"NOESBOSQUE" + bytes(64))
+    with pytest.raises(ValueError):
+        compacto.cargar(ruta)
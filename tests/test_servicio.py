@@ -0,0 +1,80 @@
+"""Códigos de estado del servicio HTTP."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from cardiorisk.servicio import crear_servidor
+
+PACIENTE = {"age": 61, "BMI": 24.3, "chol": 250.0, "thalch": 150, "oldpeak": 1.4, "diabetes": 0, "prevalentHyp": 1}
+
+
+@pytest.fixture(scope="module")
+def url():
+    servidor = crear_servidor(puerto=0)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield "http://%s:%d" % servidor.server_address[:2]
+    servidor.shutdown()
+    servidor.server_close()
+    servidor.lotificador.cerrar()
+
+
+def _pedir(url, ruta, cuerpo=None):
+    """``(estado, JSON de respuesta)``; ``cuerpo`` en bytes hace un POST."""
+    solicitud = urllib.request.Request(url + ruta, data=cuerpo, method="GET" if cuerpo is None else "POST")
+    try:
+        with urllib.request.urlopen(solicitud, timeout=10) as respuesta:
+            return respuesta.status, json.loads(respuesta.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_prediccion_valida(url):
+    estado, cuerpo = _pedir(url, "/predecir", json.dumps(PACIENTE).encode())
+    assert estado == 200
+    assert 0.0 <= cuerpo["prob_riesgo"] <= 1.0
+    assert cuerpo["riesgo_alto"] in (0, 1)
+    assert cuerpo["ic_inferior"] <= cuerpo["prob_riesgo"] <= cuerpo["ic_superior"]
+
+
+@pytest.mark.parametrize("cuerpo", [
+    b"{no es json",
+    b"[1, 2, 3]",
+    b'"texto"',
+    b'{"age": 61, "chol": NaN}',
+    b'{"age": 61, "chol": Infinity}',
+    b'{"age": "sesenta"}',
+    b"",                                    # Sin ningún campo del formulario
+    b"{}",
+    b'{"age": null}',
+    b'{"edad": 61}',                        # Claves que no son variables del modelo
+    b'{"age": 61, "colesterol": 250}',
+])
+def test_entrada_invalida_es_400(url, cuerpo):
+    estado, respuesta = _pedir(url, "/predecir", cuerpo)
+    assert estado == 400
+    assert respuesta["error"]
+
+
+def test_claves_sin_distinguir_mayusculas_y_variables_fuera_del_formulario(url):
+    modelo = {" AGE": 61, "Chol": 250, "sysBP": 140}     # sysBP es del modelo aunque no del formulario
+    assert _pedir(url, "/predecir", json.dumps(modelo).encode())[0] == 200
+
+
+@pytest.mark.parametrize("ruta", ["/salud", "/metricas", "/deriva", "/auditoria?pagina=0"])
+def test_rutas_de_consulta(url, ruta):
+    estado, _ = _pedir(url, ruta)
+    assert estado == 200
+
+
+def test_pagina_no_entera_es_400(url):
+    assert _pedir(url, "/auditoria?pagina=uno")[0] == 400
+
+
+def test_ruta_desconocida_es_404(url):
+    assert _pedir(url, "/no-existe")[0] == 404
+    assert _pedir(url, "/no-existe", b"{}")[0] == 404
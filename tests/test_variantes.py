@@ -0,0 +1,19 @@
+"""Selección de variantes: se sigue a ``seleccion.json`` aunque desaparezca."""
+
+from cardiorisk import variantes
+
+
+def test_sin_seleccion_vuelve_al_bosque_completo(monkeypatch, tmp_path, original):
+    ruta = tmp_path / "seleccion.json"
+    ruta.write_text("{}", encoding="utf-8")
+    recortado = variantes.recortar(original.motor_crudo, n_arboles=5)
+    monkeypatch.setattr(variantes, "RUTA_SELECCION", ruta)
+    monkeypatch.setattr(variantes, "_cargar_seleccion", lambda version: ({"lote": recortado}, {"lote": "a5"}))
+    monkeypatch.setattr(variantes, "_estado", {"huella": None, "motores": {}, "nombres": {}})
+
+    assert variantes.motor_para("lote", original) is recortado
+    assert variantes.variante_activa("lote") == "a5"
+
+    ruta.unlink()
+    assert variantes.motor_para("lote", original) is original.motor_crudo
+    assert variantes.variante_activa("lote") == "completo"